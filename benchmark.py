@@ -0,0 +1,1000 @@
+"""
+Microbenchmarks for the XDR/RPC stack.
+
+Run all of them with:
+    python benchmark.py
+or name the ones to run:
+    python benchmark.py xdr_codec
+"""
+
+import timeit as _timeit
+
+
+def _report(name, seconds, n):
+    print("%-40s %10.2f us/op %12.0f ops/s"
+          % (name, seconds / n * 1e6, n / seconds))
+
+
+def _time(name, fxn, n):
+    seconds = min(_timeit.repeat(fxn, number=n, repeat=5))
+    _report(name, seconds, n)
+
+
+def bench_xdr_codec():
+    """
+    Round-trips of an RPC call header and a small COMPOUND through the
+    generated struct/union codecs.
+    """
+    from xdr import Packer, Unpacker
+    from rpc import rpc_msg, msg_type, call_body, opaque_auth
+    from nfs import COMPOUND4args, nfs_argop4, nfs_opnum4, READ4args, stateid4
+    from nfs import PUTFH4args
+
+    msg = rpc_msg(xid=123,
+                  body=rpc_msg.body(mtype=msg_type.CALL,
+                                    cbody=call_body(rpcvers=2,
+                                                    prog=100003,
+                                                    vers=4,
+                                                    proc=1,
+                                                    cred=opaque_auth.NONE(),
+                                                    verf=opaque_auth.NONE())))
+    args = COMPOUND4args(
+        tag=b"bench",
+        minorversion=0,
+        argarray=[
+            nfs_argop4(argop=nfs_opnum4.OP_PUTFH,
+                       opputfh=PUTFH4args(object=bytes(32))),
+            nfs_argop4(argop=nfs_opnum4.OP_READ,
+                       opread=READ4args(stateid=stateid4(seqid=1,
+                                                         other=bytes(12)),
+                                        offset=0,
+                                        count=4096)),
+        ])
+
+    def round_trip(value):
+        def _round_trip():
+            packer = Packer()
+            value.pack(packer)
+            type(value).unpack(Unpacker(packer.get_buffer()))
+        return _round_trip
+
+    _time("rpc_msg round-trip", round_trip(msg), 20000)
+    _time("COMPOUND4args round-trip", round_trip(args), 5000)
+
+    from rpc import unpack_call_header
+    packer = Packer()
+    msg.pack(packer)
+    call = bytearray(packer.get_buffer())
+    _time("call header unpack (rpc_msg)",
+          lambda: rpc_msg.unpack(Unpacker(call)), 20000)
+    _time("call header unpack (unpack_call_header)",
+          lambda: unpack_call_header(Unpacker(call, zero_copy=True)), 20000)
+
+
+def bench_packer():
+    """
+    xdr.Packer/Unpacker against the stdlib xdrlib (where it still exists),
+    driving both through the common Packer API with the field sequence of
+    large READ4resok and WRITE4args payloads.
+    """
+    import xdr
+    implementations = [ ("xdr", xdr) ]
+    try:
+        import xdrlib
+        implementations.append(("xdrlib", xdrlib))
+    except ImportError:
+        pass
+
+    payload = bytes(range(256)) * 4096
+
+    def pack_read(packer):
+        packer.pack_bool(False)
+        packer.pack_opaque(payload)
+
+    def unpack_read(unpacker):
+        unpacker.unpack_bool()
+        unpacker.unpack_opaque()
+
+    def pack_write(packer):
+        packer.pack_uint(1)
+        packer.pack_fopaque(12, bytes(12))
+        packer.pack_uhyper(0)
+        packer.pack_enum(0)
+        packer.pack_opaque(payload)
+
+    def unpack_write(unpacker):
+        unpacker.unpack_uint()
+        unpacker.unpack_fopaque(12)
+        unpacker.unpack_uhyper()
+        unpacker.unpack_enum()
+        unpacker.unpack_opaque()
+
+    def pack_small(packer):
+        for i in range(256):
+            packer.pack_uint(i)
+            packer.pack_hyper(-i)
+            packer.pack_bool(True)
+
+    def unpack_small(unpacker):
+        for i in range(256):
+            unpacker.unpack_uint()
+            unpacker.unpack_hyper()
+            unpacker.unpack_bool()
+
+    cases = [ ("READ4resok 1MiB", pack_read, unpack_read, 200),
+              ("WRITE4args 1MiB", pack_write, unpack_write, 200),
+              ("768 scalars", pack_small, unpack_small, 200) ]
+    for name, pack, unpack, n in cases:
+        for impl_name, impl in implementations:
+            def _pack():
+                packer = impl.Packer()
+                pack(packer)
+                return packer.get_buffer()
+            data = _pack()
+            def _unpack():
+                unpack(impl.Unpacker(data))
+            _time("%s pack (%s)" % (name, impl_name), _pack, n)
+            _time("%s unpack (%s)" % (name, impl_name), _unpack, n)
+
+
+def bench_zero_copy():
+    """
+    Decoding WRITE4args and encoding READ4resok with 1MiB payloads, copying
+    versus zero-copy opaque handling.
+    """
+    import xdr
+    from xdr import Packer, Unpacker
+    from nfs import READ4resok, WRITE4args, stateid4, stable_how4
+
+    payload = bytes(range(256)) * 4096
+    packer = Packer()
+    WRITE4args(stateid=stateid4(seqid=1, other=bytes(12)),
+               offset=0,
+               stable=stable_how4.UNSTABLE4,
+               data=payload).pack(packer)
+    record = packer.get_buffer()
+    for zero_copy in (False, True):
+        def _unpack():
+            unpacker = Unpacker(record, zero_copy=zero_copy)
+            WRITE4args.unpack(unpacker)
+            unpacker.release()
+        _time("WRITE4args 1MiB unpack (zero_copy=%s)" % zero_copy,
+              _unpack, 500)
+
+    reply = READ4resok(eof=False, data=payload)
+    def _pack_copy():
+        packer = Packer()
+        packer.gather_threshold = 2**32
+        reply.pack(packer)
+        return packer.get_buffers()
+    def _pack_gather():
+        packer = Packer()
+        reply.pack(packer)
+        return packer.get_buffers()
+    _time("READ4resok 1MiB pack (copied)", _pack_copy, 500)
+    _time("READ4resok 1MiB pack (gathered)", _pack_gather, 500)
+
+
+def bench_tcp_echo():
+    """
+    Throughput of 1MiB records echoed through tcp_server over loopback.
+    """
+    import threading
+    import time
+    from tcp import tcp_client, tcp_server
+
+    server = tcp_server(0)
+    stop = threading.Event()
+    def serve():
+        while not stop.is_set():
+            server.cycle_network(10)
+            while True:
+                m = server.pop_message()
+                if m is None: break
+                client_id, message = m
+                server.push_message(client_id, message)
+    thread = threading.Thread(target=serve)
+    thread.start()
+
+    client = tcp_client.connect("localhost", server.socket.getsockname()[1])
+    record = bytes(range(256)) * 4096
+    n = 100
+    window = 4
+    start = time.perf_counter()
+    sent = received = 0
+    while received < n:
+        while sent < n and sent - received < window:
+            client.push_message(record)
+            sent += 1
+        client.cycle_network(10)
+        while client.pop_message() is not None:
+            received += 1
+    seconds = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    print("%-40s %10.1f MiB/s" % ("1MiB echo records", 2 * n / seconds))
+
+
+def bench_many_connections():
+    """
+    Small-record echo rate through tcp_server with 100 busy connections
+    among 5,000 idle ones.
+    """
+    import resource
+    import selectors
+    import socket
+    import threading
+    import time
+    from tcp import tcp_server, _bytes_from_length
+
+    idle, busy, seconds = 5000, 100, 3.0
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    want = 2 * (idle + busy) + 64
+    if soft < want:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(want, hard), hard))
+
+    server = tcp_server(0)
+    address = ("localhost", server.socket.getsockname()[1])
+    stop = threading.Event()
+    def serve():
+        while not stop.is_set():
+            server.cycle_network(10)
+            while True:
+                m = server.pop_message()
+                if m is None: break
+                client_id, message = m
+                server.push_message(client_id, message)
+    thread = threading.Thread(target=serve)
+    thread.start()
+
+    sockets = [ socket.create_connection(address) for i in range(idle) ]
+    selector = selectors.DefaultSelector()
+    record = _bytes_from_length(64, True) + bytes(64)
+    for i in range(busy):
+        s = socket.create_connection(address)
+        sockets.append(s)
+        selector.register(s, selectors.EVENT_READ)
+        s.sendall(record)
+    while len(server.clients) < idle + busy:
+        time.sleep(0.01)
+
+    replies = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for key, mask in selector.select(0.1):
+            s = key.fileobj
+            data = s.recv(len(record))
+            while len(data) < len(record):
+                data += s.recv(len(record) - len(data))
+            replies += 1
+            s.sendall(record)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    for s in sockets:
+        s.close()
+    print("%-40s %10.0f replies/s"
+          % ("%d busy + %d idle connections" % (busy, idle),
+             replies / elapsed))
+
+
+def bench_rpc_latency():
+    """
+    Round-trip latency of back-to-back empty COMPOUND calls on one
+    connection, with rpc_server driven by cycle() and by serve_forever().
+    """
+    import asyncio
+    import contextlib
+    import io
+    import socket
+    import threading
+    import time
+    from xdr import Packer
+    from rpc import rpc_server, rpc_msg, msg_type, call_body, opaque_auth
+    from nfs import COMPOUND4args
+    from nfs_server import NFS4_PROGRAM
+    from tcp import _bytes_from_length
+
+    msg = rpc_msg(xid=1,
+                  body=rpc_msg.body(mtype=msg_type.CALL,
+                                    cbody=call_body(rpcvers=2,
+                                                    prog=100003,
+                                                    vers=4,
+                                                    proc=1,
+                                                    cred=opaque_auth.NONE(),
+                                                    verf=opaque_auth.NONE())))
+    packer = Packer()
+    msg.pack(packer)
+    COMPOUND4args(tag=b"", minorversion=0, argarray=[]).pack(packer)
+    call = packer.get_buffer()
+    record = _bytes_from_length(len(call), True) + call
+    n = 2000
+
+    def cycled(server, stop):
+        while not stop.is_set():
+            server.cycle(10)
+
+    def served(server, stop):
+        async def serve():
+            task = asyncio.ensure_future(server.serve_forever())
+            while not stop.is_set():
+                await asyncio.sleep(0.01)
+            task.cancel()
+        asyncio.run(serve())
+
+    for name, drive in (("cycle", cycled), ("serve_forever", served)):
+        server = rpc_server(0)
+        server.add_program(NFS4_PROGRAM())
+        stop = threading.Event()
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            thread = threading.Thread(target=drive, args=(server, stop))
+            thread.start()
+            s = socket.create_connection(("localhost",
+                                          server.tcp_server.socket.getsockname()[1]))
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            start = time.perf_counter()
+            for i in range(n):
+                s.sendall(record)
+                length = int.from_bytes(s.recv(4), "big") & 0x7fffffff
+                while length:
+                    length -= len(s.recv(length))
+                output.seek(0)
+                output.truncate()
+            seconds = time.perf_counter() - start
+            stop.set()
+            thread.join()
+            s.close()
+        _report("empty COMPOUND round-trip (%s)" % name, seconds, n)
+
+
+def bench_rpc_client():
+    """
+    Empty COMPOUND calls from one rpc_client connection to a
+    serve_forever() server in another process: one at a time with
+    .sync(), and pipelined with up to 64 calls in flight.
+    """
+    import asyncio
+    import contextlib
+    import io
+    import subprocess
+    import sys
+    import time
+    from rpc import rpc_client
+    from nfs import COMPOUND4args
+    from nfs_server import NFS4_PROGRAM
+    from tcp import tcp_client
+
+    child = subprocess.Popen(
+        [ sys.executable, "-c",
+          "import asyncio, sys\n"
+          "from rpc import rpc_server\n"
+          "from nfs_server import NFS4_PROGRAM\n"
+          "server = rpc_server(0)\n"
+          "server.add_program(NFS4_PROGRAM())\n"
+          "print(server.tcp_server.socket.getsockname()[1], file=sys.stderr)\n"
+          "asyncio.run(server.serve_forever())\n" ],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    port = int(child.stderr.readline())
+    args = COMPOUND4args(tag=b"", minorversion=0, argarray=[])
+    n = 2000
+
+    async def pipelined(client):
+        await asyncio.gather(*[ client.NFSPROC4_COMPOUND(args)
+                                for i in range(n) ])
+
+    results = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            client = rpc_client(NFS4_PROGRAM(), 4,
+                                tcp_client.connect("localhost", port))
+            start = time.perf_counter()
+            for i in range(n):
+                client.NFSPROC4_COMPOUND.sync(args)
+            results.append(("sync", time.perf_counter() - start))
+            client = rpc_client(NFS4_PROGRAM(), 4,
+                                tcp_client.connect("localhost", port),
+                                window=64)
+            start = time.perf_counter()
+            asyncio.run(pipelined(client))
+            results.append(("pipelined", time.perf_counter() - start))
+    finally:
+        child.kill()
+        child.wait()
+    for name, seconds in results:
+        _report("rpc_client empty COMPOUND (%s)" % name, seconds, n)
+
+
+def bench_rpc_null():
+    """
+    NFSv4 NULL calls through rpc_server.handle_message, with the
+    server's debug output discarded.
+    """
+    import contextlib
+    import io
+    from xdr import Packer
+    from rpc import rpc_server, rpc_msg, msg_type, call_body, opaque_auth
+    from nfs_server import NFS4_PROGRAM
+
+    server = rpc_server(0)
+    server.add_program(NFS4_PROGRAM())
+    msg = rpc_msg(xid=1,
+                  body=rpc_msg.body(mtype=msg_type.CALL,
+                                    cbody=call_body(rpcvers=2,
+                                                    prog=100003,
+                                                    vers=4,
+                                                    proc=0,
+                                                    cred=opaque_auth.NONE(),
+                                                    verf=opaque_auth.NONE())))
+    packer = Packer()
+    msg.pack(packer)
+    call = bytearray(packer.get_buffer())
+    output = io.StringIO()
+    def _null():
+        server.handle_message(call, 0)
+        output.seek(0)
+        output.truncate()
+    with contextlib.redirect_stdout(output):
+        seconds = min(_timeit.repeat(_null, number=5000, repeat=5))
+    _report("NULL call", seconds, 5000)
+
+
+def bench_entry4_memory():
+    """
+    Memory held per decoded READDIR entry4, measured with tracemalloc,
+    with scalars decoded as xdr objects and as plain values.
+    """
+    import tracemalloc
+    from xdr import Packer, Unpacker
+    from nfs import entry4, fattr4
+
+    packer = Packer()
+    entry4(cookie=7,
+           name=b"file-name-000.txt",
+           attrs=fattr4(attrmask=[ 0x0010011a, 0x00b0a23a ],
+                        attr_vals=bytes(96)),
+           nextentry=[]).pack(packer)
+    record = packer.get_buffer()
+    n = 2000
+    for plain in (False, True):
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        entries = [ entry4.unpack(Unpacker(record, plain=plain))
+                    for i in range(n) ]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        size = sum(s.size_diff for s in after.compare_to(before, "filename"))
+        # less the list holding them.
+        size -= 8 * n
+        print("%-40s %10.0f bytes" % ("entry4 (plain=%s)" % plain, size / n))
+        del entries
+
+
+def bench_numeric_array():
+    """
+    Encoding and decoding arrays of integers: a two word bitmap4, a full
+    set of AUTH_SYS gids and a large array of hypers.
+    """
+    from xdr import Packer, Unpacker, xdr_array, xdr_hyper
+    from nfs import bitmap4
+    from rpc import authsys_parms
+
+    gids = authsys_parms.gids
+    hypers = xdr_array(xdr_hyper)
+    for name, t, elements, n in (
+            ("bitmap4 (2)", bitmap4, [ 0x0010011a, 0x00b0a23a ], 50000),
+            ("gids (16)", gids, list(range(16)), 50000),
+            ("hyper array (4096)", hypers, list(range(4096)), 200)):
+        value = t(elements)
+        def pack():
+            packer = Packer()
+            value.pack(packer)
+            return packer.get_buffer()
+        record = pack()
+        _time("%s pack" % name, pack, n)
+        _time("%s unpack" % name, lambda: t.unpack(Unpacker(record)), n)
+
+
+def bench_linked_list():
+    """
+    Encoding and decoding a READDIR dirlist4, whose entries are a linked
+    list of entry4.
+    """
+    from xdr import Packer, Unpacker
+    from nfs import dirlist4, entry4, fattr4
+
+    entries = []
+    for i in range(200):
+        entries = [ entry4(cookie=i,
+                           name=b"file-name-%03d.txt" % i,
+                           attrs=fattr4(attrmask=[ 0x0010011a, 0x00b0a23a ],
+                                        attr_vals=bytes(96)),
+                           nextentry=entries) ]
+    value = dirlist4(entries=entries, eof=True)
+    def pack():
+        packer = Packer()
+        value.pack(packer)
+        return packer.get_buffer()
+    record = pack()
+    _time("dirlist4 (200) pack", pack, 500)
+    _time("dirlist4 (200) unpack",
+          lambda: dirlist4.unpack(Unpacker(record)), 500)
+
+
+def bench_enum():
+    """
+    Constructing enums, and the unions they discriminate, the way op
+    results are built.
+    """
+    from nfs import nfsstat4, nfs_opnum4, nfs_resop4, PUTFH4res, READDIR4res
+
+    _time("nfsstat4 (last value)",
+          lambda: nfsstat4(nfsstat4.NFS4ERR_CB_PATH_DOWN), 200000)
+    _time("nfs_opnum4", lambda: nfs_opnum4(nfs_opnum4.OP_PUTFH), 200000)
+    _time("READDIR4res (error)",
+          lambda: READDIR4res(status=nfsstat4.NFS4ERR_NOTDIR), 100000)
+    res = PUTFH4res(status=nfsstat4.NFS4_OK)
+    _time("nfs_resop4",
+          lambda: nfs_resop4(resop=nfs_opnum4.OP_PUTFH, opputfh=res), 100000)
+
+
+def bench_struct_construct():
+    """
+    Constructing a READDIR entry4 with and without validation.
+    """
+    from nfs import entry4, fattr4, component4
+
+    attrs = fattr4(attrmask=[ 0x0010011a, 0x00b0a23a ], attr_vals=bytes(96))
+    name = component4(b"file-name-000.txt")
+    _time("entry4 (validated, plain values)",
+          lambda: entry4(cookie=7, name=b"file-name-000.txt", attrs=attrs),
+          100000)
+    _time("entry4 (validated, xdr values)",
+          lambda: entry4(cookie=7, name=name, attrs=attrs), 100000)
+    _time("entry4 (trusted)",
+          lambda: entry4.trusted(cookie=7, name=name, attrs=attrs), 100000)
+
+
+def bench_lazy_decode():
+    """
+    Decoding a PUTFH, WRITE (64 KiB), GETATTR COMPOUND eagerly and with
+    Unpacker(lazy=True), both in full and when only the first op is
+    looked at (as when it fails).
+    """
+    from xdr import Packer, Unpacker
+    from nfs import COMPOUND4args, nfs_argop4, nfs_opnum4, PUTFH4args
+    from nfs import WRITE4args, GETATTR4args, stateid4, stable_how4
+
+    args = COMPOUND4args(
+        tag=b"write", minorversion=0,
+        argarray=[
+            nfs_argop4(argop=nfs_opnum4.OP_PUTFH,
+                       opputfh=PUTFH4args(object=bytes(32))),
+            nfs_argop4(argop=nfs_opnum4.OP_WRITE,
+                       opwrite=WRITE4args(stateid=stateid4(seqid=1,
+                                                           other=bytes(12)),
+                                          offset=0,
+                                          stable=stable_how4.UNSTABLE4,
+                                          data=bytes(65536))),
+            nfs_argop4(argop=nfs_opnum4.OP_GETATTR,
+                       opgetattr=GETATTR4args(attr_request=[ 0x0010011a,
+                                                             0x00b0a23a ])),
+        ])
+    packer = Packer()
+    args.pack(packer)
+    record = packer.get_buffer()
+
+    def full(lazy):
+        a = COMPOUND4args.unpack(Unpacker(record, zero_copy=True, lazy=lazy))
+        for op in a.argarray:
+            if op.argop == nfs_opnum4.OP_PUTFH:
+                op.opputfh.object
+            elif op.argop == nfs_opnum4.OP_WRITE:
+                w = op.opwrite
+                w.stateid, w.offset, w.stable, w.data
+            else:
+                op.opgetattr.attr_request
+
+    def first(lazy):
+        a = COMPOUND4args.unpack(Unpacker(record, zero_copy=True, lazy=lazy))
+        a.argarray[0].opputfh.object
+
+    n = 20000
+    for lazy in (False, True):
+        _time("COMPOUND all ops (lazy=%s)" % lazy, lambda: full(lazy), n)
+        _time("COMPOUND first op (lazy=%s)" % lazy, lambda: first(lazy), n)
+
+
+def bench_stream_decode():
+    """
+    Decoding a PUTFH, WRITE (4 MiB) COMPOUND arriving in 64 KiB pieces:
+    assembled into a record and then unpacked, or with a StreamUnpacker
+    writing the WRITE data to a sink as it arrives.  Also reports the
+    most memory held while doing so, and how many bytes had arrived when
+    PUTFH was available.
+    """
+    import tracemalloc
+    from xdr import Packer, Unpacker, StreamUnpacker
+    from nfs import COMPOUND4args, nfs_argop4, nfs_opnum4, PUTFH4args
+    from nfs import WRITE4args, stateid4, stable_how4
+
+    class null_file(object):
+        def write(self, data):
+            return len(data)
+
+    packer = Packer()
+    COMPOUND4args(
+        tag=b"write", minorversion=0,
+        argarray=[
+            nfs_argop4(argop=nfs_opnum4.OP_PUTFH,
+                       opputfh=PUTFH4args(object=bytes(32))),
+            nfs_argop4(argop=nfs_opnum4.OP_WRITE,
+                       opwrite=WRITE4args(stateid=stateid4(seqid=1,
+                                                           other=bytes(12)),
+                                          offset=0,
+                                          stable=stable_how4.UNSTABLE4,
+                                          data=bytes(4 << 20))),
+        ]).pack(packer)
+    record = bytes(packer.get_buffer())
+    pieces = [ record[i:i + 65536] for i in range(0, len(record), 65536) ]
+
+    def assembled():
+        buf = bytearray()
+        for piece in pieces:
+            buf += piece
+        args = COMPOUND4args.unpack(Unpacker(buf, zero_copy=True))
+        return len(buf)
+
+    def streamed():
+        decoder = StreamUnpacker(sink=lambda n: null_file())
+        decoder.expect_members(COMPOUND4args)
+        first = None
+        received = 0
+        for piece in pieces:
+            received += len(piece)
+            for name, value in decoder.feed(piece):
+                if first is None and name == "argarray":
+                    first = received
+        decoder.done()
+        return first
+
+    n = 20
+    for name, fxn in (("assembled", assembled), ("streamed", streamed)):
+        _time("4 MiB WRITE COMPOUND (%s)" % name, fxn, n)
+        tracemalloc.start()
+        first = fxn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("%-40s %10d bytes peak, PUTFH after %d bytes"
+              % ("  " + name, peak, first))
+
+
+def bench_stream_encode():
+    """
+    Sending a 2.5 MB COMPOUND4res (20000 GETATTR results) through
+    tcp_protocol to a transport that takes everything: packed whole, or
+    with Packer.pack_fragments in 64 KiB fragments.  Also reports the most
+    memory held while doing so.
+    """
+    import tracemalloc
+    from xdr import Packer
+    from nfs import COMPOUND4res, nfs_resop4, nfs_opnum4, GETATTR4res
+    from nfs import GETATTR4resok, fattr4, nfsstat4
+    from tcp import tcp_protocol
+
+    class null_transport(object):
+        def writelines(self, buffers):
+            for b in buffers:
+                pass
+
+    res = COMPOUND4res(
+        status=nfsstat4.NFS4_OK, tag=b"",
+        resarray=[ nfs_resop4(resop=nfs_opnum4.OP_GETATTR,
+                              opgetattr=GETATTR4res(
+                                  status=nfsstat4.NFS4_OK,
+                                  resok4=GETATTR4resok(
+                                      obj_attributes=fattr4(
+                                          attrmask=[ 0x0010011a, 0x00b0a23a ],
+                                          attr_vals=bytes(100)))))
+                   for i in range(20000) ])
+    protocol = tcp_protocol(None, 0)
+    protocol.connection_made(null_transport())
+
+    def whole():
+        packer = Packer()
+        res.pack(packer)
+        protocol.push_message(packer.get_buffers())
+
+    def fragments():
+        protocol.push_message(Packer().pack_fragments(res, 65536))
+
+    for name, fxn in (("whole", whole), ("fragments", fragments)):
+        _time("2.5 MB COMPOUND4res (%s)" % name, fxn, 10)
+        tracemalloc.start()
+        fxn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("%-40s %10d bytes peak" % ("  " + name, peak))
+
+
+def bench_nfs_read():
+    """
+    Sequential 1 MiB READs of a 64 MiB file on one connection, with the
+    data sent from the file (file_data) and with it read into the reply,
+    for rpc_server driven by cycle() and by serve_forever().
+    """
+    import asyncio
+    import contextlib
+    import io
+    import os
+    import shutil
+    import socket
+    import tempfile
+    import threading
+    import time
+    from xdr import Packer
+    from rpc import rpc_server, rpc_msg, msg_type, call_body, opaque_auth
+    from nfs import COMPOUND4args, nfs_argop4, nfs_opnum4, LOOKUP4args
+    from nfs import READ4args, stateid4
+    from nfs_server import NFS4_PROGRAM
+    from export import local_export
+    from tcp import _bytes_from_length
+
+    directory = tempfile.mkdtemp()
+    size = 64 << 20
+    chunk = 1 << 20
+    with open(os.path.join(directory, "file"), "wb") as f:
+        f.write(os.urandom(size))
+
+    def record(offset):
+        msg = rpc_msg(xid=1,
+                      body=rpc_msg.body(mtype=msg_type.CALL,
+                                        cbody=call_body(rpcvers=2,
+                                                        prog=100003,
+                                                        vers=4,
+                                                        proc=1,
+                                                        cred=opaque_auth.NONE(),
+                                                        verf=opaque_auth.NONE())))
+        packer = Packer()
+        msg.pack(packer)
+        COMPOUND4args(tag=b"", minorversion=0, argarray=[
+            nfs_argop4(argop=nfs_opnum4.OP_PUTROOTFH),
+            nfs_argop4(argop=nfs_opnum4.OP_LOOKUP,
+                       oplookup=LOOKUP4args(objname=b"file")),
+            nfs_argop4(argop=nfs_opnum4.OP_READ,
+                       opread=READ4args(stateid=stateid4(seqid=0,
+                                                         other=bytes(12)),
+                                        offset=offset,
+                                        count=chunk)),
+        ]).pack(packer)
+        call = packer.get_buffer()
+        return _bytes_from_length(len(call), True) + call
+    records = [ record(offset) for offset in range(0, size, chunk) ]
+    reply = bytearray(2 * chunk)
+
+    def receive(s):
+        view = memoryview(reply)
+        last = False
+        while not last:
+            mark = s.recv(4, socket.MSG_WAITALL)
+            length = int.from_bytes(mark, "big")
+            last = length >= 2**31
+            length &= 0x7fffffff
+            while length:
+                length -= s.recv_into(view, length)
+
+    def cycled(server, stop):
+        while not stop.is_set():
+            server.cycle(10)
+
+    def served(server, stop):
+        async def serve():
+            task = asyncio.ensure_future(server.serve_forever())
+            while not stop.is_set():
+                await asyncio.sleep(0.01)
+            task.cancel()
+        asyncio.run(serve())
+
+    for threshold, how in ((local_export.send_threshold, "file_data"),
+                           (2**32, "bytes")):
+        for name, drive in (("cycle", cycled), ("serve_forever", served)):
+            export = local_export(directory)
+            export.send_threshold = threshold
+            server = rpc_server(0, fragment_size=65536)
+            server.add_program(NFS4_PROGRAM(export))
+            stop = threading.Event()
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                thread = threading.Thread(target=drive, args=(server, stop))
+                thread.start()
+                s = socket.create_connection(("localhost",
+                                              server.tcp_server.socket.getsockname()[1]))
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                start = time.perf_counter()
+                for r in records:
+                    s.sendall(r)
+                    receive(s)
+                    output.seek(0)
+                    output.truncate()
+                seconds = time.perf_counter() - start
+                stop.set()
+                thread.join()
+                s.close()
+            export.close()
+            _report("1 MiB READ, %s (%s)" % (how, name), seconds, len(records))
+    shutil.rmtree(directory)
+
+
+def bench_nfs_write():
+    """
+    16 MiB written in 4 KiB WRITEs (PUTFH, WRITE) through NFSPROC4_COMPOUND,
+    UNSTABLE4 with one COMMIT at the end against FILE_SYNC4.
+    """
+    import contextlib
+    import io
+    import os
+    import shutil
+    import tempfile
+    import time
+    from nfs import COMPOUND4args, nfs_argop4, nfs_opnum4, PUTFH4args
+    from nfs import WRITE4args, COMMIT4args, stateid4, stable_how4
+    from nfs_server import NFS4_PROGRAM
+    from export import local_export
+
+    directory = tempfile.mkdtemp()
+    size = 16 << 20
+    chunk = 4096
+    data = os.urandom(chunk)
+    for stable in (stable_how4.UNSTABLE4, stable_how4.FILE_SYNC4):
+        path = os.path.join(directory, "file")
+        open(path, "wb").close()
+        export = local_export(directory)
+        fh = export.lookup(export.root(), b"file")
+        program = NFS4_PROGRAM(export)
+        putfh = nfs_argop4(argop=nfs_opnum4.OP_PUTFH,
+                           opputfh=PUTFH4args(object=fh))
+        calls = [ COMPOUND4args(tag=b"", minorversion=0, argarray=[
+            putfh,
+            nfs_argop4(argop=nfs_opnum4.OP_WRITE,
+                       opwrite=WRITE4args(stateid=stateid4(seqid=0,
+                                                           other=bytes(12)),
+                                          offset=offset,
+                                          stable=stable,
+                                          data=data)) ])
+                  for offset in range(0, size, chunk) ]
+        commit = COMPOUND4args(tag=b"", minorversion=0, argarray=[
+            putfh,
+            nfs_argop4(argop=nfs_opnum4.OP_COMMIT,
+                       opcommit=COMMIT4args(offset=0, count=0)) ])
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for args in calls:
+                program.NFS_V4.NFSPROC4_COMPOUND(None, args)
+            program.NFS_V4.NFSPROC4_COMPOUND(None, commit)
+            seconds = time.perf_counter() - start
+        export.close()
+        assert os.path.getsize(path) == size
+        name = stable_how4._xdr_names[stable]
+        _report("4 KiB WRITE, %s" % name, seconds, len(calls))
+    shutil.rmtree(directory)
+
+
+def bench_fattr():
+    """
+    The attributes Linux clients ask for after most operations: packed
+    attribute by attribute through the generated types, by the compiled
+    encoder of the bitmap, and from the attribute cache; then READDIR of
+    1000 files with those attributes, through NFSPROC4_COMPOUND.
+    """
+    import contextlib
+    import io
+    import os
+    import shutil
+    import tempfile
+    import nfs
+    from xdr import Packer
+    from nfs import COMPOUND4args, nfs_argop4, nfs_opnum4, PUTFH4args
+    from nfs import READDIR4args, bitmap4, fsid4, specdata4, nfstime4
+    from fattr import fattr_encoder, attr_cache, _linux_getattr, _words
+    from fattr import _types
+    from nfs_server import NFS4_PROGRAM
+    from export import local_export
+
+    directory = tempfile.mkdtemp()
+    for i in range(1000):
+        open(os.path.join(directory, "file%04d" % i), "wb").close()
+    export = local_export(directory)
+    fh = export.lookup(export.root(), b"file0000")
+    st, change, size, mtime_ns = export.stat(fh)
+    bitmap = bitmap4(_words(_linux_getattr))
+
+    def time(ns):
+        seconds, nseconds = divmod(ns, 10**9)
+        return nfstime4(seconds=seconds, nseconds=nseconds)
+
+    def generic():
+        values = {
+            nfs.FATTR4_TYPE: nfs.fattr4_type(_types[st.st_mode & 0o170000]),
+            nfs.FATTR4_CHANGE: nfs.fattr4_change(change),
+            nfs.FATTR4_SIZE: nfs.fattr4_size(size),
+            nfs.FATTR4_FSID: fsid4(major=st.st_dev, minor=0),
+            nfs.FATTR4_FILEID: nfs.fattr4_fileid(st.st_ino),
+            nfs.FATTR4_MODE: nfs.fattr4_mode(st.st_mode & 0o7777),
+            nfs.FATTR4_NUMLINKS: nfs.fattr4_numlinks(st.st_nlink),
+            nfs.FATTR4_OWNER: nfs.fattr4_owner(str(st.st_uid).encode()),
+            nfs.FATTR4_OWNER_GROUP:
+                nfs.fattr4_owner_group(str(st.st_gid).encode()),
+            nfs.FATTR4_RAWDEV: specdata4(specdata1=os.major(st.st_rdev),
+                                         specdata2=os.minor(st.st_rdev)),
+            nfs.FATTR4_SPACE_USED: nfs.fattr4_space_used(st.st_blocks * 512),
+            nfs.FATTR4_TIME_ACCESS: time(st.st_atime_ns),
+            nfs.FATTR4_TIME_METADATA:
+                time(st.st_ctime_ns),
+            nfs.FATTR4_TIME_MODIFY: time(mtime_ns),
+            nfs.FATTR4_MOUNTED_ON_FILEID:
+                nfs.fattr4_mounted_on_fileid(st.st_ino),
+        }
+        packer = Packer()
+        for a in sorted(values):
+            values[a].pack(packer)
+        return packer.get_buffer()
+
+    encoder = fattr_encoder.get(bitmap)
+    assert generic() == encoder.encode(st, fh, change, size, mtime_ns, None)
+    cache = attr_cache()
+    _time("fattr4, generic types", generic, 2000)
+    _time("fattr4, compiled encoder",
+          lambda: encoder.fattr(st, fh, change, size, mtime_ns), 20000)
+    _time("fattr4, attribute cache",
+          lambda: cache.get(fh, bitmap, st, change, size, mtime_ns, None),
+          20000)
+
+    args = COMPOUND4args(tag=b"", minorversion=0, argarray=[
+        nfs_argop4(argop=nfs_opnum4.OP_PUTFH,
+                   opputfh=PUTFH4args(object=export.root())),
+        nfs_argop4(argop=nfs_opnum4.OP_READDIR,
+                   opreaddir=READDIR4args(cookie=0, cookieverf=bytes(8),
+                                          dircount=1 << 20, maxcount=1 << 20,
+                                          attr_request=bitmap)) ])
+
+    def readdir(program):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = program.NFS_V4.NFSPROC4_COMPOUND(None, args)
+        assert len(result.resarray[1].opreaddir.resok4.reply.entries) == 1000
+
+    _time("READDIR of 1000, attributes encoded",
+          lambda: readdir(NFS4_PROGRAM(export)), 5)
+    program = NFS4_PROGRAM(export)
+    _time("READDIR of 1000, attributes cached",
+          lambda: readdir(program), 5)
+    export.close()
+    shutil.rmtree(directory)
+
+
+BENCHMARKS = {
+    "xdr_codec": bench_xdr_codec,
+    "packer": bench_packer,
+    "zero_copy": bench_zero_copy,
+    "tcp_echo": bench_tcp_echo,
+    "many_connections": bench_many_connections,
+    "rpc_latency": bench_rpc_latency,
+    "rpc_client": bench_rpc_client,
+    "rpc_null": bench_rpc_null,
+    "entry4_memory": bench_entry4_memory,
+    "numeric_array": bench_numeric_array,
+    "linked_list": bench_linked_list,
+    "enum": bench_enum,
+    "struct_construct": bench_struct_construct,
+    "lazy_decode": bench_lazy_decode,
+    "stream_decode": bench_stream_decode,
+    "stream_encode": bench_stream_encode,
+    "nfs_read": bench_nfs_read,
+    "nfs_write": bench_nfs_write,
+    "fattr": bench_fattr,
+}
+
+
+if __name__ == "__main__":
+    import sys
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
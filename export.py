@@ -0,0 +1,577 @@
+"""
+Exports: the filesystems an NFS server serves.
+An export gives out filehandles (nfs_fh4) for its files and resolves them
+again.  nfs_server's NFS_V4 uses these methods of one:
+
+    root()                 the handle of the export's root
+    check(fh)              fh, if it is a handle of the export
+    lookup(fh, name)       the handle of name in the directory fh
+    parent(fh)             the handle of the directory holding fh
+    kind(fh)               the file type of fh, as stat.S_IFMT gives it
+    file(fh)               fh, open (an io.FileIO)
+    fd(fh)                 an open file descriptor on fh
+    read(fh, offset, n)    (up to n bytes of fh from offset, eof): the
+                           data as bytes or as an xdr.file_data
+    write(fh, offset, data, stable)
+                           write data (bytes, or a file a StreamUnpacker's
+                           sink filled) to fh at offset, with a
+                           stable_how4; returns (bytes written,
+                           stable_how4 achieved)
+    commit(fh, offset, n)  make what was written to fh stable
+    stat(fh)               (os.stat_result, change, size, mtime_ns) of fh,
+                           the last three as its pending writes leave them
+    statvfs(fh)            the os.statvfs_result of fh's filesystem
+    readdir(fh)            (cookie verifier, the sorted names in fh)
+    child(fh, name)        (handle, stat(handle)) of name in fh
+
+Failures raise export_error with the nfsstat4 to return, or OSError,
+which status_of translates.
+"""
+
+import bisect as _bisect
+import collections as _collections
+import errno as _errno
+import io as _io
+import itertools as _itertools
+import os as _os
+import stat as _stat
+import struct as _struct
+import threading as _threading
+import time as _time
+
+from nfs import nfsstat4, stable_how4, NFS4_FHSIZE
+from xdr import file_data
+
+
+class export_error(Exception):
+    """
+    An operation on an export that failed with an nfsstat4 status.
+    """
+    def __init__(self, status):
+        Exception.__init__(self, status)
+        self.status = status
+
+
+_errno_status = {
+    _errno.EPERM: nfsstat4.NFS4ERR_PERM,
+    _errno.ENOENT: nfsstat4.NFS4ERR_NOENT,
+    _errno.EIO: nfsstat4.NFS4ERR_IO,
+    _errno.ENXIO: nfsstat4.NFS4ERR_NXIO,
+    _errno.EACCES: nfsstat4.NFS4ERR_ACCESS,
+    _errno.EEXIST: nfsstat4.NFS4ERR_EXIST,
+    _errno.EXDEV: nfsstat4.NFS4ERR_XDEV,
+    _errno.ENOTDIR: nfsstat4.NFS4ERR_NOTDIR,
+    _errno.EISDIR: nfsstat4.NFS4ERR_ISDIR,
+    _errno.EINVAL: nfsstat4.NFS4ERR_INVAL,
+    _errno.EFBIG: nfsstat4.NFS4ERR_FBIG,
+    _errno.ENOSPC: nfsstat4.NFS4ERR_NOSPC,
+    _errno.EROFS: nfsstat4.NFS4ERR_ROFS,
+    _errno.EMLINK: nfsstat4.NFS4ERR_MLINK,
+    _errno.ENAMETOOLONG: nfsstat4.NFS4ERR_NAMETOOLONG,
+    _errno.ENOTEMPTY: nfsstat4.NFS4ERR_NOTEMPTY,
+    _errno.EDQUOT: nfsstat4.NFS4ERR_DQUOT,
+    _errno.ESTALE: nfsstat4.NFS4ERR_STALE,
+    _errno.ELOOP: nfsstat4.NFS4ERR_SYMLINK,
+}
+
+def status_of(error):
+    """
+    The nfsstat4 for an export_error or OSError.
+    """
+    if isinstance(error, export_error):
+        return error.status
+    return _errno_status.get(error.errno, nfsstat4.NFS4ERR_SERVERFAULT)
+
+
+# a handle is the (st_dev, st_ino, generation) of its file.  Linux does
+# not report inode generations to user space, so there it is always 0
+# and a reused inode number is only caught when the file is opened.
+_handle_format = _struct.Struct(">QQI")
+assert _handle_format.size <= NFS4_FHSIZE
+
+def _handle(st):
+    return _handle_format.pack(st.st_dev, st.st_ino,
+                               getattr(st, "st_gen", 0) & 0xffffffff)
+
+
+# the most buffers handed to a single pwritev call.
+_IOV_MAX = 1024
+_fdatasync = getattr(_os, "fdatasync", _os.fsync)
+
+def _pwritev_all(fd, buffers, offset):
+    """
+    Write contiguous buffers to fd from offset, in as few calls as
+    pwritev allows.
+    """
+    if not hasattr(_os, "pwritev"):
+        _os.pwrite(fd, b"".join(buffers), offset)
+        return
+    buffers = _collections.deque(memoryview(b).cast("B") for b in buffers)
+    while buffers:
+        n = _os.pwritev(fd, list(_itertools.islice(buffers, _IOV_MAX)),
+                        offset)
+        offset += n
+        while n:
+            b = buffers[0]
+            if n < len(b):
+                buffers[0] = b[n:]
+                break
+            n -= len(b)
+            buffers.popleft()
+
+_copy_file_range = getattr(_os, "copy_file_range", None)
+
+def _copy_file(src, fd, offset):
+    """
+    Write what was written to the file src to fd from offset, without
+    reading it into memory where the kernel can copy it; returns how
+    many bytes were copied.
+    """
+    if hasattr(src, "flush"):
+        src.flush()
+    n = src.tell()
+    copied = 0
+    try:
+        src_fd = src.fileno()
+    except (AttributeError, OSError, _io.UnsupportedOperation):
+        src_fd = None
+    if src_fd is not None and _copy_file_range is not None:
+        try:
+            while copied < n:
+                k = _copy_file_range(src_fd, fd, n - copied, copied,
+                                     offset + copied)
+                if not k:
+                    return copied
+                copied += k
+            return copied
+        except OSError as e:
+            # across filesystems on older kernels, or unsupported by one.
+            if copied or e.errno not in (_errno.EXDEV, _errno.ENOSYS,
+                                         _errno.EINVAL, _errno.EOPNOTSUPP):
+                raise
+    src.seek(0)
+    while copied < n:
+        chunk = src.read(min(n - copied, 1 << 20))
+        if not chunk:
+            break
+        _pwritev_all(fd, [chunk], offset + copied)
+        copied += len(chunk)
+    return copied
+
+
+class _dirty_file(object):
+    """
+    The data written to a file that is not yet written to it.
+    extents are the [start, end, buffers] of runs of contiguous data,
+    sorted, neither overlapping nor adjacent; starts are their starts, for
+    bisection.  size is how many bytes they hold, end where the last of
+    them ends, and changed the time (in ns) of the last write.  lock is
+    held while the extents change or are being written out; error is the
+    OSError the last attempt to write them out failed with.
+    """
+    __slots__ = ("file", "extents", "starts", "size", "end", "changed",
+                 "lock", "error")
+
+    def __init__(self, file):
+        self.file = file
+        self.extents = []
+        self.starts = []
+        self.size = 0
+        self.end = 0
+        self.changed = 0
+        self.lock = _threading.Lock()
+        self.error = None
+
+    def add(self, offset, data):
+        """
+        Add data to be written at offset, over any data already there.
+        Returns how much size grew.
+        """
+        if not data:
+            # nothing to write: no extent, and the file does not grow.
+            return 0
+        end = offset + len(data)
+        extents, starts = self.extents, self.starts
+        # the extents from i to j overlap or touch [offset, end).
+        i = _bisect.bisect_left(starts, offset)
+        if i and extents[i - 1][1] >= offset:
+            i -= 1
+        j = _bisect.bisect_right(starts, end)
+        if i == j:
+            extents.insert(i, [offset, end, [data]])
+            starts.insert(i, offset)
+            grown = len(data)
+        elif j == i + 1 and extents[i][1] == offset:
+            # the common case of sequential writes: data carries on from
+            # where an extent ends, and is kept as it is.
+            extents[i][1] = end
+            extents[i][2].append(data)
+            grown = len(data)
+        else:
+            start = min(offset, extents[i][0])
+            stop = max(end, extents[j - 1][1])
+            merged = bytearray(stop - start)
+            grown = stop - start
+            for s, e, buffers in extents[i:j]:
+                merged[s - start:e - start] = b"".join(buffers)
+                grown -= e - s
+            merged[offset - start:end - start] = data
+            extents[i:j] = [ [start, stop, [merged]] ]
+            starts[i:j] = [ start ]
+        self.size += grown
+        self.end = max(self.end, end)
+        self.changed = _time.time_ns()
+        return grown
+
+    def flush(self):
+        """
+        Write the extents out; the lock must be held.  Returns how many
+        bytes were written.  If writing fails, the extents are kept to be
+        written again and the OSError raised.
+        """
+        extents, size = self.extents, self.size
+        self.extents, self.starts, self.size = [], [], 0
+        fd = self.file.fileno()
+        try:
+            for start, end, buffers in extents:
+                _pwritev_all(fd, buffers, start)
+        except OSError as e:
+            for start, end, buffers in extents:
+                self.add(start, b"".join(buffers))
+            self.error = e
+            raise
+        self.error = None
+        return size
+
+
+class local_export(object):
+    """
+    A directory of the local filesystem.
+    The path of each handle given out is kept in an index holding the
+    max_handles most recently used; a handle that has fallen out of it,
+    or was given out before the server restarted, is NFS4ERR_STALE, and
+    the client looks its file up again.  The max_files most recently
+    used files are kept open, so that reads and writes to a file open and
+    check it only once.  Reads of send_threshold bytes or more return
+    file_data, which the reply reads (or sends) straight from the file.
+
+    UNSTABLE4 writes are kept in memory, with adjacent and overlapping
+    writes to a file merged, and written out in pwritev calls of whole
+    runs by a background thread: once flush_size bytes are waiting, and
+    otherwise every flush_interval seconds.  A file's writes are
+    written out before it is read or written stably, and at a COMMIT,
+    which then syncs it.  Once max_dirty bytes are waiting, further writes
+    to a file write it out at once.
+    """
+    # reads of at least this many bytes are returned as file_data.
+    send_threshold = 4096
+    flush_size = 4 << 20
+    flush_interval = 1.0
+    max_dirty = 64 << 20
+    # how many directories' listings are kept for READDIR.
+    max_listings = 64
+
+    def __init__(self, root, max_handles=65536, max_files=256):
+        self.root_path = _os.path.abspath(root)
+        st = _os.stat(self.root_path)
+        if not _stat.S_ISDIR(st.st_mode):
+            raise NotADirectoryError(_errno.ENOTDIR, "not a directory",
+                                     self.root_path)
+        self.root_fh = _handle(st)
+        self.root_entry = (self.root_path, _stat.S_IFDIR)
+        # {fh: (path, file type)}, least recently used first.
+        self.handles = _collections.OrderedDict()
+        self.max_handles = max_handles
+        # {fh: open io.FileIO}, least recently used first.
+        self.files = _collections.OrderedDict()
+        self.max_files = max_files
+        # {fh: (mtime_ns, sorted names)} of directories read, least
+        # recently used first.
+        self.listings = _collections.OrderedDict()
+        # {fh: _dirty_file} and the bytes they hold, under dirty_lock;
+        # the thread that writes them out is started by the first
+        # UNSTABLE4 write.
+        self.dirty = {}
+        self.dirty_bytes = 0
+        self.dirty_lock = _threading.Condition()
+        self.flusher = None
+        self.closing = False
+
+    def _entry(self, fh):
+        """
+        The (path, file type) of a handle.
+        """
+        if fh == self.root_fh:
+            return self.root_entry
+        try:
+            entry = self.handles[fh]
+        except KeyError:
+            if len(fh) != _handle_format.size:
+                raise export_error(nfsstat4.NFS4ERR_BADHANDLE) from None
+            # searching the export for it would let any client make the
+            # server walk the whole tree with made-up handles.
+            raise export_error(nfsstat4.NFS4ERR_STALE) from None
+        self.handles.move_to_end(fh)
+        return entry
+
+    def _checked(self, fh):
+        """
+        The (path, file type, os.stat_result) of a handle, once its path
+        has been checked to still hold its file: a file renamed or removed
+        since the handle was given out is NFS4ERR_STALE, until it is
+        looked up again.
+        """
+        path, kind = self._entry(fh)
+        try:
+            # the root itself may be a symbolic link.
+            st = (_os.stat if fh == self.root_fh else _os.lstat)(path)
+        except FileNotFoundError:
+            st = None
+        if st is None or _handle(st) != fh:
+            self.handles.pop(fh, None)
+            raise export_error(nfsstat4.NFS4ERR_STALE)
+        return path, kind, st
+
+    def _add(self, path, st):
+        fh = _handle(st)
+        if fh != self.root_fh:
+            self.handles[fh] = (path, _stat.S_IFMT(st.st_mode))
+            self.handles.move_to_end(fh)
+            if len(self.handles) > self.max_handles:
+                self.handles.popitem(last=False)
+        return fh
+
+    def root(self):
+        return self.root_fh
+
+    def check(self, fh):
+        self._entry(fh)
+        return fh
+
+    def kind(self, fh):
+        return self._entry(fh)[1]
+
+    def path(self, fh):
+        return self._entry(fh)[0]
+
+    def lookup(self, fh, name):
+        path, kind, st = self._checked(fh)
+        if kind == _stat.S_IFLNK:
+            raise export_error(nfsstat4.NFS4ERR_SYMLINK)
+        if kind != _stat.S_IFDIR:
+            raise export_error(nfsstat4.NFS4ERR_NOTDIR)
+        if not name:
+            raise export_error(nfsstat4.NFS4ERR_INVAL)
+        if name in (b".", b".."):
+            raise export_error(nfsstat4.NFS4ERR_BADNAME)
+        if b"/" in name or b"\0" in name:
+            raise export_error(nfsstat4.NFS4ERR_BADCHAR)
+        try:
+            name = name.decode("utf-8")
+        except UnicodeDecodeError:
+            raise export_error(nfsstat4.NFS4ERR_INVAL) from None
+        child = _os.path.join(path, name)
+        # not following symbolic links keeps lookups inside the export.
+        return self._add(child, _os.lstat(child))
+
+    def parent(self, fh):
+        path, kind, st = self._checked(fh)
+        if kind != _stat.S_IFDIR:
+            raise export_error(nfsstat4.NFS4ERR_NOTDIR)
+        if fh == self.root_fh:
+            raise export_error(nfsstat4.NFS4ERR_NOENT)
+        parent = _os.path.dirname(path)
+        return self._add(parent, _os.lstat(parent))
+
+    def file(self, fh):
+        try:
+            file = self.files[fh]
+        except KeyError:
+            pass
+        else:
+            self.files.move_to_end(fh)
+            return file
+        path, kind = self._entry(fh)
+        if kind != _stat.S_IFREG:
+            raise export_error(nfsstat4.NFS4ERR_ISDIR
+                               if kind == _stat.S_IFDIR
+                               else nfsstat4.NFS4ERR_INVAL)
+        flags = _os.O_NOFOLLOW | _os.O_CLOEXEC
+        try:
+            file = _io.FileIO(_os.open(path, _os.O_RDWR | flags), "r+")
+        except OSError as e:
+            if e.errno not in (_errno.EACCES, _errno.EPERM, _errno.EROFS):
+                raise
+            file = _io.FileIO(_os.open(path, _os.O_RDONLY | flags), "r")
+        # the path may have been given to another file since the handle
+        # was given out.
+        if _handle(_os.fstat(file.fileno())) != fh:
+            file.close()
+            self.handles.pop(fh, None)
+            raise export_error(nfsstat4.NFS4ERR_STALE)
+        self.files[fh] = file
+        if len(self.files) > self.max_files:
+            # closed once nothing else (such as a reply still being sent)
+            # refers to it.
+            self.files.popitem(last=False)
+        return file
+
+    def fd(self, fh):
+        return self.file(fh).fileno()
+
+    def read(self, fh, offset, count):
+        file = self.file(fh)
+        fd = file.fileno()
+        if fh in self.dirty:
+            self._flush(fh)
+        if count < self.send_threshold:
+            data = _os.pread(fd, count, offset)
+            eof = len(data) < count or _os.fstat(fd).st_size <= offset + count
+            return data, eof
+        size = _os.fstat(fd).st_size
+        count = max(0, min(count, size - offset))
+        return file_data(file, offset, count), offset + count >= size
+
+    def stat(self, fh):
+        file = self.files.get(fh)
+        if file is not None:
+            st = _os.fstat(file.fileno())
+        else:
+            st = self._checked(fh)[2]
+        dirty = self.dirty.get(fh)
+        if dirty is None:
+            return st, st.st_ctime_ns, st.st_size, st.st_mtime_ns
+        # written out, the pending writes would change the file's
+        # ctime and mtime to about when they were made.
+        return (st, max(st.st_ctime_ns, dirty.changed),
+                max(st.st_size, dirty.end), max(st.st_mtime_ns, dirty.changed))
+
+    def statvfs(self, fh):
+        return _os.statvfs(self._entry(fh)[0])
+
+    def readdir(self, fh):
+        path, kind, st = self._checked(fh)
+        if kind != _stat.S_IFDIR:
+            raise export_error(nfsstat4.NFS4ERR_NOTDIR)
+        mtime_ns = st.st_mtime_ns
+        listing = self.listings.get(fh)
+        if listing is None or listing[0] != mtime_ns:
+            names = sorted(_os.fsencode(name) for name in _os.listdir(path))
+            listing = self.listings[fh] = (mtime_ns, names)
+            if len(self.listings) > self.max_listings:
+                self.listings.popitem(last=False)
+        self.listings.move_to_end(fh)
+        return _struct.pack(">Q", mtime_ns), listing[1]
+
+    def child(self, fh, name):
+        path = _os.path.join(self._entry(fh)[0], _os.fsdecode(name))
+        st = _os.lstat(path)
+        child = self._add(path, st)
+        dirty = self.dirty.get(child)
+        if dirty is None:
+            return child, (st, st.st_ctime_ns, st.st_size, st.st_mtime_ns)
+        return child, self.stat(child)
+
+    def write(self, fh, offset, data, stable):
+        """
+        data must not change once it has been given: it is kept (not
+        copied) until it is written out.  A sunk file is copied into fh
+        at once, after fh's pending writes, which it may overwrite.
+        """
+        file = self.file(fh)
+        if not file.writable():
+            raise export_error(nfsstat4.NFS4ERR_ACCESS)
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            if fh in self.dirty:
+                self._flush(fh)
+            count = _copy_file(data, file.fileno(), offset)
+            if stable == stable_how4.DATA_SYNC4:
+                _fdatasync(file.fileno())
+            elif stable == stable_how4.FILE_SYNC4:
+                _os.fsync(file.fileno())
+            return count, stable
+        with self.dirty_lock:
+            dirty = self.dirty.get(fh)
+            if dirty is None:
+                dirty = self.dirty[fh] = _dirty_file(file)
+        with dirty.lock:
+            grown = dirty.add(offset, data)
+        with self.dirty_lock:
+            self.dirty_bytes += grown
+            if self.dirty_bytes >= self.flush_size:
+                self.dirty_lock.notify()
+            backlog = self.dirty_bytes > self.max_dirty
+        if stable == stable_how4.UNSTABLE4:
+            if self.flusher is None:
+                self.flusher = _threading.Thread(target=self._flusher,
+                                                 name="write-behind",
+                                                 daemon=True)
+                self.flusher.start()
+            if backlog:
+                self._flush(fh)
+            return len(data), stable_how4.UNSTABLE4
+        self._flush(fh)
+        if stable == stable_how4.DATA_SYNC4:
+            _fdatasync(file.fileno())
+        else:
+            _os.fsync(file.fileno())
+        return len(data), stable
+
+    def commit(self, fh, offset, count):
+        # all of the file is written out and synced, whatever the range.
+        file = self.file(fh)
+        if fh in self.dirty:
+            self._flush(fh)
+        _os.fsync(file.fileno())
+
+    def _flush(self, fh):
+        """
+        Write out a file's writes, from the thread serving requests.
+        """
+        dirty = self.dirty[fh]
+        with dirty.lock:
+            written = dirty.flush()
+        with self.dirty_lock:
+            self.dirty_bytes -= written
+            # only this thread adds to dirty, so nothing can be added to
+            # a file's _dirty_file once it is dropped.
+            if not dirty.size:
+                del self.dirty[fh]
+
+    def _flusher(self):
+        """
+        The thread writing out UNSTABLE4 writes in the background.
+        """
+        while True:
+            with self.dirty_lock:
+                if self.dirty_bytes < self.flush_size and not self.closing:
+                    self.dirty_lock.wait(self.flush_interval)
+                if self.closing:
+                    return
+                files = list(self.dirty.values())
+            for dirty in files:
+                with dirty.lock:
+                    if dirty.error is not None or not dirty.size:
+                        # a failed file is left for a COMMIT to retry.
+                        continue
+                    try:
+                        written = dirty.flush()
+                    except OSError:
+                        continue
+                with self.dirty_lock:
+                    self.dirty_bytes -= written
+
+    def close(self):
+        """
+        Write out what has been written, and close the cached files.
+        """
+        with self.dirty_lock:
+            self.closing = True
+            self.dirty_lock.notify()
+        if self.flusher is not None:
+            self.flusher.join()
+            self.flusher = None
+        for fh in list(self.dirty):
+            self._flush(fh)
+        while self.files:
+            self.files.popitem()[1].close()
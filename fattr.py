@@ -0,0 +1,248 @@
+"""
+File attributes (fattr4) for local files.
+An fattr4 is a bitmap of attributes and their values, packed back to back
+in attr_vals.  fattr_encoder(bitmap) compiles a function packing the
+attributes a local file has, from its os.stat_result, with one
+precompiled struct.Struct for each run of fixed-size values; encoders are
+kept for each bitmap asked for, and made in advance for the bitmaps Linux
+clients send.  An attr_cache keeps the fattr4 encoded for a filehandle
+for as long as the file's change attribute, mtime and atime stay the
+same.
+"""
+
+import collections as _collections
+import os as _os
+import stat as _stat
+import struct as _struct
+
+from nfs import *
+
+LEASE_TIME = 90
+MAXREAD = 1048576
+MAXWRITE = 1048576
+
+_NS = 1000000000
+
+_types = {
+    _stat.S_IFREG: nfs_ftype4.NF4REG,
+    _stat.S_IFDIR: nfs_ftype4.NF4DIR,
+    _stat.S_IFBLK: nfs_ftype4.NF4BLK,
+    _stat.S_IFCHR: nfs_ftype4.NF4CHR,
+    _stat.S_IFLNK: nfs_ftype4.NF4LNK,
+    _stat.S_IFSOCK: nfs_ftype4.NF4SOCK,
+    _stat.S_IFIFO: nfs_ftype4.NF4FIFO,
+}
+
+# The attributes that can be read, as (struct format, expression) for
+# fixed-size values and (None, expression) for variable-size ones.  The
+# expressions are in terms of the encoder's arguments (see fattr_encoder);
+# fs is only there for the attributes that use it.
+_attributes = {
+    FATTR4_SUPPORTED_ATTRS: (None, "_supported"),
+    FATTR4_TYPE: ("I", "_types[st.st_mode & 0o170000]"),
+    # handles are kept in an index of limited size (see local_export).
+    FATTR4_FH_EXPIRE_TYPE: ("I", "%d" % FH4_VOLATILE_ANY),
+    FATTR4_CHANGE: ("Q", "change"),
+    FATTR4_SIZE: ("Q", "size"),
+    FATTR4_LINK_SUPPORT: ("I", "1"),
+    FATTR4_SYMLINK_SUPPORT: ("I", "1"),
+    FATTR4_NAMED_ATTR: ("I", "0"),
+    FATTR4_FSID: ("QQ", "st.st_dev, 0"),
+    FATTR4_UNIQUE_HANDLES: ("I", "1"),
+    FATTR4_LEASE_TIME: ("I", "%d" % LEASE_TIME),
+    FATTR4_RDATTR_ERROR: ("i", "%d" % nfsstat4.NFS4_OK),
+    FATTR4_ACLSUPPORT: ("I", "0"),
+    FATTR4_CASE_INSENSITIVE: ("I", "0"),
+    FATTR4_CASE_PRESERVING: ("I", "1"),
+    FATTR4_CHOWN_RESTRICTED: ("I", "1"),
+    FATTR4_FILEHANDLE: (None, "_opaque(fh)"),
+    FATTR4_FILEID: ("Q", "st.st_ino"),
+    FATTR4_FILES_AVAIL: ("Q", "fs.f_favail"),
+    FATTR4_FILES_FREE: ("Q", "fs.f_ffree"),
+    FATTR4_FILES_TOTAL: ("Q", "fs.f_files"),
+    FATTR4_HOMOGENEOUS: ("I", "1"),
+    FATTR4_MAXFILESIZE: ("Q", "%d" % (2**63 - 1)),
+    FATTR4_MAXNAME: ("I", "fs.f_namemax"),
+    FATTR4_MAXREAD: ("Q", "%d" % MAXREAD),
+    FATTR4_MAXWRITE: ("Q", "%d" % MAXWRITE),
+    FATTR4_MODE: ("I", "st.st_mode & 0o7777"),
+    FATTR4_NO_TRUNC: ("I", "1"),
+    FATTR4_NUMLINKS: ("I", "st.st_nlink"),
+    FATTR4_OWNER: (None, "_owner(st.st_uid)"),
+    FATTR4_OWNER_GROUP: (None, "_owner(st.st_gid)"),
+    FATTR4_RAWDEV: ("II", "_major(st.st_rdev), _minor(st.st_rdev)"),
+    FATTR4_SPACE_AVAIL: ("Q", "fs.f_bavail * fs.f_frsize"),
+    FATTR4_SPACE_FREE: ("Q", "fs.f_bfree * fs.f_frsize"),
+    FATTR4_SPACE_TOTAL: ("Q", "fs.f_blocks * fs.f_frsize"),
+    FATTR4_SPACE_USED: ("Q", "st.st_blocks * 512"),
+    FATTR4_TIME_ACCESS: ("qI", "*divmod(st.st_atime_ns, %d)" % _NS),
+    FATTR4_TIME_DELTA: ("qI", "0, 1"),
+    FATTR4_TIME_METADATA: ("qI", "*divmod(st.st_ctime_ns, %d)" % _NS),
+    FATTR4_TIME_MODIFY: ("qI", "*divmod(mtime_ns, %d)" % _NS),
+    FATTR4_MOUNTED_ON_FILEID: ("Q", "st.st_ino"),
+}
+
+def _words(attributes):
+    """
+    The bitmap4 words of a set of attribute numbers.
+    """
+    words = [ 0 ] * (max(attributes, default=-1) // 32 + 1)
+    for a in attributes:
+        words[a // 32] |= 1 << (a % 32)
+    return words
+
+def _attribute_numbers(words):
+    return [ 32 * i + bit
+             for i, word in enumerate(words)
+             for bit in range(32) if word & (1 << bit) ]
+
+def _opaque(data):
+    n = len(data)
+    return _struct.pack(">I", n) + bytes(data) + bytes(-n % 4)
+
+_owners = {}
+
+def _owner(id):
+    """
+    The owner (or owner_group) attribute of a numeric id: the id itself,
+    as Linux clients take it when not mapping ids to names.
+    """
+    try:
+        return _owners[id]
+    except KeyError:
+        value = _owners[id] = _opaque(str(id).encode("ascii"))
+        return value
+
+_supported_words = _words(_attributes)
+supported_attrs = bitmap4(_supported_words)
+
+
+class fattr_encoder(object):
+    """
+    The encoder of one requested bitmap.
+    encode(st, fh, change, size, mtime_ns, fs) returns attr_vals for the
+    attributes of the bitmap that can be read, which attrmask holds: st is
+    the file's os.stat_result, fh its handle, change, size and mtime_ns
+    its attributes as pending writes leave them, and fs the
+    os.statvfs_result of its filesystem if needs_fs.
+    """
+    # {bitmap as bytes: encoder}
+    _encoders = {}
+    max_encoders = 1024
+
+    def __init__(self, words):
+        numbers = [ a for a in _attribute_numbers(words) if a in _attributes ]
+        self.attrmask = bitmap4(_words(numbers))
+        self.needs_fs = any("fs." in _attributes[a][1] for a in numbers)
+        self.encode = self._compile(numbers)
+
+    @classmethod
+    def get(cls, bitmap):
+        """
+        The encoder of a bitmap4.
+        """
+        key = bitmap.tobytes()
+        try:
+            return cls._encoders[key]
+        except KeyError:
+            encoder = fattr_encoder(list(bitmap))
+            if len(cls._encoders) < cls.max_encoders:
+                cls._encoders[key] = encoder
+            return encoder
+
+    @staticmethod
+    def _compile(numbers):
+        namespace = { "_types": _types, "_opaque": _opaque,
+                      "_owner": _owner, "_major": _os.major,
+                      "_minor": _os.minor,
+                      "_supported": _struct.pack(
+                          ">I%dI" % len(_supported_words),
+                          len(_supported_words), *_supported_words) }
+        parts = []
+        run_format, run_values = "", []
+        def end_run():
+            if run_format:
+                name = "_S%d" % len(namespace)
+                namespace[name] = _struct.Struct(">" + run_format)
+                parts.append("%s.pack(%s)" % (name, ", ".join(run_values)))
+        for a in numbers:
+            format, expression = _attributes[a]
+            if format is None:
+                end_run()
+                run_format, run_values = "", []
+                parts.append(expression)
+            else:
+                run_format += format
+                run_values.append(expression)
+        end_run()
+        if not parts:
+            body = 'b""'
+        elif len(parts) == 1:
+            body = parts[0]
+        else:
+            body = "b\"\".join((%s))" % ", ".join(parts)
+        source = ("def encode(st, fh, change, size, mtime_ns, fs):\n"
+                  "    return %s\n" % body)
+        exec(compile(source, "<fattr %r>" % numbers, "exec"), namespace)
+        return namespace["encode"]
+
+    def fattr(self, st, fh, change, size, mtime_ns, fs=None):
+        return fattr4.trusted(attrmask=self.attrmask,
+                              attr_vals=attrlist4(self.encode(st, fh, change,
+                                                              size, mtime_ns,
+                                                              fs)))
+
+
+# the bitmaps of the GETATTRs that follow most operations, and of
+# READDIR, from Linux clients.
+_linux_getattr = [ FATTR4_TYPE, FATTR4_CHANGE, FATTR4_SIZE, FATTR4_FSID,
+                   FATTR4_FILEID, FATTR4_MODE, FATTR4_NUMLINKS, FATTR4_OWNER,
+                   FATTR4_OWNER_GROUP, FATTR4_RAWDEV, FATTR4_SPACE_USED,
+                   FATTR4_TIME_ACCESS, FATTR4_TIME_METADATA,
+                   FATTR4_TIME_MODIFY, FATTR4_MOUNTED_ON_FILEID ]
+for _bitmap in ([ FATTR4_CHANGE, FATTR4_SIZE ],
+                [ FATTR4_CHANGE, FATTR4_SIZE, FATTR4_TIME_METADATA,
+                  FATTR4_TIME_MODIFY ],
+                _linux_getattr,
+                _linux_getattr + [ FATTR4_RDATTR_ERROR ],
+                _linux_getattr + [ FATTR4_RDATTR_ERROR, FATTR4_FILEHANDLE ]):
+    fattr_encoder.get(bitmap4(_words(_bitmap)))
+
+
+class attr_cache(object):
+    """
+    The fattr4 last encoded for each bitmap asked for of each of the
+    max_files most recently used filehandles.  They are kept while the
+    file's change attribute, size, mtime and atime stay as they were (a
+    read changes the atime but not the change attribute); attributes of
+    the filesystem are never kept.
+    """
+    def __init__(self, max_files=4096):
+        # {fh: ((change, size, mtime_ns, atime_ns),
+        #       {bitmap as bytes: fattr4})}
+        self.files = _collections.OrderedDict()
+        self.max_files = max_files
+
+    def get(self, fh, bitmap, st, change, size, mtime_ns, statvfs):
+        """
+        The fattr4 of a file, st etc. being as for fattr_encoder.  statvfs
+        is called for the filesystem's attributes, if they are wanted.
+        """
+        encoder = fattr_encoder.get(bitmap)
+        if encoder.needs_fs:
+            return encoder.fattr(st, fh, change, size, mtime_ns, statvfs())
+        version = (change, size, mtime_ns, st.st_atime_ns)
+        key = bitmap.tobytes()
+        entry = self.files.get(fh)
+        if entry is None or entry[0] != version:
+            entry = self.files[fh] = (version, {})
+            if len(self.files) > self.max_files:
+                self.files.popitem(last=False)
+        else:
+            self.files.move_to_end(fh)
+            attrs = entry[1].get(key)
+            if attrs is not None:
+                return attrs
+        attrs = entry[1][key] = encoder.fattr(st, fh, change, size,
+                                               mtime_ns)
+        return attrs
@@ -1,37 +1,29 @@
 """
 Basic NFS implementation.
-"""
+The NFS version 4 protocol, RFC 3530.
 
-from xdr import xdr_int, xdr_uint, xdr_hyper, xdr_uhyper, xdr_opaque, xdr_array
-from xdr import xdr_enum, xdr_struct, xdr_union, xdr_bool, xdr_string, xdr_void
-from xdr import xdr_optional
+Generated by xdrgen.py from nfs4_prot.x: edit that and regenerate this
+rather than changing it here.
+"""
 
+from xdr import xdr_int, xdr_uint, xdr_hyper, xdr_uhyper, xdr_bool, xdr_void
+from xdr import xdr_enum, xdr_opaque, xdr_string, xdr_array, xdr_optional
+from xdr import xdr_struct, xdr_union
 from rpc import rpc_program, rpc_version, rpc_procedure
-from rpc import auth_flavor as rpc_auth_flavor
-
 
+# Basic typedefs for RFC 1832 data type definitions
 int32_t = xdr_int
 uint32_t = xdr_uint
 int64_t = xdr_hyper
 uint64_t = xdr_uhyper
 
+# Sizes
 NFS4_FHSIZE = 128
 NFS4_VERIFIER_SIZE = 8
+NFS4_OTHER_SIZE = 12
 NFS4_OPAQUE_LIMIT = 1024
 
-attrlist4 = xdr_opaque()
-bitmap4 = xdr_array(uint32_t)
-changeid4 = uint64_t
-clientid4 = uint64_t
-utf8str_cs = xdr_opaque()
-component4 = utf8str_cs
-count4 = uint32_t
-length4 = uint64_t
-linktext4 = utf8str_cs
-mode4 = uint32_t
-nfs_cookie4 = uint64_t
-nfs_fh4 = xdr_opaque(max=NFS4_FHSIZE)
-
+# File types
 class nfs_ftype4(xdr_enum):
     NF4REG = 1 # Regular File
     NF4DIR = 2 # Directory
@@ -43,6 +35,7 @@ class nfs_ftype4(xdr_enum):
     NF4ATTRDIR = 8 # Attribute Directory
     NF4NAMEDATTR = 9 # Named Attribute
 
+# Error status
 class nfsstat4(xdr_enum):
     NFS4_OK = 0 # everything is okay
     NFS4ERR_PERM = 1 # caller not privileged
@@ -112,29 +105,43 @@ class nfsstat4(xdr_enum):
     NFS4ERR_ADMIN_REVOKED = 10047 # lockowner state revoked
     NFS4ERR_CB_PATH_DOWN = 10048 # callback path down
 
+# Basic data types
+attrlist4 = xdr_opaque()
+bitmap4 = xdr_array(uint32_t)
+changeid4 = uint64_t
+clientid4 = uint64_t
+count4 = uint32_t
+length4 = uint64_t
+mode4 = uint32_t
+nfs_cookie4 = uint64_t
+nfs_fh4 = xdr_opaque(max=NFS4_FHSIZE)
+nfs_lease4 = uint32_t
 offset4 = uint64_t
-pathname4 = xdr_array(component4)
 qop4 = uint32_t
 sec_oid4 = xdr_opaque()
 seqid4 = uint32_t
 utf8string = xdr_opaque()
-utf8str_cis = xdr_opaque()
-utf8str_mixed = xdr_opaque()
+utf8str_cis = utf8string
+utf8str_cs = utf8string
+utf8str_mixed = utf8string
+component4 = utf8str_cs
+pathname4 = xdr_array(component4)
+nfs_lockid4 = uint64_t
 verifier4 = xdr_opaque(size=NFS4_VERIFIER_SIZE)
+linktext4 = utf8str_cs
+
+# Timeval
 class nfstime4(xdr_struct):
     seconds = int64_t
     nseconds = uint32_t
+
 class time_how4(xdr_enum):
     SET_TO_SERVER_TIME4 = 0
     SET_TO_CLIENT_TIME4 = 1
+
 class settime4(xdr_union(set_it=time_how4)):
     SET_TO_CLIENT_TIME4.time = nfstime4
 
-
-# File access handle
-nfs_fh4 = xdr_opaque(max=NFS4_FHSIZE)
-
-
 # File attribute definitions
 
 # FSID structure for major/minor
@@ -143,7 +150,6 @@ class fsid4(xdr_struct):
     minor = uint64_t
 
 # Filesystem locations attribute for relocation/migration
-
 class fs_location4(xdr_struct):
     server = xdr_array(utf8str_cis)
     rootpath = pathname4
@@ -156,17 +162,17 @@ class fs_locations4(xdr_struct):
 
 # Mask that indicates which Access Control Entries are supported.
 # Values for the fattr4_aclsupport attribute.
-ACL4_SUPPORT_ALLOW_ACL = 1
-ACL4_SUPPORT_DENY_ACL = 2
-ACL4_SUPPORT_AUDIT_ACL = 4
-ACL4_SUPPORT_ALARM_ACL = 8
-
+ACL4_SUPPORT_ALLOW_ACL = 0x00000001
+ACL4_SUPPORT_DENY_ACL = 0x00000002
+ACL4_SUPPORT_AUDIT_ACL = 0x00000004
+ACL4_SUPPORT_ALARM_ACL = 0x00000008
 acetype4 = uint32_t
+
 # acetype4 values, others can be added as needed.
-ACE4_ACCESS_ALLOWED_ACE_TYPE = 0
-ACE4_ACCESS_DENIED_ACE_TYPE = 1
-ACE4_SYSTEM_AUDIT_ACE_TYPE = 2
-ACE4_SYSTEM_ALARM_ACE_TYPE = 3
+ACE4_ACCESS_ALLOWED_ACE_TYPE = 0x00000000
+ACE4_ACCESS_DENIED_ACE_TYPE = 0x00000001
+ACE4_SYSTEM_AUDIT_ACE_TYPE = 0x00000002
+ACE4_SYSTEM_ALARM_ACE_TYPE = 0x00000003
 
 # ACE flag
 aceflag4 = uint32_t
@@ -207,7 +213,6 @@ ACE4_SYNCHRONIZE = 0x00100000
 #      ACE4_READ_DATA |
 #      ACE4_READ_ATTRIBUTES |
 #      ACE4_SYNCHRONIZE
-
 ACE4_GENERIC_READ = 0x00120081
 
 # ACE4_GENERIC_WRITE -- defined as combination of
@@ -217,7 +222,6 @@ ACE4_GENERIC_READ = 0x00120081
 #      ACE4_WRITE_ACL |
 #      ACE4_APPEND_DATA |
 #      ACE4_SYNCHRONIZE
-
 ACE4_GENERIC_WRITE = 0x00160106
 
 # ACE4_GENERIC_EXECUTE -- defined as combination of
@@ -225,11 +229,9 @@ ACE4_GENERIC_WRITE = 0x00160106
 #      ACE4_READ_ATTRIBUTES
 #      ACE4_EXECUTE
 #      ACE4_SYNCHRONIZE
-
 ACE4_GENERIC_EXECUTE = 0x001200A0
 
 # Access Control Entry definition
-
 class nfsace4(xdr_struct):
     type = acetype4
     flag = aceflag4
@@ -250,16 +252,18 @@ MODE4_ROTH = 0x004 # read permission: other
 MODE4_WOTH = 0x002 # write permission: other
 MODE4_XOTH = 0x001 # execute permission: other
 
+# Special data/attribute associated with
+# file types NF4BLK and NF4CHR.
 class specdata4(xdr_struct):
-    specdata1 = uint32_t
-    specdata2 = uint32_t
-
-FH4_PERSISTENT = 0
-FH4_NOEXPIRE_WITH_OPEN = 1
-FH4_VOLATILE_ANY = 2
-FH4_VOL_MIGRATION = 4
-FH4_VOL_RENAME = 8
-
+    specdata1 = uint32_t # major device number
+    specdata2 = uint32_t # minor device number
+
+# Values for fattr4_fh_expire_type
+FH4_PERSISTENT = 0x00000000
+FH4_NOEXPIRE_WITH_OPEN = 0x00000001
+FH4_VOLATILE_ANY = 0x00000002
+FH4_VOL_MIGRATION = 0x00000004
+FH4_VOL_RENAME = 0x00000008
 fattr4_supported_attrs = bitmap4
 fattr4_type = nfs_ftype4
 fattr4_fh_expire_type = uint32_t
@@ -270,7 +274,7 @@ fattr4_symlink_support = xdr_bool
 fattr4_named_attr = xdr_bool
 fattr4_fsid = fsid4
 fattr4_unique_handles = xdr_bool
-fattr4_lease_time = uint32_t
+fattr4_lease_time = nfs_lease4
 fattr4_rdattr_error = nfsstat4
 fattr4_acl = xdr_array(nfsace4)
 fattr4_aclsupport = uint32_t
@@ -377,53 +381,44 @@ FATTR4_TIME_MODIFY = 53
 FATTR4_TIME_MODIFY_SET = 54
 FATTR4_MOUNTED_ON_FILEID = 55
 
+# File attribute container
 class fattr4(xdr_struct):
     attrmask = bitmap4
     attr_vals = attrlist4
+
+# Change info for the client
 class change_info4(xdr_struct):
     atomic = xdr_bool
     before = changeid4
     after = changeid4
+
 class clientaddr4(xdr_struct):
-    r_netid = xdr_string()
-    r_addr = xdr_string()
+    # see struct rpcb in RFC 1833
+    r_netid = xdr_string() # network id
+    r_addr = xdr_string() # universal address
+
+# Callback program info as provided by the client
 class cb_client4(xdr_struct):
     cb_program = xdr_uint
     cb_location = clientaddr4
+
+# Stateid
+class stateid4(xdr_struct):
+    seqid = uint32_t
+    other = xdr_opaque(size=NFS4_OTHER_SIZE)
+
+# Client ID
 class nfs_client_id4(xdr_struct):
     verifier = verifier4
     id = xdr_opaque(max=NFS4_OPAQUE_LIMIT)
+
 class open_owner4(xdr_struct):
     clientid = clientid4
     owner = xdr_opaque(max=NFS4_OPAQUE_LIMIT)
+
 class lock_owner4(xdr_struct):
     clientid = clientid4
     owner = xdr_opaque(max=NFS4_OPAQUE_LIMIT)
-class stateid4(xdr_struct):
-    seqid = uint32_t
-    other = xdr_opaque(size=12)
-class open_to_lock_owner4(xdr_struct):
-    open_seqid = seqid4
-    open_stateid = stateid4
-    lock_seqid = seqid4
-    lock_owner = lock_owner4
-
-
-class SECINFO4args(xdr_struct):
-    # CURRENT_FH: directory
-    name = component4
-
-# From RFC 2203
-class rpc_gss_svc_t(xdr_enum):
-    RPC_GSS_SVC_NONE = 1
-    RPC_GSS_SVC_INTEGRITY = 2
-    RPC_GSS_SVC_PRIVACY = 3
-
-class rpcsec_gss_info(xdr_struct):
-    oid = sec_oid4
-    qop = qop4
-    service = rpc_gss_svc_t
-
 
 class nfs_lock_type4(xdr_enum):
     READ_LT = 1
@@ -432,12 +427,12 @@ class nfs_lock_type4(xdr_enum):
     WRITEW_LT = 4 # blocking write
 
 # ACCESS: Check access permission
-ACCESS4_READ = 1
-ACCESS4_LOOKUP = 2
-ACCESS4_MODIFY = 4
-ACCESS4_EXTEND = 8
-ACCESS4_DELETE = 16
-ACCESS4_EXECUTE = 32
+ACCESS4_READ = 0x00000001
+ACCESS4_LOOKUP = 0x00000002
+ACCESS4_MODIFY = 0x00000004
+ACCESS4_EXTEND = 0x00000008
+ACCESS4_DELETE = 0x00000010
+ACCESS4_EXECUTE = 0x00000020
 
 class ACCESS4args(xdr_struct):
     # CURRENT_FH: object
@@ -526,6 +521,7 @@ class GETFH4res(xdr_union(status=nfsstat4)):
 # LINK: Create link to an object
 class LINK4args(xdr_struct):
     # SAVED_FH: source object
+
     # CURRENT_FH: target directory
     newname = component4
 
@@ -635,10 +631,10 @@ class openflag4(xdr_union(opentype=opentype4)):
     OPEN4_CREATE.how = createhow4
 
 # Next definitions used for OPEN delegation
+# others as needed
 class limit_by4(xdr_enum):
     NFS_LIMIT_SIZE = 1
     NFS_LIMIT_BLOCKS = 2
-    # others as needed
 
 class nfs_modified_limit4(xdr_struct):
     num_blocks = uint32_t
@@ -651,14 +647,13 @@ class nfs_space_limit4(xdr_union(limitby=limit_by4)):
     NFS_LIMIT_BLOCKS.mod_blocks = nfs_modified_limit4
 
 # Share Access and Deny constants for open argument
-OPEN4_SHARE_ACCESS_READ = 1
-OPEN4_SHARE_ACCESS_WRITE = 2
-OPEN4_SHARE_ACCESS_BOTH = 3
-
-OPEN4_SHARE_DENY_NONE = 0
-OPEN4_SHARE_DENY_READ = 1
-OPEN4_SHARE_DENY_WRITE = 2
-OPEN4_SHARE_DENY_BOTH = 3
+OPEN4_SHARE_ACCESS_READ = 0x00000001
+OPEN4_SHARE_ACCESS_WRITE = 0x00000002
+OPEN4_SHARE_ACCESS_BOTH = 0x00000003
+OPEN4_SHARE_DENY_NONE = 0x00000000
+OPEN4_SHARE_DENY_READ = 0x00000001
+OPEN4_SHARE_DENY_WRITE = 0x00000002
+OPEN4_SHARE_DENY_BOTH = 0x00000003
 
 class open_delegation_type4(xdr_enum):
     OPEN_DELEGATE_NONE = 0
@@ -677,24 +672,21 @@ class open_claim_delegate_cur4(xdr_struct):
 
 class open_claim4(xdr_union(claim=open_claim_type4)):
     # No special rights to file. Ordinary OPEN of the specified file.
-    CLAIM_NULL.file = component4
     # CURRENT_FH: directory
-
+    CLAIM_NULL.file = component4
     # Right to the file established by an open previous to server
     # reboot.  File identified by filehandle obtained at that time
     # rather than by name.
-    CLAIM_PREVIOUS.delegate_type = open_delegation_type4
     # CURRENT_FH: file being reclaimed
-
+    CLAIM_PREVIOUS.delegate_type = open_delegation_type4
     # Right to file based on a delegation granted by the server.
     # File is specified by name.
-    CLAIM_DELEGATE_CUR.delegate_cur_info = open_claim_delegate_cur4
     # CURRENT_FH: directory
-
+    CLAIM_DELEGATE_CUR.delegate_cur_info = open_claim_delegate_cur4
     # Right to file based on a delegation granted to a previous boot
     # instance of the client.  File is specified by name.
-    CLAIM_DELEGATE_PREV.file_delegate_prev = component4
     # CURRENT_FH: directory
+    CLAIM_DELEGATE_PREV.file_delegate_prev = component4
 
 # OPEN: Open a file, potentially receiving an open delegation
 class OPEN4args(xdr_struct):
@@ -706,16 +698,14 @@ class OPEN4args(xdr_struct):
     claim = open_claim4
 
 class open_read_delegation4(xdr_struct):
-    # Stateid for delegation
-    stateid = stateid4
+    stateid = stateid4 # Stateid for delegation
     # Pre-recalled flag for delegations obtained by reclaim (CLAIM_PREVIOUS)
     recall = xdr_bool
     # Defines users who don't need an ACCESS call to open for read
     permissions = nfsace4
 
 class open_write_delegation4(xdr_struct):
-    # Stateid for delegation
-    stateid = stateid4
+    stateid = stateid4 # Stateid for delegation
     # Pre-recalled flag for delegations obtained by reclaim (CLAIM_PREVIOUS)
     recall = xdr_bool
     # Defines condition that the client must check to determine whether the
@@ -729,10 +719,12 @@ class open_delegation4(xdr_union(delegation_type=open_delegation_type4)):
     OPEN_DELEGATE_WRITE.write = open_write_delegation4
 
 # Result flags
+
 # Client must confirm open
-OPEN4_RESULT_CONFIRM = 2
+OPEN4_RESULT_CONFIRM = 0x00000002
+
 # Type of file locking behavior at the server
-OPEN4_RESULT_LOCKTYPE_POSIX = 4
+OPEN4_RESULT_LOCKTYPE_POSIX = 0x00000004
 
 class OPEN4resok(xdr_struct):
     stateid = stateid4 # Stateid for open
@@ -887,15 +879,35 @@ class SAVEFH4res(xdr_struct):
     # SAVED_FH: value of current fh
     status = nfsstat4
 
+# SECINFO: Obtain Available Security Mechanisms
+class SECINFO4args(xdr_struct):
+    # CURRENT_FH: directory
+    name = component4
+
+# From RFC 2203
+class rpc_gss_svc_t(xdr_enum):
+    RPC_GSS_SVC_NONE = 1
+    RPC_GSS_SVC_INTEGRITY = 2
+    RPC_GSS_SVC_PRIVACY = 3
+
+class rpcsec_gss_info(xdr_struct):
+    oid = sec_oid4
+    qop = qop4
+    service = rpc_gss_svc_t
+
 # RPCSEC_GSS has a value of '6' - See RFC 2203
-class secinfo4(xdr_union(flavor=rpc_auth_flavor)):
-    RPCSEC_GSS.flavor_info = rpcsec_gss_info
+RPCSEC_GSS = 6
+
+class secinfo4(xdr_union(flavor=uint32_t)):
+    case(RPCSEC_GSS).flavor_info = rpcsec_gss_info
+    _xdr_default = "default"
 
 SECINFO4resok = xdr_array(secinfo4)
 
 class SECINFO4res(xdr_union(status=nfsstat4)):
     NFS4_OK.resok4 = SECINFO4resok
 
+# SETATTR: Set attributes
 class SETATTR4args(xdr_struct):
     # CURRENT_FH: target object
     stateid = stateid4
@@ -905,6 +917,7 @@ class SETATTR4res(xdr_struct):
     status = nfsstat4
     attrsset = bitmap4
 
+# SETCLIENTID
 class SETCLIENTID4args(xdr_struct):
     client = nfs_client_id4
     callback = cb_client4
@@ -925,6 +938,7 @@ class SETCLIENTID_CONFIRM4args(xdr_struct):
 class SETCLIENTID_CONFIRM4res(xdr_struct):
     status = nfsstat4
 
+# VERIFY: Verify attributes same
 class VERIFY4args(xdr_struct):
     # CURRENT_FH: object
     obj_attributes = fattr4
@@ -932,6 +946,7 @@ class VERIFY4args(xdr_struct):
 class VERIFY4res(xdr_struct):
     status = nfsstat4
 
+# WRITE: Write to file
 class stable_how4(xdr_enum):
     UNSTABLE4 = 0
     DATA_SYNC4 = 1
@@ -952,15 +967,18 @@ class WRITE4resok(xdr_struct):
 class WRITE4res(xdr_union(status=nfsstat4)):
     NFS4_OK.resok4 = WRITE4resok
 
+# RELEASE_LOCKOWNER: Notify server to release lockowner
 class RELEASE_LOCKOWNER4args(xdr_struct):
     lock_owner = lock_owner4
 
 class RELEASE_LOCKOWNER4res(xdr_struct):
     status = nfsstat4
 
+# ILLEGAL: Response for illegal operation numbers
 class ILLEGAL4res(xdr_struct):
     status = nfsstat4
 
+# Operation arrays
 class nfs_opnum4(xdr_enum):
     OP_ACCESS = 3
     OP_CLOSE = 4
@@ -1009,29 +1027,22 @@ class nfs_argop4(xdr_union(argop=nfs_opnum4)):
     OP_DELEGPURGE.opdelegpurge = DELEGPURGE4args
     OP_DELEGRETURN.opdelegreturn = DELEGRETURN4args
     OP_GETATTR.opgetattr = GETATTR4args
-    # OP_GETFH.blah = rpc_void
     OP_LINK.oplink = LINK4args
     OP_LOCK.oplock = LOCK4args
     OP_LOCKT.oplockt = LOCKT4args
     OP_LOCKU.oplocku = LOCKU4args
     OP_LOOKUP.oplookup = LOOKUP4args
-    # OP_LOOKUPP.blah = rpc_void
     OP_NVERIFY.opnverify = NVERIFY4args
     OP_OPEN.opopen = OPEN4args
     OP_OPENATTR.opopenattr = OPENATTR4args
     OP_OPEN_CONFIRM.opopen_confirm = OPEN_CONFIRM4args
     OP_OPEN_DOWNGRADE.opopen_downgrade = OPEN_DOWNGRADE4args
     OP_PUTFH.opputfh = PUTFH4args
-    # OP_PUTPUBFH.blah = rpc_void
-    # OP_PUTROOTFH.blah = rpc_void
     OP_READ.opread = READ4args
     OP_READDIR.opreaddir = READDIR4args
-    # OP_READLINK.blah = rpc_void
     OP_REMOVE.opremove = REMOVE4args
     OP_RENAME.oprename = RENAME4args
     OP_RENEW.oprenew = RENEW4args
-    # OP_RESTOREFH.blah = rpc_void
-    # OP_SAVEFH.blah = rpc_void
     OP_SECINFO.opsecinfo = SECINFO4args
     OP_SETATTR.opsetattr = SETATTR4args
     OP_SETCLIENTID.opsetclientid = SETCLIENTID4args
@@ -1039,7 +1050,9 @@ class nfs_argop4(xdr_union(argop=nfs_opnum4)):
     OP_VERIFY.opverify = VERIFY4args
     OP_WRITE.opwrite = WRITE4args
     OP_RELEASE_LOCKOWNER.oprelease_lockowner = RELEASE_LOCKOWNER4args
-    # OP_ILLEGAL.blah = rpc_void
+
+# an operation not in nfs_opnum4 is decoded as OP_ILLEGAL.
+nfs_argop4._xdr_default = "OP_ILLEGAL"
 
 class nfs_resop4(xdr_union(resop=nfs_opnum4)):
     OP_ACCESS.opaccess = ACCESS4res
@@ -1078,8 +1091,9 @@ class nfs_resop4(xdr_union(resop=nfs_opnum4)):
     OP_SETCLIENTID_CONFIRM.opsetclientid_confirm = SETCLIENTID_CONFIRM4res
     OP_VERIFY.opverify = VERIFY4res
     OP_WRITE.opwrite = WRITE4res
-    OP_RELEASE_LOCKOWNER.oprelease_lockowner =  RELEASE_LOCKOWNER4res
+    OP_RELEASE_LOCKOWNER.oprelease_lockowner = RELEASE_LOCKOWNER4res
     OP_ILLEGAL.opillegal = ILLEGAL4res
+nfs_resop4._xdr_default = "OP_ILLEGAL"
 
 class COMPOUND4args(xdr_struct):
     tag = utf8str_cs
@@ -1092,10 +1106,12 @@ class COMPOUND4res(xdr_struct):
     resarray = xdr_array(nfs_resop4)
 
 
+# Remote file service routines
 @rpc_program(prog=100003)
 class NFS4_PROGRAM(object):
     def __init__(self):
         self.NFS_V4 = NFS4_PROGRAM.NFS_V4()
+
     @rpc_version(vers=4)
     class NFS_V4(object):
         @rpc_procedure(proc=0, args=xdr_void, ret=xdr_void)
@@ -1103,10 +1119,81 @@ class NFS4_PROGRAM(object):
             pass
 
         @rpc_procedure(proc=1, args=COMPOUND4args, ret=COMPOUND4res)
-        def NFSPROC4_COMPOUND(self, args):
+        def NFSPROC4_COMPOUND(self, rpc_msg, args):
+            pass
+
+
+# NFS4 Callback Procedure Definitions and Program
+
+# CB_GETATTR: Get Current Attributes
+class CB_GETATTR4args(xdr_struct):
+    fh = nfs_fh4
+    attr_request = bitmap4
+
+class CB_GETATTR4resok(xdr_struct):
+    obj_attributes = fattr4
+
+class CB_GETATTR4res(xdr_union(status=nfsstat4)):
+    NFS4_OK.resok4 = CB_GETATTR4resok
+
+# CB_RECALL: Recall an Open Delegation
+class CB_RECALL4args(xdr_struct):
+    stateid = stateid4
+    truncate = xdr_bool
+    fh = nfs_fh4
+
+class CB_RECALL4res(xdr_struct):
+    status = nfsstat4
+
+# CB_ILLEGAL: Response for illegal operation numbers
+class CB_ILLEGAL4res(xdr_struct):
+    status = nfsstat4
+
+# Various definitions for CB_COMPOUND
+class nfs_cb_opnum4(xdr_enum):
+    OP_CB_GETATTR = 3
+    OP_CB_RECALL = 4
+    OP_CB_ILLEGAL = 10044
+
+class nfs_cb_argop4(xdr_union(argop=xdr_uint)):
+    case(nfs_cb_opnum4.OP_CB_GETATTR).opcbgetattr = CB_GETATTR4args
+    case(nfs_cb_opnum4.OP_CB_RECALL).opcbrecall = CB_RECALL4args
+    case(nfs_cb_opnum4.OP_CB_ILLEGAL)
+
+class nfs_cb_resop4(xdr_union(resop=xdr_uint)):
+    case(nfs_cb_opnum4.OP_CB_GETATTR).opcbgetattr = CB_GETATTR4res
+    case(nfs_cb_opnum4.OP_CB_RECALL).opcbrecall = CB_RECALL4res
+    case(nfs_cb_opnum4.OP_CB_ILLEGAL).opcbillegal = CB_ILLEGAL4res
+
+class CB_COMPOUND4args(xdr_struct):
+    tag = utf8str_cs
+    minorversion = uint32_t
+    callback_ident = uint32_t
+    argarray = xdr_array(nfs_cb_argop4)
+
+class CB_COMPOUND4res(xdr_struct):
+    status = nfsstat4
+    tag = utf8str_cs
+    resarray = xdr_array(nfs_cb_resop4)
+
+
+# Program number is in the transient range since the client
+# will assign the exact transient program number and provide
+# that to the server via the SETCLIENTID operation.
+@rpc_program(prog=0x40000000)
+class NFS4_CALLBACK(object):
+    def __init__(self):
+        self.NFS_CB = NFS4_CALLBACK.NFS_CB()
+
+    @rpc_version(vers=1)
+    class NFS_CB(object):
+        @rpc_procedure(proc=0, args=xdr_void, ret=xdr_void)
+        def CB_NULL(self):
             pass
 
-    NFS_VERS = 4
+        @rpc_procedure(proc=1, args=CB_COMPOUND4args, ret=CB_COMPOUND4res)
+        def CB_COMPOUND(self, rpc_msg, args):
+            pass
 
 
 if __name__ == "__main__":
@@ -1116,28 +1203,3 @@ if __name__ == "__main__":
     for i in range(60):
         print("loop.")
         server.cycle(1000.0)
-    import sys
-    sys.exit(0)
-
-
-if __name__ == "__main__":
-    from xdrlib import Unpacker
-    unpacker = Unpacker(b)
-    args = COMPOUND4args.unpack(unpacker)
-    print(args)
-    print("tag: %s" % args.tag)
-    print("minor version: %d" % args.minorversion)
-    print("args: %d" % len(args.argarray))
-    arg = args.argarray[0]
-    print("argop: %d" % arg.argop)
-    ops = arg.opsetclientid
-    print("ops: %s" % ops)
-    print("ops.client.verifier: %s" % ops.client.verifier)
-    print("ops.client.id: %s" % ops.client.id)
-"""
-    client = nfs_client_id4
-    verifier = verifier4
-    id = xdr_opaque(max=NFS4_OPAQUE_LIMIT)
-    callback = cb_client4
-    callback_ident = uint32_t
-"""
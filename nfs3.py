@@ -1,4 +1,702 @@
 """
-Version 2 of the NFS protocol.
+Version 3 of the NFS protocol.
+RFC 1813
+
+Generated by xdrgen.py from nfs3_prot.x: edit that and regenerate this
+rather than changing it here.
 """
 
+from xdr import xdr_int, xdr_uint, xdr_hyper, xdr_uhyper, xdr_bool, xdr_void
+from xdr import xdr_enum, xdr_opaque, xdr_string, xdr_optional, xdr_struct
+from xdr import xdr_union
+from rpc import rpc_program, rpc_version, rpc_procedure
+
+NFS3_FHSIZE = 64 # maximum bytes in a V3 file handle
+NFS3_COOKIEVERFSIZE = 8
+NFS3_CREATEVERFSIZE = 8
+NFS3_WRITEVERFSIZE = 8
+
+# Basic data types
+uint64 = xdr_uhyper
+int64 = xdr_hyper
+uint32 = xdr_uint
+int32 = xdr_int
+filename3 = xdr_string()
+nfspath3 = xdr_string()
+fileid3 = uint64
+cookie3 = uint64
+cookieverf3 = xdr_opaque(size=NFS3_COOKIEVERFSIZE)
+createverf3 = xdr_opaque(size=NFS3_CREATEVERFSIZE)
+writeverf3 = xdr_opaque(size=NFS3_WRITEVERFSIZE)
+uid3 = uint32
+gid3 = uint32
+size3 = uint64
+offset3 = uint64
+mode3 = uint32
+count3 = uint32
+
+class nfsstat3(xdr_enum):
+    NFS3_OK = 0
+    NFS3ERR_PERM = 1
+    NFS3ERR_NOENT = 2
+    NFS3ERR_IO = 5
+    NFS3ERR_NXIO = 6
+    NFS3ERR_ACCES = 13
+    NFS3ERR_EXIST = 17
+    NFS3ERR_XDEV = 18
+    NFS3ERR_NODEV = 19
+    NFS3ERR_NOTDIR = 20
+    NFS3ERR_ISDIR = 21
+    NFS3ERR_INVAL = 22
+    NFS3ERR_FBIG = 27
+    NFS3ERR_NOSPC = 28
+    NFS3ERR_ROFS = 30
+    NFS3ERR_MLINK = 31
+    NFS3ERR_NAMETOOLONG = 63
+    NFS3ERR_NOTEMPTY = 66
+    NFS3ERR_DQUOT = 69
+    NFS3ERR_STALE = 70
+    NFS3ERR_REMOTE = 71
+    NFS3ERR_BADHANDLE = 10001
+    NFS3ERR_NOT_SYNC = 10002
+    NFS3ERR_BAD_COOKIE = 10003
+    NFS3ERR_NOTSUPP = 10004
+    NFS3ERR_TOOSMALL = 10005
+    NFS3ERR_SERVERFAULT = 10006
+    NFS3ERR_BADTYPE = 10007
+    NFS3ERR_JUKEBOX = 10008
+
+class ftype3(xdr_enum):
+    NF3REG = 1
+    NF3DIR = 2
+    NF3BLK = 3
+    NF3CHR = 4
+    NF3LNK = 5
+    NF3SOCK = 6
+    NF3FIFO = 7
+
+class specdata3(xdr_struct):
+    specdata1 = uint32
+    specdata2 = uint32
+
+class nfs_fh3(xdr_struct):
+    data = xdr_opaque(max=NFS3_FHSIZE)
+
+class nfstime3(xdr_struct):
+    seconds = uint32
+    nseconds = uint32
+
+class fattr3(xdr_struct):
+    type = ftype3
+    mode = mode3
+    nlink = uint32
+    uid = uid3
+    gid = gid3
+    size = size3
+    used = size3
+    rdev = specdata3
+    fsid = uint64
+    fileid = fileid3
+    atime = nfstime3
+    mtime = nfstime3
+    ctime = nfstime3
+
+class post_op_attr(xdr_union(attributes_follow=xdr_bool)):
+    TRUE.attributes = fattr3
+
+class wcc_attr(xdr_struct):
+    size = size3
+    mtime = nfstime3
+    ctime = nfstime3
+
+class pre_op_attr(xdr_union(attributes_follow=xdr_bool)):
+    TRUE.attributes = wcc_attr
+
+class wcc_data(xdr_struct):
+    before = pre_op_attr
+    after = post_op_attr
+
+class post_op_fh3(xdr_union(handle_follows=xdr_bool)):
+    TRUE.handle = nfs_fh3
+
+class time_how(xdr_enum):
+    DONT_CHANGE = 0
+    SET_TO_SERVER_TIME = 1
+    SET_TO_CLIENT_TIME = 2
+
+class set_mode3(xdr_union(set_it=xdr_bool)):
+    TRUE.mode = mode3
+
+class set_uid3(xdr_union(set_it=xdr_bool)):
+    TRUE.uid = uid3
+
+class set_gid3(xdr_union(set_it=xdr_bool)):
+    TRUE.gid = gid3
+
+class set_size3(xdr_union(set_it=xdr_bool)):
+    TRUE.size = size3
+
+class set_atime(xdr_union(set_it=time_how)):
+    SET_TO_CLIENT_TIME.atime = nfstime3
+
+class set_mtime(xdr_union(set_it=time_how)):
+    SET_TO_CLIENT_TIME.mtime = nfstime3
+
+class sattr3(xdr_struct):
+    mode = set_mode3
+    uid = set_uid3
+    gid = set_gid3
+    size = set_size3
+    atime = set_atime
+    mtime = set_mtime
+
+class diropargs3(xdr_struct):
+    dir = nfs_fh3
+    name = filename3
+
+# GETATTR: Get file attributes
+class GETATTR3args(xdr_struct):
+    object = nfs_fh3
+
+class GETATTR3resok(xdr_struct):
+    obj_attributes = fattr3
+
+class GETATTR3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = GETATTR3resok
+
+# SETATTR: Set file attributes
+class sattrguard3(xdr_union(check=xdr_bool)):
+    TRUE.obj_ctime = nfstime3
+
+class SETATTR3args(xdr_struct):
+    object = nfs_fh3
+    new_attributes = sattr3
+    guard = sattrguard3
+
+class SETATTR3resok(xdr_struct):
+    obj_wcc = wcc_data
+
+class SETATTR3resfail(xdr_struct):
+    obj_wcc = wcc_data
+
+class SETATTR3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = SETATTR3resok
+    default.resfail = SETATTR3resfail
+    _xdr_default = "default"
+
+# LOOKUP: Lookup filename
+class LOOKUP3args(xdr_struct):
+    what = diropargs3
+
+class LOOKUP3resok(xdr_struct):
+    object = nfs_fh3
+    obj_attributes = post_op_attr
+    dir_attributes = post_op_attr
+
+class LOOKUP3resfail(xdr_struct):
+    dir_attributes = post_op_attr
+
+class LOOKUP3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = LOOKUP3resok
+    default.resfail = LOOKUP3resfail
+    _xdr_default = "default"
+
+# ACCESS: Check Access Permission
+ACCESS3_READ = 0x0001
+ACCESS3_LOOKUP = 0x0002
+ACCESS3_MODIFY = 0x0004
+ACCESS3_EXTEND = 0x0008
+ACCESS3_DELETE = 0x0010
+ACCESS3_EXECUTE = 0x0020
+
+class ACCESS3args(xdr_struct):
+    object = nfs_fh3
+    access = uint32
+
+class ACCESS3resok(xdr_struct):
+    obj_attributes = post_op_attr
+    access = uint32
+
+class ACCESS3resfail(xdr_struct):
+    obj_attributes = post_op_attr
+
+class ACCESS3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = ACCESS3resok
+    default.resfail = ACCESS3resfail
+    _xdr_default = "default"
+
+# READLINK: Read from symbolic link
+class READLINK3args(xdr_struct):
+    symlink = nfs_fh3
+
+class READLINK3resok(xdr_struct):
+    symlink_attributes = post_op_attr
+    data = nfspath3
+
+class READLINK3resfail(xdr_struct):
+    symlink_attributes = post_op_attr
+
+class READLINK3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = READLINK3resok
+    default.resfail = READLINK3resfail
+    _xdr_default = "default"
+
+# READ: Read From file
+class READ3args(xdr_struct):
+    file = nfs_fh3
+    offset = offset3
+    count = count3
+
+class READ3resok(xdr_struct):
+    file_attributes = post_op_attr
+    count = count3
+    eof = xdr_bool
+    data = xdr_opaque()
+
+class READ3resfail(xdr_struct):
+    file_attributes = post_op_attr
+
+class READ3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = READ3resok
+    default.resfail = READ3resfail
+    _xdr_default = "default"
+
+# WRITE: Write to file
+class stable_how(xdr_enum):
+    UNSTABLE = 0
+    DATA_SYNC = 1
+    FILE_SYNC = 2
+
+class WRITE3args(xdr_struct):
+    file = nfs_fh3
+    offset = offset3
+    count = count3
+    stable = stable_how
+    data = xdr_opaque()
+
+class WRITE3resok(xdr_struct):
+    file_wcc = wcc_data
+    count = count3
+    committed = stable_how
+    verf = writeverf3
+
+class WRITE3resfail(xdr_struct):
+    file_wcc = wcc_data
+
+class WRITE3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = WRITE3resok
+    default.resfail = WRITE3resfail
+    _xdr_default = "default"
+
+# CREATE: Create a file
+class createmode3(xdr_enum):
+    UNCHECKED = 0
+    GUARDED = 1
+    EXCLUSIVE = 2
+
+class createhow3(xdr_union(mode=createmode3)):
+    UNCHECKED.obj_attributes = sattr3
+    GUARDED.obj_attributes = sattr3
+    EXCLUSIVE.verf = createverf3
+
+class CREATE3args(xdr_struct):
+    where = diropargs3
+    how = createhow3
+
+class CREATE3resok(xdr_struct):
+    obj = post_op_fh3
+    obj_attributes = post_op_attr
+    dir_wcc = wcc_data
+
+class CREATE3resfail(xdr_struct):
+    dir_wcc = wcc_data
+
+class CREATE3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = CREATE3resok
+    default.resfail = CREATE3resfail
+    _xdr_default = "default"
+
+# MKDIR: Create a directory
+class MKDIR3args(xdr_struct):
+    where = diropargs3
+    attributes = sattr3
+
+class MKDIR3resok(xdr_struct):
+    obj = post_op_fh3
+    obj_attributes = post_op_attr
+    dir_wcc = wcc_data
+
+class MKDIR3resfail(xdr_struct):
+    dir_wcc = wcc_data
+
+class MKDIR3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = MKDIR3resok
+    default.resfail = MKDIR3resfail
+    _xdr_default = "default"
+
+# SYMLINK: Create a symbolic link
+class symlinkdata3(xdr_struct):
+    symlink_attributes = sattr3
+    symlink_data = nfspath3
+
+class SYMLINK3args(xdr_struct):
+    where = diropargs3
+    symlink = symlinkdata3
+
+class SYMLINK3resok(xdr_struct):
+    obj = post_op_fh3
+    obj_attributes = post_op_attr
+    dir_wcc = wcc_data
+
+class SYMLINK3resfail(xdr_struct):
+    dir_wcc = wcc_data
+
+class SYMLINK3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = SYMLINK3resok
+    default.resfail = SYMLINK3resfail
+    _xdr_default = "default"
+
+# MKNOD: Create a special device
+class devicedata3(xdr_struct):
+    dev_attributes = sattr3
+    spec = specdata3
+
+class mknoddata3(xdr_union(type=ftype3)):
+    NF3CHR.device = devicedata3
+    NF3BLK.device = devicedata3
+    NF3SOCK.pipe_attributes = sattr3
+    NF3FIFO.pipe_attributes = sattr3
+
+class MKNOD3args(xdr_struct):
+    where = diropargs3
+    what = mknoddata3
+
+class MKNOD3resok(xdr_struct):
+    obj = post_op_fh3
+    obj_attributes = post_op_attr
+    dir_wcc = wcc_data
+
+class MKNOD3resfail(xdr_struct):
+    dir_wcc = wcc_data
+
+class MKNOD3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = MKNOD3resok
+    default.resfail = MKNOD3resfail
+    _xdr_default = "default"
+
+# REMOVE: Remove a File
+class REMOVE3args(xdr_struct):
+    object = diropargs3
+
+class REMOVE3resok(xdr_struct):
+    dir_wcc = wcc_data
+
+class REMOVE3resfail(xdr_struct):
+    dir_wcc = wcc_data
+
+class REMOVE3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = REMOVE3resok
+    default.resfail = REMOVE3resfail
+    _xdr_default = "default"
+
+# RMDIR: Remove a Directory
+class RMDIR3args(xdr_struct):
+    object = diropargs3
+
+class RMDIR3resok(xdr_struct):
+    dir_wcc = wcc_data
+
+class RMDIR3resfail(xdr_struct):
+    dir_wcc = wcc_data
+
+class RMDIR3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = RMDIR3resok
+    default.resfail = RMDIR3resfail
+    _xdr_default = "default"
+
+# RENAME: Rename a File or Directory
+class RENAME3args(xdr_struct):
+    from_ = diropargs3
+    to = diropargs3
+
+class RENAME3resok(xdr_struct):
+    fromdir_wcc = wcc_data
+    todir_wcc = wcc_data
+
+class RENAME3resfail(xdr_struct):
+    fromdir_wcc = wcc_data
+    todir_wcc = wcc_data
+
+class RENAME3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = RENAME3resok
+    default.resfail = RENAME3resfail
+    _xdr_default = "default"
+
+# LINK: Create Link to an object
+class LINK3args(xdr_struct):
+    file = nfs_fh3
+    link = diropargs3
+
+class LINK3resok(xdr_struct):
+    file_attributes = post_op_attr
+    linkdir_wcc = wcc_data
+
+class LINK3resfail(xdr_struct):
+    file_attributes = post_op_attr
+    linkdir_wcc = wcc_data
+
+class LINK3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = LINK3resok
+    default.resfail = LINK3resfail
+    _xdr_default = "default"
+
+# READDIR: Read From Directory
+class READDIR3args(xdr_struct):
+    dir = nfs_fh3
+    cookie = cookie3
+    cookieverf = cookieverf3
+    count = count3
+
+class entry3(xdr_struct):
+    fileid = fileid3
+    name = filename3
+    cookie = cookie3
+entry3.nextentry = xdr_optional(entry3)
+
+class dirlist3(xdr_struct):
+    entries = xdr_optional(entry3)
+    eof = xdr_bool
+
+class READDIR3resok(xdr_struct):
+    dir_attributes = post_op_attr
+    cookieverf = cookieverf3
+    reply = dirlist3
+
+class READDIR3resfail(xdr_struct):
+    dir_attributes = post_op_attr
+
+class READDIR3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = READDIR3resok
+    default.resfail = READDIR3resfail
+    _xdr_default = "default"
+
+# READDIRPLUS: Extended read from directory
+class READDIRPLUS3args(xdr_struct):
+    dir = nfs_fh3
+    cookie = cookie3
+    cookieverf = cookieverf3
+    dircount = count3
+    maxcount = count3
+
+class entryplus3(xdr_struct):
+    fileid = fileid3
+    name = filename3
+    cookie = cookie3
+    name_attributes = post_op_attr
+    name_handle = post_op_fh3
+entryplus3.nextentry = xdr_optional(entryplus3)
+
+class dirlistplus3(xdr_struct):
+    entries = xdr_optional(entryplus3)
+    eof = xdr_bool
+
+class READDIRPLUS3resok(xdr_struct):
+    dir_attributes = post_op_attr
+    cookieverf = cookieverf3
+    reply = dirlistplus3
+
+class READDIRPLUS3resfail(xdr_struct):
+    dir_attributes = post_op_attr
+
+class READDIRPLUS3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = READDIRPLUS3resok
+    default.resfail = READDIRPLUS3resfail
+    _xdr_default = "default"
+
+# FSSTAT: Get dynamic file system information
+class FSSTAT3args(xdr_struct):
+    fsroot = nfs_fh3
+
+class FSSTAT3resok(xdr_struct):
+    obj_attributes = post_op_attr
+    tbytes = size3
+    fbytes = size3
+    abytes = size3
+    tfiles = size3
+    ffiles = size3
+    afiles = size3
+    invarsec = uint32
+
+class FSSTAT3resfail(xdr_struct):
+    obj_attributes = post_op_attr
+
+class FSSTAT3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = FSSTAT3resok
+    default.resfail = FSSTAT3resfail
+    _xdr_default = "default"
+
+# FSINFO: Get static file system Information
+FSF3_LINK = 0x0001
+FSF3_SYMLINK = 0x0002
+FSF3_HOMOGENEOUS = 0x0008
+FSF3_CANSETTIME = 0x0010
+
+class FSINFO3args(xdr_struct):
+    fsroot = nfs_fh3
+
+class FSINFO3resok(xdr_struct):
+    obj_attributes = post_op_attr
+    rtmax = uint32
+    rtpref = uint32
+    rtmult = uint32
+    wtmax = uint32
+    wtpref = uint32
+    wtmult = uint32
+    dtpref = uint32
+    maxfilesize = size3
+    time_delta = nfstime3
+    properties = uint32
+
+class FSINFO3resfail(xdr_struct):
+    obj_attributes = post_op_attr
+
+class FSINFO3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = FSINFO3resok
+    default.resfail = FSINFO3resfail
+    _xdr_default = "default"
+
+# PATHCONF: Retrieve POSIX information
+class PATHCONF3args(xdr_struct):
+    object = nfs_fh3
+
+class PATHCONF3resok(xdr_struct):
+    obj_attributes = post_op_attr
+    linkmax = uint32
+    name_max = uint32
+    no_trunc = xdr_bool
+    chown_restricted = xdr_bool
+    case_insensitive = xdr_bool
+    case_preserving = xdr_bool
+
+class PATHCONF3resfail(xdr_struct):
+    obj_attributes = post_op_attr
+
+class PATHCONF3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = PATHCONF3resok
+    default.resfail = PATHCONF3resfail
+    _xdr_default = "default"
+
+# COMMIT: Commit cached data on a server to stable storage
+class COMMIT3args(xdr_struct):
+    file = nfs_fh3
+    offset = offset3
+    count = count3
+
+class COMMIT3resok(xdr_struct):
+    file_wcc = wcc_data
+    verf = writeverf3
+
+class COMMIT3resfail(xdr_struct):
+    file_wcc = wcc_data
+
+class COMMIT3res(xdr_union(status=nfsstat3)):
+    NFS3_OK.resok = COMMIT3resok
+    default.resfail = COMMIT3resfail
+    _xdr_default = "default"
+
+
+# Remote file service routines
+@rpc_program(prog=100003)
+class NFS_PROGRAM(object):
+    def __init__(self):
+        self.NFS_V3 = NFS_PROGRAM.NFS_V3()
+
+    @rpc_version(vers=3)
+    class NFS_V3(object):
+        @rpc_procedure(proc=0, args=xdr_void, ret=xdr_void)
+        def NFSPROC3_NULL(self):
+            pass
+
+        @rpc_procedure(proc=1, args=GETATTR3args, ret=GETATTR3res)
+        def NFSPROC3_GETATTR(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=2, args=SETATTR3args, ret=SETATTR3res)
+        def NFSPROC3_SETATTR(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=3, args=LOOKUP3args, ret=LOOKUP3res)
+        def NFSPROC3_LOOKUP(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=4, args=ACCESS3args, ret=ACCESS3res)
+        def NFSPROC3_ACCESS(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=5, args=READLINK3args, ret=READLINK3res)
+        def NFSPROC3_READLINK(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=6, args=READ3args, ret=READ3res)
+        def NFSPROC3_READ(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=7, args=WRITE3args, ret=WRITE3res)
+        def NFSPROC3_WRITE(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=8, args=CREATE3args, ret=CREATE3res)
+        def NFSPROC3_CREATE(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=9, args=MKDIR3args, ret=MKDIR3res)
+        def NFSPROC3_MKDIR(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=10, args=SYMLINK3args, ret=SYMLINK3res)
+        def NFSPROC3_SYMLINK(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=11, args=MKNOD3args, ret=MKNOD3res)
+        def NFSPROC3_MKNOD(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=12, args=REMOVE3args, ret=REMOVE3res)
+        def NFSPROC3_REMOVE(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=13, args=RMDIR3args, ret=RMDIR3res)
+        def NFSPROC3_RMDIR(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=14, args=RENAME3args, ret=RENAME3res)
+        def NFSPROC3_RENAME(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=15, args=LINK3args, ret=LINK3res)
+        def NFSPROC3_LINK(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=16, args=READDIR3args, ret=READDIR3res)
+        def NFSPROC3_READDIR(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=17, args=READDIRPLUS3args, ret=READDIRPLUS3res)
+        def NFSPROC3_READDIRPLUS(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=18, args=FSSTAT3args, ret=FSSTAT3res)
+        def NFSPROC3_FSSTAT(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=19, args=FSINFO3args, ret=FSINFO3res)
+        def NFSPROC3_FSINFO(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=20, args=PATHCONF3args, ret=PATHCONF3res)
+        def NFSPROC3_PATHCONF(self, rpc_msg, args):
+            pass
+
+        @rpc_procedure(proc=21, args=COMMIT3args, ret=COMMIT3res)
+        def NFSPROC3_COMMIT(self, rpc_msg, args):
+            pass
@@ -3,6 +3,13 @@ The basic NFS server itself.
 """
 
 from nfs import *
+from export import export_error, status_of
+from fattr import attr_cache, fattr_encoder, MAXREAD
+from time import perf_counter
+from xdr import xdr_optional, XDRBadValue
+import stat
+
+_entry_list = xdr_optional(entry4)
 
 
 class verifier_source(object):
@@ -65,14 +72,79 @@ class NFS_state(object):
 
 
 
+class compound_state(object):
+    """
+    What the operations of one COMPOUND share: the current and saved
+    filehandles, and the credentials of the call.
+    """
+    __slots__ = ("rpc_msg", "cred", "current_fh", "saved_fh")
+
+    def __init__(self, rpc_msg):
+        self.rpc_msg = rpc_msg
+        self.cred = getattr(rpc_msg, "cred", None)
+        self.current_fh = None
+        self.saved_fh = None
+
+
+def _failure(res_type, status):
+    """
+    The result of an operation that failed with status.
+    """
+    # SETATTR4res is the only result with members outside its status
+    # arm: the (empty) bitmap of attributes that were set.
+    kwds = dict((m, []) for m in res_type._xdr_member_types if m != "status")
+    return res_type(status=status, **kwds)
+
+
 @rpc_program(prog=100003)
 class NFS4_PROGRAM(object):
-    def __init__(self):
-        self.NFS_V4 = NFS4_PROGRAM.NFS_V4()
+    def __init__(self, export=None):
+        self.NFS_V4 = NFS4_PROGRAM.NFS_V4(export)
     @rpc_version(vers=4)
     class NFS_V4(object):
-        def __init__(self):
+        # the operations on files, which without an export are not
+        # supported.
+        export_operations = ("PUTROOTFH", "PUTPUBFH", "PUTFH", "LOOKUP",
+                             "LOOKUPP", "READ", "WRITE", "COMMIT", "GETATTR",
+                             "READDIR")
+        # the most READ returns at once.
+        max_read = MAXREAD
+
+        def __init__(self, export=None):
+            """
+            export serves the files (see export.py).
+            """
             self.state = NFS_state()
+            self.export = export
+            # changes when the server restarts, and with it anything
+            # written UNSTABLE4 and not committed may have been lost.
+            self.write_verifier = verifier4(self.state.verifier_source.get())
+            self.attributes = attr_cache()
+            self.operations = self.operation_table()
+            # {opnum: [calls, seconds]}
+            self.op_times = {}
+
+        def operation_table(self):
+            """
+            {opnum: (handler, argument arm, result arm, result type)} for
+            every operation of nfs_argop4.  The handler of OP_X is the
+            method X, called as handler(compound_state, args) with args
+            None for an operation without arguments; it is None for an
+            operation that is not implemented.
+            """
+            table = {}
+            for opnum, (name, arg_members) in nfs_argop4._xdr_arms.items():
+                if opnum is None:
+                    continue
+                res_name, res_members = nfs_resop4._xdr_arms[opnum]
+                name = name[len("OP_"):]
+                handler = getattr(self, name, None)
+                if self.export is None and name in self.export_operations:
+                    handler = None
+                arg_arm = arg_members[0][0] if arg_members else None
+                res_arm, res_type = res_members[0]
+                table[opnum] = (handler, arg_arm, res_arm, res_type)
+            return table
 
         @rpc_procedure(proc=0, args=xdr_void, ret=xdr_void)
         def NFSPROC4_NULL(self):
@@ -81,49 +153,266 @@ class NFS4_PROGRAM(object):
         @rpc_procedure(proc=1, args=COMPOUND4args, ret=COMPOUND4res)
         def NFSPROC4_COMPOUND(self, rpc_msg, args):
             print("in nfsproc4_compound")
-            print("msg: %s" % str(rpc_msg))
-            print("args: %s" % str(args))
             rs = []
             status = nfsstat4.NFS4_OK
-            for cmd in args.argarray:
-                stat, res = self.execute_command(rpc_msg, cmd)
-                rs.append(res)
-                status = stat
-            return COMPOUND4res(status=status,
-                                tag=args.tag,
-                                resarray=COMPOUND4res.resarray(rs))
-
-        def execute_command(self, rpc_msg, cmd):
-            print("in execute command")
-            print("cmd: %s" % str(cmd))
-            print("cmd.argop: %d" % cmd.argop)
-            if cmd.argop == nfs_opnum4.OP_SETCLIENTID:
-                opsetclientid = self.SETCLIENTID(rpc_msg, cmd.opsetclientid)
-                return opsetclientid.status, nfs_resop4(resop=nfs_opnum4.OP_SETCLIENTID,
-                                                        opsetclientid=opsetclientid)
-
-        def SETCLIENTID(self, rpc_msg, args):
+            if args.minorversion != 0:
+                status = nfsstat4.NFS4ERR_MINOR_VERS_MISMATCH
+            else:
+                state = compound_state(rpc_msg)
+                # the COMPOUND stops at the first operation that fails,
+                # and its status is that operation's.
+                for cmd in args.argarray:
+                    status, res = self.execute_command(state, cmd)
+                    rs.append(res)
+                    if status != nfsstat4.NFS4_OK:
+                        break
+            return COMPOUND4res.trusted(status=status,
+                                        tag=args.tag,
+                                        resarray=COMPOUND4res.resarray(rs))
+
+        def execute_command(self, state, cmd):
+            """
+            Execute one operation of a COMPOUND.  Returns its status and
+            its nfs_resop4.
+            """
+            opnum = int(cmd.argop)
+            try:
+                handler, arg_arm, res_arm, res_type = self.operations[opnum]
+            except KeyError:
+                # nfs_argop4 decodes an unknown operation as OP_ILLEGAL.
+                opnum = nfs_opnum4.OP_ILLEGAL
+                handler, arg_arm, res_arm, res_type = self.operations[opnum]
+            if handler is None:
+                if opnum == nfs_opnum4.OP_ILLEGAL:
+                    res = _failure(res_type, nfsstat4.NFS4ERR_OP_ILLEGAL)
+                else:
+                    res = _failure(res_type, nfsstat4.NFS4ERR_NOTSUPP)
+            else:
+                start = perf_counter()
+                try:
+                    # lazily decoded arguments are only decoded here, as
+                    # the handler uses them.
+                    args = getattr(cmd, arg_arm) if arg_arm is not None else None
+                    res = handler(state, args)
+                except (export_error, OSError) as e:
+                    res = _failure(res_type, status_of(e))
+                except (XDRBadValue, EOFError):
+                    res = _failure(res_type, nfsstat4.NFS4ERR_BADXDR)
+                elapsed = perf_counter() - start
+                times = self.op_times.get(opnum)
+                if times is None:
+                    times = self.op_times[opnum] = [0, 0.0]
+                times[0] += 1
+                times[1] += elapsed
+            return res.status, nfs_resop4(resop=opnum, **{res_arm: res})
+
+        def report_op_times(self):
+            """
+            Print the calls and time spent in each operation, the most
+            expensive first.
+            """
+            rows = sorted(self.op_times.items(), key=lambda i: -i[1][1])
+            for opnum, (calls, seconds) in rows:
+                print("%-24s %8d calls %10.3f ms %8.2f us/call"
+                      % (nfs_opnum4._xdr_names[opnum], calls, seconds * 1e3,
+                         seconds * 1e6 / calls))
+
+        def PUTROOTFH(self, state, args):
+            state.current_fh = self.export.root()
+            return PUTROOTFH4res(status=nfsstat4.NFS4_OK)
+
+        def PUTPUBFH(self, state, args):
+            state.current_fh = self.export.root()
+            return PUTPUBFH4res(status=nfsstat4.NFS4_OK)
+
+        def PUTFH(self, state, args):
+            # opaque arguments are views into the request; keep a copy.
+            state.current_fh = self.export.check(bytes(args.object.bytes))
+            return PUTFH4res(status=nfsstat4.NFS4_OK)
+
+        def LOOKUP(self, state, args):
+            if state.current_fh is None:
+                return LOOKUP4res(status=nfsstat4.NFS4ERR_NOFILEHANDLE)
+            state.current_fh = self.export.lookup(state.current_fh,
+                                                  bytes(args.objname.bytes))
+            return LOOKUP4res(status=nfsstat4.NFS4_OK)
+
+        def LOOKUPP(self, state, args):
+            if state.current_fh is None:
+                return LOOKUPP4res(status=nfsstat4.NFS4ERR_NOFILEHANDLE)
+            state.current_fh = self.export.parent(state.current_fh)
+            return LOOKUPP4res(status=nfsstat4.NFS4_OK)
+
+        def READ(self, state, args):
+            if state.current_fh is None:
+                return READ4res(status=nfsstat4.NFS4ERR_NOFILEHANDLE)
+            kind = self.export.kind(state.current_fh)
+            if kind == stat.S_IFDIR:
+                return READ4res(status=nfsstat4.NFS4ERR_ISDIR)
+            if kind != stat.S_IFREG:
+                return READ4res(status=nfsstat4.NFS4ERR_INVAL)
+            data, eof = self.export.read(state.current_fh, int(args.offset),
+                                         min(int(args.count), self.max_read))
+            return READ4res(status=nfsstat4.NFS4_OK,
+                            resok4=READ4resok.trusted(
+                                eof=eof, data=READ4resok.data(data)))
+
+        def WRITE(self, state, args):
+            if state.current_fh is None:
+                return WRITE4res(status=nfsstat4.NFS4ERR_NOFILEHANDLE)
+            kind = self.export.kind(state.current_fh)
+            if kind == stat.S_IFDIR:
+                return WRITE4res(status=nfsstat4.NFS4ERR_ISDIR)
+            if kind != stat.S_IFREG:
+                return WRITE4res(status=nfsstat4.NFS4ERR_INVAL)
+            # opaque arguments are views into the request, and the export
+            # keeps unstable data until it is written out; copy it.  Data
+            # a streaming server sank is a file, which the export copies.
+            data = args.data.bytes
+            if isinstance(data, memoryview):
+                data = bytes(data)
+            count, committed = self.export.write(state.current_fh,
+                                                 int(args.offset), data,
+                                                 int(args.stable))
+            return WRITE4res(status=nfsstat4.NFS4_OK,
+                             resok4=WRITE4resok.trusted(
+                                 count=count4(count),
+                                 committed=stable_how4(committed),
+                                 writeverf=self.write_verifier))
+
+        def COMMIT(self, state, args):
+            if state.current_fh is None:
+                return COMMIT4res(status=nfsstat4.NFS4ERR_NOFILEHANDLE)
+            kind = self.export.kind(state.current_fh)
+            if kind == stat.S_IFDIR:
+                return COMMIT4res(status=nfsstat4.NFS4ERR_ISDIR)
+            if kind != stat.S_IFREG:
+                return COMMIT4res(status=nfsstat4.NFS4ERR_INVAL)
+            self.export.commit(state.current_fh, int(args.offset),
+                               int(args.count))
+            return COMMIT4res(status=nfsstat4.NFS4_OK,
+                              resok4=COMMIT4resok.trusted(
+                                  writeverf=self.write_verifier))
+
+        def GETATTR(self, state, args):
+            fh = state.current_fh
+            if fh is None:
+                return GETATTR4res(status=nfsstat4.NFS4ERR_NOFILEHANDLE)
+            st, change, size, mtime_ns = self.export.stat(fh)
+            attrs = self.attributes.get(fh, args.attr_request, st, change,
+                                        size, mtime_ns,
+                                        lambda: self.export.statvfs(fh))
+            return GETATTR4res(status=nfsstat4.NFS4_OK,
+                               resok4=GETATTR4resok.trusted(
+                                   obj_attributes=attrs))
+
+        def READDIR(self, state, args):
+            fh = state.current_fh
+            if fh is None:
+                return READDIR4res(status=nfsstat4.NFS4ERR_NOFILEHANDLE)
+            verifier, names = self.export.readdir(fh)
+            # cookies 1 and 2 are reserved (for "." and ".."); the entry
+            # names[i] has cookie i + 3.
+            cookie = int(args.cookie)
+            if cookie in (1, 2) or cookie - 2 > len(names):
+                return READDIR4res(status=nfsstat4.NFS4ERR_BAD_COOKIE)
+            if cookie and bytes(args.cookieverf.bytes) != verifier:
+                return READDIR4res(status=nfsstat4.NFS4ERR_NOT_SAME)
+            start = cookie - 2 if cookie else 0
+            bitmap = args.attr_request
+            statvfs = None
+            if fattr_encoder.get(bitmap).needs_fs:
+                fs = self.export.statvfs(fh)
+                statvfs = lambda: fs
+            # what maxcount leaves for entries, after the status, the
+            # cookie verifier, the end of the list and eof.
+            room = int(args.maxcount) - 20
+            entries = []
+            eof = True
+            for i in range(start, len(names)):
+                name = names[i]
+                try:
+                    child, (st, change, size, mtime_ns) = \
+                        self.export.child(fh, name)
+                except OSError:
+                    # removed since the directory was listed.
+                    continue
+                attrs = self.attributes.get(child, bitmap, st, change, size,
+                                            mtime_ns, statvfs)
+                # the entry's "more follow", cookie, name and attributes.
+                n = (16 + (len(name) + 3) // 4 * 4 + 8 + 4 * len(attrs.attrmask)
+                     + (len(attrs.attr_vals.bytes) + 3) // 4 * 4)
+                if n > room:
+                    eof = False
+                    break
+                room -= n
+                entries.append((i + 3, name, attrs))
+            if not entries and not eof:
+                return READDIR4res(status=nfsstat4.NFS4ERR_TOOSMALL)
+            # the entries are one list, each with an empty nextentry.
+            entry_list = _entry_list
+            end = entry_list()
+            entries = [ entry4.trusted(cookie=nfs_cookie4(cookie),
+                                       name=component4(name), attrs=attrs,
+                                       nextentry=end)
+                        for cookie, name, attrs in entries ]
+            return READDIR4res(status=nfsstat4.NFS4_OK,
+                               resok4=READDIR4resok.trusted(
+                                   cookieverf=verifier4(verifier),
+                                   reply=dirlist4.trusted(
+                                       entries=entry_list(entries),
+                                       eof=eof)))
+
+        def GETFH(self, state, args):
+            if state.current_fh is None:
+                return GETFH4res(status=nfsstat4.NFS4ERR_NOFILEHANDLE)
+            return GETFH4res(status=nfsstat4.NFS4_OK,
+                             resok4=GETFH4resok.trusted(
+                                 object=nfs_fh4(state.current_fh)))
+
+        def SAVEFH(self, state, args):
+            if state.current_fh is None:
+                return SAVEFH4res(status=nfsstat4.NFS4ERR_NOFILEHANDLE)
+            state.saved_fh = state.current_fh
+            return SAVEFH4res(status=nfsstat4.NFS4_OK)
+
+        def RESTOREFH(self, state, args):
+            if state.saved_fh is None:
+                return RESTOREFH4res(status=nfsstat4.NFS4ERR_RESTOREFH)
+            state.current_fh = state.saved_fh
+            return RESTOREFH4res(status=nfsstat4.NFS4_OK)
+
+        def SETCLIENTID(self, state, args):
             print("in SETCLIENTID")
             print("client: %s" % str(args.client))
             print("callback: %s" % str(args.callback))
             print("callback_ident: %s" % str(args.callback_ident))
-            c, s = self.state.set_clientid(rpc_msg,
-                                           args.client.id, args.client.verifier,
+            # opaque arguments are views into the request; keep a copy.
+            c, s = self.state.set_clientid(state.rpc_msg,
+                                           bytes(args.client.id.bytes),
+                                           args.client.verifier,
                                            (args.callback, args.callback_ident))
             return SETCLIENTID4res(status=nfsstat4.NFS4_OK,
-                                   resok4=SETCLIENTID4resok(clientid=c,
-                                                            setclientid_confirm=s))
+                                   resok4=SETCLIENTID4resok.trusted(
+                                       clientid=c,
+                                       setclientid_confirm=verifier4(s)))
 
 
 if __name__ == "__main__":
     from rpc import rpc_server
-    server = rpc_server(2049)
-    server.add_program(NFS4_PROGRAM())
-    for i in range(60):
-        print("loop.")
-        server.cycle(1000.0)
+    import asyncio
     import sys
-    sys.exit(0)
+    from export import local_export
+    server = rpc_server(2049, fragment_size=65536)
+    export = local_export(sys.argv[1] if len(sys.argv) > 1 else ".")
+    program = NFS4_PROGRAM(export)
+    server.add_program(program)
+    try:
+        asyncio.run(server.serve_forever())
+    finally:
+        # writes not yet written out (UNSTABLE4) would be lost.
+        export.close()
+        program.NFS_V4.report_op_times()
 
 
 
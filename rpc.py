@@ -4,6 +4,12 @@ According to RPC 1831.
 """
 
 from xdr import xdr_enum, xdr_opaque, xdr_struct, xdr_uint, xdr_union, xdr_string, xdr_array, xdr_void, xdr_int
+from xdr import Packer, Unpacker, StreamUnpacker, XDRBadValue, Error, ConversionError
+import logging as _logging
+import struct as _struct
+
+# calls are traced at DEBUG.
+_log = _logging.getLogger("rpc")
 
 class auth_flavor(xdr_enum):
     AUTH_NONE = 0
@@ -93,23 +99,114 @@ class authsys_parms(xdr_struct):
 
 
 
+class call_header(object):
+    """
+    The fields of an RPC call message, as read by unpack_call_header.
+    The opaque_auth bodies are as the unpacker returns opaque data.
+    cred is the decoded credential (the authsys_parms of an AUTH_SYS
+    call, otherwise None), filled in when the call is routed.
+    """
+    __slots__ = ("xid", "rpcvers", "prog", "vers", "proc",
+                 "cred_flavor", "cred_body", "verf_flavor", "verf_body",
+                 "args_offset", "cred")
+
+_call_fields = _struct.Struct(">IiIIIIiI")
+_auth_fields = _struct.Struct(">iI")
+_MAX_AUTH_BYTES = 400
+
+def unpack_call_header(unpacker):
+    """
+    Read an RPC call header (an rpc_msg with a call_body) straight into a
+    call_header, without building the rpc_msg objects.
+    Returns None if the message is not a call.  The unpacker is left at
+    the procedure arguments, whose offset is also kept in args_offset.
+    Raises xdr.Error or EOFError if the header is malformed.
+    """
+    (xid, mtype, rpcvers, prog, vers, proc,
+     cred_flavor, n) = unpacker.unpack_struct(_call_fields)
+    if mtype != msg_type.CALL:
+        return None
+    if n > _MAX_AUTH_BYTES:
+        raise ConversionError("credential body too long: %d" % n)
+    header = call_header()
+    header.xid = xid
+    header.rpcvers = rpcvers
+    header.prog = prog
+    header.vers = vers
+    header.proc = proc
+    header.cred_flavor = cred_flavor
+    header.cred_body = unpacker.unpack_fopaque(n)
+    header.verf_flavor, n = unpacker.unpack_struct(_auth_fields)
+    if n > _MAX_AUTH_BYTES:
+        raise ConversionError("verifier body too long: %d" % n)
+    header.verf_body = unpacker.unpack_fopaque(n)
+    header.args_offset = unpacker.get_position()
+    return header
+
+def stream_call_header(decoder):
+    """
+    unpack_call_header, as a stream for a StreamUnpacker (see
+    xdr_object.stream).  args_offset is left as None.
+    """
+    (xid, mtype, rpcvers, prog, vers, proc,
+     cred_flavor, n) = _call_fields.unpack((yield _call_fields.size))
+    if mtype != msg_type.CALL:
+        return None
+    if n > _MAX_AUTH_BYTES:
+        raise ConversionError("credential body too long: %d" % n)
+    header = call_header()
+    header.xid = xid
+    header.rpcvers = rpcvers
+    header.prog = prog
+    header.vers = vers
+    header.proc = proc
+    header.cred_flavor = cred_flavor
+    header.cred_body = bytes((yield n))
+    header.verf_flavor, n = _auth_fields.unpack((yield _auth_fields.size))
+    if n > _MAX_AUTH_BYTES:
+        raise ConversionError("verifier body too long: %d" % n)
+    header.verf_body = bytes((yield n))
+    header.args_offset = None
+    return header
+
+call_header.stream = staticmethod(stream_call_header)
+
+
+def _index(values, key):
+    """
+    {key: value} for the values with that attribute, keeping the first
+    of any duplicates.
+    """
+    import types
+    index = {}
+    for v in values:
+        k = getattr(v, key, None)
+        if k is not None and k not in index:
+            index[k] = v
+    return types.MappingProxyType(index)
+
 def rpc_program(prog):
+    """
+    Declares a class as an RPC program.
+    The versions declared on the class are indexed by version number
+    once, here; the versions held by an instance are indexed when it is
+    created.  version_low and version_high are the range of versions an
+    instance implements, for PROG_MISMATCH replies.
+    """
     def _rpc_program(cls):
         cls.program_id = prog
+        cls.version_decls = _index(cls.__dict__.values(), "version_id")
+        init = cls.__init__
+        def __init__(self, *args, **kwargs):
+            init(self, *args, **kwargs)
+            self.version_impls = _index(self.__dict__.values(), "version_id")
+            self.version_low = min(self.version_impls, default=None)
+            self.version_high = max(self.version_impls, default=None)
         def get_version_decl(cls, vers):
-            for v in cls.__dict__.values():
-                try:
-                    if v.version_id == vers:
-                        return v
-                except AttributeError as e:
-                    pass
+            return cls.version_decls.get(vers)
         def get_version_impl(self, vers):
-            for v in self.__dict__.values():
-                try:
-                    if v.version_id == vers:
-                        return v
-                except AttributeError as e:
-                    pass
+            return self.version_impls.get(vers)
+        cls.__init__ = __init__
         cls.get_version_decl = classmethod(get_version_decl)
         cls.get_version_impl = get_version_impl
         return cls
@@ -117,19 +214,18 @@ def rpc_program(prog):
     return _rpc_program
 
 def rpc_version(vers):
+    """
+    Declares a class as a version of an RPC program.
+    Its procedures are indexed by number and by name once, here.
+    """
     def _rpc_version(cls):
         cls.version_id = vers
+        cls.procedures_by_id = _index(cls.__dict__.values(), "procedure_id")
+        cls.procedures_by_name = _index(cls.procedures_by_id.values(), "__name__")
         def get_procedure_by_id(cls, proc):
-            for k, v in cls.__dict__.items():
-                try:
-                    if v.procedure_id == proc:
-                        return v
-                except AttributeError as e:
-                    pass
+            return cls.procedures_by_id.get(proc)
         def get_procedure_by_name(cls, proc):
-            for k, v in cls.__dict__.items():
-                if k == proc:
-                    return v
+            return cls.procedures_by_name.get(proc)
         cls.get_procedure_by_id = classmethod(get_procedure_by_id)
         cls.get_procedure_by_name = classmethod(get_procedure_by_name)
         return cls
@@ -181,45 +277,230 @@ if __name__ == "__main__":
     print("proc PINGPROC_PINGPROC: %s" % str(ping_prog_vers.get_procedure_by_name("PINGPROC_PINGPROC")))
 
 
+class rpc_error(Exception):
+    """
+    A call was answered with anything other than MSG_ACCEPTED/SUCCESS.
+    The decoded reply is in .reply.
+    """
+    def __init__(self, reply):
+        Exception.__init__(self, reply)
+        self.reply = reply
+
+
+class rpc_call(object):
+    """
+    One procedure of an rpc_client.
+    await it with the procedure arguments, or use .sync() to block.
+    """
+    def __init__(self, client, procedure):
+        self.client = client
+        self.procedure = procedure
+        # everything in the call header but the xid is the same for
+        # every call, so it is encoded once here.
+        msg = rpc_msg(xid=0,
+                      body=rpc_msg.body(mtype=msg_type.CALL,
+                                        cbody=call_body(rpcvers=2,
+                                                        prog=client.program.program_id,
+                                                        vers=client.version.version_id,
+                                                        proc=procedure.procedure_id,
+                                                        cred=opaque_auth.NONE(),
+                                                        verf=opaque_auth.NONE())))
+        packer = Packer()
+        msg.pack(packer)
+        header = packer.get_buffer()[4:]
+        self.header = _struct.Struct(">I%ds" % len(header))
+        self.header_tail = header
+
+    def __call__(self, arg=None, timeout=None):
+        return self.client._call_async(self, arg, timeout)
+
+    def sync(self, arg=None, timeout=None):
+        return self.client._call_sync(self, arg, timeout)
+
+
 class rpc_client(object):
-    def __init__(self, prog, vers, tcp_client):
+    """
+    An RPC client for one program version over one tcp_client.
+
+    Calls are multiplexed on the connection: each gets its own xid, and
+    replies are matched back to their calls by xid in whatever order
+    they arrive.  At most window calls are in flight at a time.
+
+        reply = await client.NFSPROC4_COMPOUND(args)
+        reply = client.NFSPROC4_COMPOUND.sync(args)
+
+    Async calls need the running event loop to watch the connection, so
+    don't mix them with sync calls on the same client.
+
+    With plain=True, scalars in results are decoded as plain Python
+    values (see xdr.Unpacker), which keeps large results much smaller.
+    """
+    def __init__(self, prog, vers, tcp_client, window=64, timeout=None,
+                 plain=False):
         self.program = prog
         self.version = self.program.get_version_impl(vers)
         self.tcp_client = tcp_client
+        self.window = window
+        self.timeout = timeout
+        self.plain = plain
         self.xid = 1
+        # xid -> (rpc_call, future or sync result list)
+        self.calls = {}
+        self.slots = None
+        self.loop = None
 
     def __getattr__(self, proc):
         procedure = self.version.get_procedure_by_name(proc)
         if not procedure:
-            raise AttributeError
-        print("procedure: %s" % str(procedure))
-        class _procedure(object):
-            def __init__(self, procedure, tcp_client, prog, vers, xid):
-                self.procedure = procedure
-                self.tcp_client = tcp_client
-                self.prog = prog
-                self.vers = vers
-                self.xid = xid
-            def __call__(self, arg):
-                msg = rpc_msg(xid=self.xid,
-                              body=rpc_msg.body(mtype=msg_type.CALL,
-                                                cbody=call_body(rpcvers=2,
-                                                                prog=self.prog,
-                                                                vers=self.vers,
-                                                                proc=self.procedure.procedure_id,
-                                                                cred=opaque_auth.NONE(),
-                                                                verf=opaque_auth.NONE())))
-                from xdrlib import Packer
-                packer = Packer()
-                msg.pack(packer)
-                print("msg: %s" % packer.get_buffer())
-                arg.pack(packer)
-                print("msg: %s" % packer.get_buffer())
+            raise AttributeError(proc)
+        call = rpc_call(self, procedure)
+        # later lookups find the instance attribute directly.
+        setattr(self, proc, call)
+        return call
 
+    def _next_xid(self):
         xid = self.xid
-        self.xid += 1
-        return _procedure(procedure, None,
-                          self.program.program_id, self.version.version_id, xid)
+        self.xid = (self.xid + 1) % 2**32
+        return xid
+
+    def _pack_call(self, xid, call, arg):
+        packer = Packer()
+        packer.pack_struct(call.header, xid, call.header_tail)
+        if arg is None:
+            arg = xdr_void()
+        arg.pack(packer)
+        return packer.get_buffers()
+
+    def _receive_replies(self):
+        """
+        Match the replies the connection has received to their calls.
+        """
+        while True:
+            message = self.tcp_client.pop_message()
+            if message is None:
+                return
+            unpacker = Unpacker(message, zero_copy=True)
+            reply = rpc_msg.unpack(unpacker)
+            unpacker.plain = self.plain
+            call = self.calls.pop(reply.xid, None)
+            if call is None or reply.body.mtype != msg_type.REPLY:
+                # a reply to a call that timed out, or not a reply at all.
+                continue
+            call, waiter = call
+            rbody = reply.body.rbody
+            if (rbody.stat == reply_stat.MSG_ACCEPTED and
+                rbody.areply.reply_data.stat == accept_stat.SUCCESS):
+                try:
+                    result = call.procedure.return_type.unpack(unpacker)
+                except (Exception, XDRBadValue) as e:
+                    result, error = None, e
+                else:
+                    error = None
+            else:
+                result, error = None, rpc_error(reply)
+            if isinstance(waiter, list):
+                waiter.extend((result, error))
+            elif not waiter.done():
+                if error is None:
+                    waiter.set_result(result)
+                else:
+                    waiter.set_exception(error)
+
+    def _call_sync(self, call, arg, timeout):
+        """
+        Send one call and cycle the connection until it is answered.
+        """
+        import time
+        if timeout is None:
+            timeout = self.timeout
+        xid = self._next_xid()
+        waiter = []
+        self.calls[xid] = (call, waiter)
+        self.tcp_client.push_message(self._pack_call(xid, call, arg))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while not waiter:
+                if deadline is None:
+                    wait = 1000.0
+                else:
+                    wait = (deadline - time.monotonic()) * 1000.0
+                    if wait <= 0:
+                        raise TimeoutError("no reply to xid %d" % xid)
+                self.tcp_client.cycle_network(wait)
+                self._receive_replies()
+        finally:
+            self.calls.pop(xid, None)
+        result, error = waiter
+        if error is not None:
+            raise error
+        return result
+
+    def _attach(self):
+        """
+        Have the running event loop watch the connection.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if self.loop is loop:
+            return
+        self.loop = loop
+        self.slots = asyncio.Semaphore(self.window)
+        loop.add_reader(self.tcp_client.socket.fileno(), self._readable)
+
+    def _readable(self):
+        from tcp import SocketClosed
+        try:
+            self.tcp_client._receive()
+        except SocketClosed:
+            self._closed()
+            return
+        self._receive_replies()
+
+    def _writable(self):
+        from tcp import SocketClosed
+        try:
+            self.tcp_client._send()
+        except SocketClosed:
+            self._closed()
+            return
+        if not self.tcp_client.out_buffers:
+            self.loop.remove_writer(self.tcp_client.socket.fileno())
+
+    def _closed(self):
+        from tcp import SocketClosed
+        fd = self.tcp_client.socket.fileno()
+        if fd >= 0:
+            self.loop.remove_reader(fd)
+            self.loop.remove_writer(fd)
+        calls, self.calls = self.calls, {}
+        for call, waiter in calls.values():
+            if not waiter.done():
+                waiter.set_exception(SocketClosed())
+
+    async def _call_async(self, call, arg, timeout):
+        import asyncio
+        from tcp import SocketClosed
+        self._attach()
+        if timeout is None:
+            timeout = self.timeout
+        async with self.slots:
+            xid = self._next_xid()
+            waiter = self.loop.create_future()
+            self.calls[xid] = (call, waiter)
+            client = self.tcp_client
+            had_output = bool(client.out_buffers)
+            client.push_message(self._pack_call(xid, call, arg))
+            try:
+                client._push_data_around()
+            except SocketClosed:
+                self._closed()
+            else:
+                if client.out_buffers and not had_output:
+                    self.loop.add_writer(client.socket.fileno(), self._writable)
+            try:
+                return await asyncio.wait_for(waiter, timeout)
+            finally:
+                self.calls.pop(xid, None)
 
 
 if __name__ == "__main__":
@@ -234,13 +515,36 @@ if __name__ == "__main__":
 class rpc_server(object):
     """
     Run an RPC server.
+
+    With lazy=True, arguments are decoded with Unpacker(lazy=True): the
+    members of argument structs and unions are only decoded when a
+    procedure looks at them.  That is slower for calls whose arguments
+    are all used.
+
+    With streaming=True, serve_forever() decodes each call while its
+    record is still arriving (see stream_message), and variable-length
+    opaque arguments of at least sink_threshold bytes are written to the
+    file-like object sink(n) returns, if there is a sink, instead of
+    being buffered.  Procedures then get that file as the opaque's bytes.
+
+    With a fragment_size, results are packed as they are sent, in
+    fragments of about that many bytes (see Packer.pack_fragments),
+    rather than all at once.
     """
-    def __init__(self, server_port):
+    def __init__(self, server_port, lazy=False, streaming=False, sink=None,
+                 sink_threshold=4096, fragment_size=None):
         from tcp import tcp_server
         self.tcp_server = tcp_server(server_port)
+        self.lazy = lazy
+        self.streaming = streaming
+        self.sink = sink
+        self.sink_threshold = sink_threshold
+        self.fragment_size = fragment_size
         self.programs = {}
         self.next_short_id = 1
         self.system_auth = {}
+        # (reply_stat, accept/reject stat, mismatch) -> packed header
+        self.reply_headers = {}
 
     def add_program(self, prog):
         self.programs[prog.program_id] = prog
@@ -254,103 +558,306 @@ class rpc_server(object):
             m = self.tcp_server.pop_message()
             if not m: break
             client_id, message = m
-            print("Got message!")
-            print("Client id: %d" % client_id)
-            print("Message: %s" % message)
             response = self.handle_message(message, client_id)
-            print("Response: %s" % response)
             if response is not None:
-                print("Sending response.")
                 self.tcp_server.push_message(client_id, response)
 
+    async def serve_forever(self):
+        """
+        Serve the listening socket from the running asyncio event loop,
+        instead of calling cycle() in a loop.  Each record is handled as
+        soon as it has arrived.
+        """
+        import asyncio
+        import itertools
+        from tcp import tcp_protocol, tcp_stream_protocol
+        client_ids = itertools.count()
+        loop = asyncio.get_running_loop()
+        if self.streaming:
+            protocol = lambda: tcp_stream_protocol(self.stream_message,
+                                                   next(client_ids))
+        else:
+            protocol = lambda: tcp_protocol(self.handle_message,
+                                            next(client_ids))
+        server = await loop.create_server(protocol,
+                                          sock=self.tcp_server.socket)
+        async with server:
+            await server.serve_forever()
+
     def handle_message(self, opaque_bytes, client_id):
         """
         Handles a message, start to finish.
         Takes the opaque bytes representing the XDR encoded RPC message.
-        Produces an RPC reply, also encoded as opaque bytes.
+        Produces an RPC reply, also encoded as opaque bytes (or as a list
+        of buffers, as from Packer.get_buffers(), or with a fragment_size
+        an iterator of them, as from Packer.pack_fragments()).
+
+        Opaque arguments are decoded as memoryviews into opaque_bytes, and
+        are released once the reply has been packed (for an iterator of
+        fragments, once it is exhausted or closed): procedures must copy
+        any opaque data they keep past the reply.
         """
-        from xdrlib import Unpacker, Packer
-        unpacker = Unpacker(opaque_bytes)
-        msg = rpc_msg.unpack(unpacker)
-        print(msg.body.mtype.value)
-        if msg.body.mtype != msg_type.CALL:
+        unpacker = Unpacker(opaque_bytes, zero_copy=True, lazy=self.lazy)
+        try:
+            reply = self._handle_message(unpacker, opaque_bytes, client_id)
+        except BaseException:
+            unpacker.release()
+            raise
+        if hasattr(reply, "__next__"):
+            return _released_after(reply, unpacker)
+        unpacker.release()
+        return reply
+
+    def _handle_message(self, unpacker, opaque_bytes, client_id):
+        try:
+            msg = unpack_call_header(unpacker)
+        except (Error, EOFError) as e:
+            print("Malformed message: %r" % e)
+            return None # there is no xid we can trust to reply to.
+        if msg is None:
             print("No reply!")
             return None # do not reply to such a bad message.
-        #response = self.handle_message(msg,
-        #                               opaque_bytes[unpacker.get_position():])
-        print("Well-formed message!")
-        print("rpc version: %d" % msg.body.cbody.rpcvers)
-        print("program id: %d" % msg.body.cbody.prog)
-        print("version id: %d" % msg.body.cbody.vers)
-        print("procedure id: %d" % msg.body.cbody.proc)
-        print("cred flavor: %d" % msg.body.cbody.cred.flavor)
-        print("verf flavor: %d" % msg.body.cbody.verf.flavor)
-        print("remaining bytes: %s" % opaque_bytes[unpacker.get_position():])
-
-        if msg.body.cbody.cred.flavor == auth_flavor.AUTH_SYS:
-            print("using system auth")
-            unpacker2 = Unpacker(msg.body.cbody.cred.body.bytes)
-            params = authsys_parms.unpack(unpacker2)
-            print(params)
+        _log.debug("call %d: program %d version %d procedure %d, "
+                   "%d bytes of arguments", msg.xid, msg.prog, msg.vers,
+                   msg.proc, len(opaque_bytes) - msg.args_offset)
+        reply, call = self._route(msg)
+        if call is None:
+            return reply
+        verf, version, procedure = call
+        try:
+            args = procedure.argument_type.unpack(unpacker)
+        except (Exception, XDRBadValue) as e:
+            print("garbage args: %r" % e)
+            return self._reply_header(msg.xid, verf, reply_stat.MSG_ACCEPTED,
+                                      accept_stat.GARBAGE_ARGS).get_buffer()
+        return self._call(msg, verf, version, procedure, args)
+
+    def stream_message(self, client_id):
+        """
+        The receiver of one message, for tcp_stream_protocol: the call
+        header and arguments are decoded as the record arrives, and the
+        procedure called once it has all arrived.
+        """
+        return _rpc_stream(self, client_id)
+
+    def _route(self, msg):
+        """
+        Authenticate a call and find its procedure.
+        Returns (None, (verf, version, procedure)) for a call that can be
+        made, otherwise (reply, None) with the reply to send for it.
+        """
+        if msg.cred_flavor == auth_flavor.AUTH_SYS:
+            unpacker2 = Unpacker(msg.cred_body)
+            try:
+                params = authsys_parms.unpack(unpacker2)
+            except (Error, EOFError, XDRBadValue) as e:
+                print("bad credentials: %r" % e)
+                return self._reply_header(msg.xid, None, reply_stat.MSG_DENIED,
+                                          reject_stat.AUTH_ERROR,
+                                          auth_stat.AUTH_BADCRED).get_buffer(), None
             id = self.next_short_id
             self.next_short_id += 1
             self.system_auth[id] = params
+            msg.cred = params
             packer = Packer()
             packer.pack_uint(id)
             verf = opaque_auth(flavor=auth_flavor.AUTH_SHORT,
                                body=packer.get_buffer())
         else:
-            verf = opaque_auth.NONE()
+            # AUTH_NONE; its reply headers are cached.
+            msg.cred = None
+            verf = None
+
+        xid = msg.xid
+        if msg.rpcvers != 2:
+            return self._reply_header(xid, verf, reply_stat.MSG_DENIED,
+                                      reject_stat.RPC_MISMATCH,
+                                      (2, 2)).get_buffer(), None
+
+        program = self.programs.get(msg.prog)
+        if program is None:
+            return self._reply_header(xid, verf, reply_stat.MSG_ACCEPTED,
+                                      accept_stat.PROG_UNAVAIL).get_buffer(), None
+        version = program.get_version_impl(msg.vers)
+        if version is None:
+            return self._reply_header(xid, verf, reply_stat.MSG_ACCEPTED,
+                                      accept_stat.PROG_MISMATCH,
+                                      (program.version_low,
+                                       program.version_high)).get_buffer(), None
+        procedure = version.get_procedure_by_id(msg.proc)
+        if procedure is None:
+            return self._reply_header(xid, verf, reply_stat.MSG_ACCEPTED,
+                                      accept_stat.PROC_UNAVAIL).get_buffer(), None
+        return None, (verf, version, procedure)
 
-        def _pack(reply):
+    def _call(self, msg, verf, version, procedure, args):
+        """
+        Call a procedure, and pack its reply.
+        """
+        xid = msg.xid
+        try:
+            if procedure.argument_type is xdr_void:
+                response = procedure(version)
+            else:
+                response = procedure(version, msg, args)
+        except (XDRBadValue, EOFError) as e:
+            # arguments decoded lazily, as the procedure used them.
+            print("garbage args: %r" % e)
+            return self._reply_header(xid, verf, reply_stat.MSG_ACCEPTED,
+                                      accept_stat.GARBAGE_ARGS).get_buffer()
+        except Exception:
+            import traceback
+            traceback.print_exc()
+            return self._reply_header(xid, verf, reply_stat.MSG_ACCEPTED,
+                                      accept_stat.SYSTEM_ERR).get_buffer()
+        packer = self._reply_header(xid, verf, reply_stat.MSG_ACCEPTED,
+                                    accept_stat.SUCCESS)
+        if procedure.return_type is not xdr_void:
+            try:
+                if not isinstance(response, procedure.return_type):
+                    # a plain value, such as an int for an xdr_int.
+                    response = procedure.return_type(response)
+                if self.fragment_size is not None:
+                    # packed as it is sent, when it is too late to send
+                    # an error instead.
+                    return packer.pack_fragments(response,
+                                                 self.fragment_size)
+                response.pack(packer)
+            except (Exception, XDRBadValue):
+                import traceback
+                traceback.print_exc()
+                return self._reply_header(xid, verf, reply_stat.MSG_ACCEPTED,
+                                          accept_stat.SYSTEM_ERR).get_buffer()
+        return packer.get_buffers()
+
+    def _reply_header(self, xid, verf, stat, reason, mismatch=None):
+        """
+        A Packer holding the reply header for xid.
+        stat is the reply_stat, reason the accept_stat or reject_stat, and
+        mismatch a (low, high) pair for PROG_MISMATCH and RPC_MISMATCH, or
+        the auth_stat of an AUTH_ERROR.
+        Only the xid differs between replies with the same AUTH_NONE
+        verifier, stat and reason, so those are packed once and kept.
+        """
+        key = (stat, reason, mismatch)
+        header = self.reply_headers.get(key) if verf is None else None
+        if header is None:
+            if stat == reply_stat.MSG_DENIED:
+                if reason == reject_stat.AUTH_ERROR:
+                    rreply = rejected_reply(stat=reason, error_stat=mismatch)
+                elif mismatch is not None:
+                    rreply = rejected_reply(stat=reason,
+                                            mismatch_info=mismatch_info(low=mismatch[0],
+                                                                        high=mismatch[1]))
+                else:
+                    rreply = rejected_reply(stat=reason)
+                rbody = reply_body(stat=stat, rreply=rreply)
+            else:
+                if mismatch is not None:
+                    rdata = accepted_reply.reply_data(stat=reason,
+                                                      mismatch_info=mismatch_info(low=mismatch[0],
+                                                                                  high=mismatch[1]))
+                else:
+                    rdata = accepted_reply.reply_data(stat=reason)
+                rbody = reply_body(stat=stat,
+                                   areply=accepted_reply(verf=verf or opaque_auth.NONE(),
+                                                         reply_data=rdata))
             packer = Packer()
-            reply.pack(packer)
-            return packer.get_buffer()
-        _body = rpc_msg.body
-        _rbody = reply_body
-        _rreply = rejected_reply
-        _areply = accepted_reply
-        _rdata = accepted_reply.reply_data
-        
-        if msg.body.cbody.rpcvers != 2:
-            reply = rpc_msg(xid=msg.xid,
-                            body=_body(mtype=msg_type.REPLY,
-                                       rbody=_rbody(stat=reply_stat.MSG_DENIED,
-                                                    rreply=_rreply(stat=reject_stat.RPC_MISMATCH,
-                                                                   mismatch_info=mismatch_info(low=2, high=2)))))
-            return _pack(reply)
+            rpc_msg(xid=0,
+                    body=rpc_msg.body(mtype=msg_type.REPLY,
+                                      rbody=rbody)).pack(packer)
+            tail = packer.get_buffer()[4:]
+            header = (_struct.Struct(">I%ds" % len(tail)), tail)
+            if verf is None:
+                self.reply_headers[key] = header
+        packer = Packer()
+        packer.pack_struct(header[0], xid, header[1])
+        return packer
 
-        if msg.body.cbody.prog not in self.programs:
-            print("no such program!")
-            reply = rpc_msg(xid=msg.xid,
-                            body=_body(mtype=msg_type.REPLY,
-                                       rbody=_rbody(stat=reply_stat.MSG_ACCEPTED,
-                                                    areply=_areply(verf=verf,
-                                                                   reply_data=_rdata(stat=accept_stat.PROG_UNAVAIL)))))
-            return _pack(reply)
 
-        program = self.programs[msg.body.cbody.prog]
-        print("program: %s" % str(program))
-        version = program.get_version_impl(msg.body.cbody.vers)
-        print("version: %s" % str(version))
-        procedure = version.get_procedure_by_id(msg.body.cbody.proc)
-        print("procedure: %s" % str(procedure))
-        print("procedure.arg_type: %s" % str(procedure.argument_type))
-        args = procedure.argument_type.unpack(unpacker)
-        print("args: %s" % str(args))
-        response = procedure(version, msg, args)
-        print("response: %s" % str(response))
-        reply = rpc_msg(xid=msg.xid,
-                        body=_body(mtype=msg_type.REPLY,
-                                   rbody=_rbody(stat=reply_stat.MSG_ACCEPTED,
-                                                areply=_areply(verf=verf,
-                                                               reply_data=_rdata(stat=accept_stat.SUCCESS)))))
-        print("reply: %s" % str(reply))
-        packer = Packer()
-        reply.pack(packer)
-        response.pack(packer)
-        print("bytes: %s" % str(packer.get_buffer()))
-        return packer.get_buffer()
+def _released_after(fragments, unpacker):
+    """
+    The fragments of a reply, releasing the views of the request they
+    may be packed from once they have all been taken.
+    """
+    try:
+        yield from fragments
+    finally:
+        unpacker.release()
+
+
+class _rpc_stream(object):
+    """
+    One message being received by an rpc_server in streaming mode.
+    feed() decodes its call header, and then its arguments, from each
+    piece of the record as it arrives; close() makes the call once the
+    record is complete, and returns the reply.
+    """
+    def __init__(self, server, client_id):
+        self.server = server
+        self.client_id = client_id
+        self.decoder = StreamUnpacker(sink=server.sink,
+                                      sink_threshold=server.sink_threshold)
+        self.decoder.expect(call_header)
+        self.msg = None
+        self.call = None
+        self.args = None
+        # the reply, once known before the arguments are in.
+        self.reply = None
+        # nothing more to do with this message.
+        self.dropped = False
+
+    def feed(self, data):
+        if self.dropped:
+            return
+        try:
+            for name, value in self.decoder.feed(data):
+                if self.msg is None:
+                    self._header(value)
+                else:
+                    self.args = value
+        except (Error, EOFError) as e:
+            if self.msg is None:
+                print("Malformed message: %r" % e)
+                self.dropped = True # no xid we can trust to reply to.
+            else:
+                self._garbage(e)
+        except (Exception, XDRBadValue) as e:
+            self._garbage(e)
+
+    def _header(self, msg):
+        if msg is None:
+            print("No reply!")
+            self.dropped = True
+            return
+        self.msg = msg
+        self.reply, self.call = self.server._route(msg)
+        if self.call is None:
+            self.dropped = True
+            return
+        verf, version, procedure = self.call
+        self.decoder.expect(procedure.argument_type)
+
+    def _garbage(self, e):
+        print("garbage args: %r" % e)
+        # the call is None when routing it failed.
+        verf = self.call[0] if self.call is not None else None
+        self.reply = self.server._reply_header(
+            self.msg.xid, verf, reply_stat.MSG_ACCEPTED,
+            accept_stat.GARBAGE_ARGS).get_buffer()
+        self.dropped = True
+
+    def close(self):
+        if self.dropped:
+            return self.reply
+        if self.msg is None:
+            print("Malformed message: truncated header")
+            return None
+        if self.args is None:
+            self._garbage(EOFError())
+            return self.reply
+        verf, version, procedure = self.call
+        return self.server._call(self.msg, verf, version, procedure, self.args)
 
 
 
@@ -400,7 +907,7 @@ class rpc_server(object):
         Takes the opaque bytes representing the XDR encoded RPC message.
         Produces an RPC reply, also encoded as opaque bytes.
         """
-        from xdrlib import Unpacker, Packer
+        from xdr import Unpacker, Packer
         unpacker = Unpacker(opaque_bytes)
         msg = rpc_msg.unpack(unpacker)
         def _pack(reply):
@@ -501,7 +1008,7 @@ class rpc_server(object):
         self.programs[program.program_id][program.version_id] = program
 
 
-from xdrlib import Unpacker, Packer
+from xdr import Unpacker, Packer
 
 m = rpc_msg(xid=2,
             body=rpc_msg.body(mtype=msg_type.CALL,
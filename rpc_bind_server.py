@@ -17,28 +17,28 @@ class RPCBPROG(object):
         def __init__(self):
             pass
         @rpc_procedure(proc=1, args=rpcb, ret=xdr_bool)
-        def RPCBPROC_SET(self, arg):
+        def RPCBPROC_SET(self, rpc_msg, args):
             pass
         @rpc_procedure(proc=2, args=rpcb, ret=xdr_bool)
-        def RPCBPROC_UNSET(self, arg):
+        def RPCBPROC_UNSET(self, rpc_msg, args):
             pass
-        @rpc_procedure(proc=3, args=rpcb, ret=xdr_string)
-        def RPCBPROC_GETADDR(self, arg):
+        @rpc_procedure(proc=3, args=rpcb, ret=xdr_string())
+        def RPCBPROC_GETADDR(self, rpc_msg, args):
             pass
         @rpc_procedure(proc=4, args=xdr_void, ret=rpcblist_ptr)
-        def RPCBPROC_DUMP(self, arg):
+        def RPCBPROC_DUMP(self):
             pass
         @rpc_procedure(proc=5, args=rpcb_rmtcallargs, ret=rpcb_rmtcallres)
-        def RPCBPROC_CALLIT(self, arg):
+        def RPCBPROC_CALLIT(self, rpc_msg, args):
             pass
         @rpc_procedure(proc=6, args=xdr_void, ret=xdr_uint)
-        def RPCBPROC_GETTIME(self, arg):
+        def RPCBPROC_GETTIME(self):
             pass
-        @rpc_procedure(proc=7, args=xdr_string, ret=netbuf)
-        def RPCBPROC_UADDR2TADDR(self, arg):
+        @rpc_procedure(proc=7, args=xdr_string(), ret=netbuf)
+        def RPCBPROC_UADDR2TADDR(self, rpc_msg, args):
             pass
-        @rpc_procedure(proc=1, args=netbuf, ret=xdr_string)
-        def RPCBPROC_TADDR2UADDR(self, arg):
+        @rpc_procedure(proc=8, args=netbuf, ret=xdr_string())
+        def RPCBPROC_TADDR2UADDR(self, rpc_msg, args):
             pass
 
     @rpc_version(vers=4)
@@ -46,19 +46,19 @@ class RPCBPROG(object):
         def __init__(self):
             pass
         @rpc_procedure(proc=1, args=rpcb, ret=xdr_bool)
-        def RPCBPROC_SET(self, arg):
+        def RPCBPROC_SET(self, rpc_msg, args):
             pass
         @rpc_procedure(proc=2, args=rpcb, ret=xdr_bool)
-        def RPCBPROC_UNSET(self, arg):
+        def RPCBPROC_UNSET(self, rpc_msg, args):
             pass
-        @rpc_procedure(proc=3, args=rpcb, ret=xdr_string)
-        def RPCBPROC_GETADDR(self, arg):
+        @rpc_procedure(proc=3, args=rpcb, ret=xdr_string())
+        def RPCBPROC_GETADDR(self, rpc_msg, args):
             pass
         @rpc_procedure(proc=4, args=xdr_void, ret=rpcblist_ptr)
         def RPCBPROC_DUMP(self):
             pass
         @rpc_procedure(proc=5, args=rpcb_rmtcallargs, ret=rpcb_rmtcallres)
-        def RPCBPROC_BCAST(self, arg):
+        def RPCBPROC_BCAST(self, rpc_msg, args):
             """
             NOTE: RPCBPROC_BCAST has the same functionality as CALLIT;
             the new name is intended to indicate that this
@@ -69,20 +69,20 @@ class RPCBPROG(object):
         @rpc_procedure(proc=6, args=xdr_void, ret=xdr_uint)
         def RPCBPROC_GETTIME(self):
             pass
-        @rpc_procedure(proc=7, args=xdr_string, ret=netbuf)
-        def RPCBPROC_UADDR2TADDR(self, arg):
+        @rpc_procedure(proc=7, args=xdr_string(), ret=netbuf)
+        def RPCBPROC_UADDR2TADDR(self, rpc_msg, args):
             pass
-        @rpc_procedure(proc=8, args=netbuf, ret=xdr_string)
-        def RPCBPROC_TADDR2UADDR(self, arg):
+        @rpc_procedure(proc=8, args=netbuf, ret=xdr_string())
+        def RPCBPROC_TADDR2UADDR(self, rpc_msg, args):
             pass
-        @rpc_procedure(proc=9, args=rpcb, ret=xdr_string)
-        def RPCBPROC_GETVERSADDR(self, arg):
+        @rpc_procedure(proc=9, args=rpcb, ret=xdr_string())
+        def RPCBPROC_GETVERSADDR(self, rpc_msg, args):
             pass
         @rpc_procedure(proc=10, args=rpcb_rmtcallargs, ret=rpcb_rmtcallres)
-        def RPCBPROC_INDIRECT(self, arg):
+        def RPCBPROC_INDIRECT(self, rpc_msg, args):
             pass
         @rpc_procedure(proc=11, args=rpcb, ret=rpcb_entry_list_ptr)
-        def RPCBPROC_GETADDRLIST(self, arg):
+        def RPCBPROC_GETADDRLIST(self, rpc_msg, args):
             pass
         @rpc_procedure(proc=12, args=xdr_void, ret=rpcb_stat_byvers)
         def RPCBPROC_GETSTAT(self):
@@ -91,11 +91,8 @@ class RPCBPROG(object):
 
 if __name__ == "__main__":
     from rpc import rpc_server
+    import asyncio
     server = rpc_server(111)
     server.add_program(RPCBPROG())
-    for i in range(60):
-        print("loop.")
-        server.cycle(1000.0)
-    import sys
-    sys.exit(0)
+    asyncio.run(server.serve_forever())
 
@@ -1,18 +1,48 @@
 """
 Basic TCP client/server for the purposes of ONC-RPC.
+Records are sent using the record marking standard of RFC 5531.
 """
 
+import asyncio as _asyncio
+import collections as _collections
+import errno as _errno
+import itertools as _itertools
+import os as _os
+import socket as _socket
+import struct as _struct
+
+from xdr import file_data
+
+_record_mark = _struct.Struct(">I")
+
+# the largest fragment the record mark can describe.
+MAX_FRAGMENT = 2**31 - 1
+# the largest record received; a connection sending a larger one is
+# dropped.
+MAX_RECORD = 16 << 20
+# record marks and small records are parsed out of a buffer this large;
+# larger record bodies are received directly into their own buffer.
+RECV_BUFFER = 65536
+# the most buffers handed to a single sendmsg call.
+IOV_MAX = 1024
+# how much of the messages being sent is taken from them at a time; a
+# message given as an iterator of fragments is only produced this far
+# ahead of the socket.
+OUT_BUFFER = 262144
+
+_sendfile = getattr(_os, "sendfile", None)
+# sendmsg flag: more data follows (Linux).
+_MSG_MORE = getattr(_socket, "MSG_MORE", 0)
+
+
 def _length_from_bytes(four_bytes):
     """
     The RPC standard calls for the length of a message to be sent as the least
     significant 31 bits of an XDR encoded unsigned integer.  The most
-    significant bit encodes a True/False bit which indicates that this message
-    will be the last.
+    significant bit encodes a True/False bit which indicates that this
+    fragment will be the last of its record.
     """
-    from xdrlib import Unpacker
-    unpacker = Unpacker(four_bytes)
-    val = unpacker.unpack_uint()
-    unpacker.done()
+    val, = _record_mark.unpack(four_bytes)
     if val < 2**31:
         return (val, False)
     return (val-2**31, True)
@@ -21,32 +51,244 @@ def _bytes_from_length(len, closing):
     """
     The RPC standard calls for the length of a message to be sent as the least
     significant 31 bits of an XDR encoded unsigned integer.  The most
-    significant bit encodes a True/False bit which indicates that this message
-    will be the last.
+    significant bit encodes a True/False bit which indicates that this
+    fragment will be the last of its record.
     """
     assert 0 <= len < 2**31
-    from xdrlib import Packer
     if closing:
         len += 2**31
-    packer = Packer()
-    packer.pack_uint(len)
-    return packer.get_buffer()
+    return _record_mark.pack(len)
+
+def _fragments(buffers, max_fragment, last=True):
+    """
+    Frame a record held in a list of byte buffers as record-marking
+    fragments of at most max_fragment bytes.  Yields the record marks and
+    (views of) the original buffers, without copying them.
+    With last=False, the buffers are only the start of the record.
+    """
+    total = sum(len(b) for b in buffers)
+    buffers = _collections.deque(buffers)
+    while True:
+        n = min(total, max_fragment)
+        total -= n
+        yield _bytes_from_length(n, last and total == 0)
+        while n:
+            b = buffers.popleft()
+            if len(b) > n:
+                buffers.appendleft(b[n:])
+                b = b[:n]
+            n -= len(b)
+            yield b
+        if total == 0:
+            break
 
 class SocketClosed(BaseException):
     pass
 
-class tcp_client(object):
+class _record_reader(object):
+    """
+    Reassembles record-marked fragments into records.
+
+    Bytes land in in_buffer (between in_start and in_end) and are parsed
+    from there; the body of a fragment at least RECV_BUFFER long is
+    instead read straight into the record being assembled, which grows as
+    the body arrives rather than by what its record mark claims.
+    Completed records are appended to in_messages as bytearrays.  A record
+    of more than max_record bytes raises SocketClosed.
+    """
+    max_record = MAX_RECORD
+
+    def __init__(self):
+        # receive buffer, and the received but unparsed bytes within it.
+        self.in_buffer = bytearray(RECV_BUFFER)
+        self.in_start = 0
+        self.in_end = 0
+        # the record being assembled, and how much of it is outstanding.
+        self.record = None
+        self.record_fill = 0
+        # the length of the record's fragments so far.
+        self.record_size = 0
+        self.fragment_remaining = 0
+        self.last_fragment = False
+
+    def _parse(self):
+        """
+        Move received bytes into records.
+        """
+        buf = self.in_buffer
+        while self.in_start < self.in_end:
+            if self.fragment_remaining:
+                n = min(self.fragment_remaining, self.in_end - self.in_start)
+                self._record_data(memoryview(buf)[self.in_start:self.in_start + n])
+                self.in_start += n
+                self.fragment_remaining -= n
+                if not self.fragment_remaining:
+                    self._end_fragment()
+                continue
+            if self.in_end - self.in_start < 4:
+                break
+            length, last = _length_from_bytes(buf[self.in_start:self.in_start + 4])
+            self.in_start += 4
+            self._start_fragment(length, last)
+
+    def _check_size(self, length):
+        """
+        Count a fragment of length bytes towards the record's size.
+        """
+        self.record_size += length
+        if self.record_size > self.max_record:
+            raise SocketClosed
+
+    def _start_fragment(self, length, last):
+        self._check_size(length)
+        if self.record is None:
+            self.record = bytearray()
+            self.record_fill = 0
+        self.fragment_remaining = length
+        self.last_fragment = last
+        if not length:
+            self._end_fragment()
+
+    def _record_data(self, data):
+        start = self.record_fill
+        self.record[start:start + len(data)] = data
+        self.record_fill += len(data)
+
+    def _end_fragment(self):
+        if self.last_fragment:
+            self.in_messages.append(self.record)
+            self.record = None
+            self.record_size = 0
+
+    def _direct_buffer(self):
+        """
+        Where the next received bytes should go: the unfilled part of the
+        record for large fragment bodies, otherwise the free end of
+        in_buffer (compacted first if need be).
+        """
+        if self.fragment_remaining >= RECV_BUFFER and self.record is not None:
+            record = self.record
+            start = self.record_fill
+            if start == len(record):
+                # grown by what has been received, up to the rest of the
+                # fragment; never past the end of the fragment, so that
+                # a complete record is exactly as long as its data.
+                record += bytes(min(self.fragment_remaining,
+                                    max(RECV_BUFFER, start)))
+            return memoryview(record)[start:]
+        if self.in_start == self.in_end:
+            self.in_start = self.in_end = 0
+        elif self.in_end == len(self.in_buffer):
+            # only a partial record mark can be left over.
+            left = self.in_end - self.in_start
+            self.in_buffer[:left] = self.in_buffer[self.in_start:self.in_end]
+            self.in_start, self.in_end = 0, left
+        return memoryview(self.in_buffer)[self.in_end:]
+
+    def _received(self, n):
+        """
+        Account for n bytes received into the last _direct_buffer().
+        """
+        if self.fragment_remaining >= RECV_BUFFER and self.record is not None:
+            self.record_fill += n
+            self.fragment_remaining -= n
+            if not self.fragment_remaining:
+                self._end_fragment()
+            return
+        self.in_end += n
+        self._parse()
+
+
+def _view(b):
+    if type(b) is file_data:
+        return b
+    return memoryview(b).cast("B")
+
+def _framed(message, max_fragment):
+    """
+    The record marks and buffers that send a message, which may be a
+    bytes-like object, a list of them, or an iterator of such lists (as
+    from Packer.pack_fragments) each sent as fragments of their own.
+    The lists may hold file_data, which is passed through as it is.
+    """
+    if hasattr(message, "__next__"):
+        return _streamed(message, max_fragment)
+    if not isinstance(message, list):
+        message = [ message ]
+    buffers = [ _view(b) for b in message ]
+    return _fragments(buffers, max_fragment)
+
+def _streamed(fragments, max_fragment):
+    """
+    _framed for an iterator of fragments.  Each fragment is taken from the
+    iterator only once the one before it has been framed, so as to know
+    which is the last.
+    """
+    fragment = next(fragments, [])
+    while True:
+        following = next(fragments, None)
+        buffers = [ _view(b) for b in fragment ]
+        yield from _fragments(buffers, max_fragment, following is None)
+        if following is None:
+            break
+        fragment = following
+
+def _has_files(message):
+    return type(message) is list and any(type(b) is file_data
+                                         for b in message)
+
+def _file_pieces(framed):
+    """
+    framed, with its file_data split into pieces of at most OUT_BUFFER
+    bytes, each to be read only when it is about to be written.
+    """
+    for b in framed:
+        if type(b) is file_data:
+            for start in range(0, len(b), OUT_BUFFER):
+                yield b[start:start + OUT_BUFFER]
+        else:
+            yield b
+
+def _take(frames, limit):
+    """
+    Take buffers, about limit bytes of them, from the front of a deque of
+    _framed messages.
+    """
+    taken = []
+    while frames and limit > 0:
+        b = next(frames[0], None)
+        if b is None:
+            frames.popleft()
+            continue
+        taken.append(b)
+        limit -= len(b)
+    return taken
+
+
+class tcp_client(_record_reader):
     """
     The TCP Client handles only the network portion of an RPC client.
     """
+    max_fragment = MAX_FRAGMENT
+
     def __init__(self, socket):
         self.socket = socket
         self.socket.setblocking(0)
-        self.in_messages = []
-        self.out_messages = []
-        self.in_buffer = bytes()
-        self.out_buffer = bytes()
-        self.next_in_message = None
+        # a reply sent from a file goes out in several writes, the last
+        # of which (the padding) must not wait on Nagle's algorithm; as
+        # asyncio does, send everything at once.
+        try:
+            self.socket.setsockopt(_socket.IPPROTO_TCP, _socket.TCP_NODELAY, 1)
+        except (OSError, AttributeError):
+            pass
+        self.in_messages = _collections.deque()
+        self.out_messages = _collections.deque()
+        _record_reader.__init__(self)
+        # buffers waiting to be written, record marks included, and how
+        # many bytes they hold; and the _framed messages they come from.
+        self.out_buffers = _collections.deque()
+        self.out_size = 0
+        self.out_frames = _collections.deque()
         self.closing = False
 
     @staticmethod
@@ -68,15 +310,19 @@ class tcp_client(object):
         """
         if not self.in_messages:
             return None
-        return self.in_messages.pop(0)
+        return self.in_messages.popleft()
 
     def push_message(self, opaque_bytes, close=False):
         """
         Push a message back to the network.
+        The message may be a bytes-like object, or a list of them (as from
+        Packer.get_buffers()) which are written without being concatenated,
+        or an iterator of such lists (as from Packer.pack_fragments()),
+        which is only consumed as the socket takes the data.  file_data in
+        the lists is sent straight from its file with os.sendfile.
         Set close=True if this is the last message being sent to this
         connection.
         """
-        print("appending to message queue.")
         self.out_messages.append((opaque_bytes, close))
 
     def cycle_network(self, timeout):
@@ -85,7 +331,6 @@ class tcp_client(object):
         """
         self._push_data_around()
         import select as _select
-        import time as _time
         p = _select.poll()
         self._register(p)
         events = p.poll(timeout)
@@ -93,92 +338,165 @@ class tcp_client(object):
         self._push_data_around()
 
     def _register(self, poll):
-        if self.out_buffer:
-            import select
-            print("register for write")
+        import select
+        if self.out_buffers:
             poll.register(self.socket, select.POLLIN | select.POLLPRI | select.POLLOUT)
         else:
-            import select
             poll.register(self.socket, select.POLLIN | select.POLLPRI)
 
     def _handle(self, events):
         for fd, event in events:
             if fd != self.socket.fileno():
-                print("not me socket!")
                 continue
-            print("handling socket.")
-            import select
-            if event & select.POLLIN or event & select.POLLPRI:
-                print("socket can read")
-                # read
-                any = False
-                try:
-                    while True:
-                        bytes = self.socket.recv(4096)
-                        if not bytes:
-                            break
-                        self.in_buffer += bytes
-                        any = True
-                        if len(bytes) < 4096:
-                            break
-                except:
-                    print("Error in tcp_client._handle!")
-                    pass
-                if not any:
+            self._handle_event(event)
+
+    def _handle_event(self, event):
+        import select
+        if event & (select.POLLIN | select.POLLPRI | select.POLLHUP | select.POLLERR):
+            self._receive()
+        if event & select.POLLOUT:
+            self._send()
+
+    def _receive(self):
+        """
+        Read everything the socket has for us.
+        """
+        try:
+            while True:
+                n = self.socket.recv_into(self._direct_buffer())
+                if not n:
                     raise SocketClosed
-            if event & select.POLLOUT:
-                print("socket can write")
-                # write
-                try:
-                    if len(self.out_buffer) < 4096:
-                        bytes = self.out_buffer
-                    else:
-                        bytes = self.out_buffer[:4096]
-                    print("writing bytes to socket: %s" % bytes)
-                    n = self.socket.send(bytes)
-                    self.out_buffer = self.out_buffer[n:]
-                except:
-                    pass
+                self._received(n)
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            raise SocketClosed
 
-    def _push_data_around(self):
-        # in-messages.
-        while True:
-            if self.next_in_message is not None:
-                if len(self.in_buffer) < self.next_in_message:
+    def _send(self):
+        """
+        Write as much of the queued data as the socket will take.
+        """
+        out = self.out_buffers
+        try:
+            while True:
+                self._fill()
+                if not out:
                     break
-                message = self.in_buffer[:self.next_in_message]
-                self.in_buffer = self.in_buffer[self.next_in_message:]
-                self.in_messages.append(message)
-                self.next_in_message = None
-            # we are now trying to read the next four bytes.
-            if len(self.in_buffer) < 4:
-                break
-            l, closing = _length_from_bytes(self.in_buffer[:4])
-            self.in_buffer = self.in_buffer[4:]
-            self.next_in_message = l
-            if closing: self.closing = True
+                buffers = []
+                for b in _itertools.islice(out, IOV_MAX):
+                    if type(b) is file_data:
+                        break
+                    buffers.append(b)
+                if not buffers:
+                    n = self._send_file(out[0])
+                elif (len(buffers) < len(out) and
+                      type(out[len(buffers)]) is file_data):
+                    # the file's data follows at once; don't let the
+                    # headers go out in a packet of their own.
+                    n = self.socket.sendmsg(buffers, (), _MSG_MORE)
+                else:
+                    n = self.socket.sendmsg(buffers)
+                self.out_size -= n
+                while n:
+                    b = out[0]
+                    if n < len(b):
+                        out[0] = b[n:]
+                        break
+                    n -= len(b)
+                    out.popleft()
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            raise SocketClosed
+        if self.closing:
+            self.socket.close()
+            raise SocketClosed
+
+    def _send_file(self, data):
+        """
+        Send what the socket will take of a file_data at the front of
+        out_buffers, straight from the file.  Returns how much was sent.
+        """
+        if _sendfile is not None:
+            try:
+                n = _sendfile(self.socket.fileno(), data.file.fileno(),
+                              data.offset, data.count)
+            except OSError as e:
+                if e.errno not in (_errno.EINVAL, _errno.ENOSYS,
+                                   _errno.EOPNOTSUPP):
+                    raise
+            else:
+                if n:
+                    return n
+                # the file has become shorter than the data: zeros make
+                # up the rest.
+        self.out_buffers[0] = memoryview(data.read())
+        return 0
+
+    def _fill(self):
+        """
+        Top out_buffers up from the messages being sent.
+        """
+        if self.out_frames and self.out_size < OUT_BUFFER:
+            taken = _take(self.out_frames, OUT_BUFFER - self.out_size)
+            self.out_buffers.extend(taken)
+            self.out_size += sum(len(b) for b in taken)
+
+    def _push_data_around(self):
         # out-messages.
         while self.out_messages:
-            bytes, closing = self.out_messages.pop(0)
-            print("writing message to out_buffer: %s" % bytes)
-            self.out_buffer += _bytes_from_length(len(bytes), closing)
-            self.out_buffer += bytes
+            message, closing = self.out_messages.popleft()
+            framed = _framed(message, self.max_fragment)
+            if self.out_frames or hasattr(message, "__next__"):
+                self.out_frames.append(framed)
+            else:
+                # already all in memory; queued at once.
+                for b in framed:
+                    self.out_buffers.append(b)
+                    self.out_size += len(b)
+            if closing:
+                self.closing = True
+        self._fill()
+        if self.out_buffers:
+            self._send()
 
 
 
 class tcp_server(object):
     """
     The TCP server handles only the network portion of an RPC server.
+
+    Connections stay registered with one epoll (or, where there is no
+    epoll, poll) object for their lifetime.  A connection's interest in
+    writing is changed only when its write queue becomes empty or
+    non-empty, and events are dispatched by looking up their fd.
     """
     def __init__(self, server_port):
         import socket as _socket
+        import select as _select
         self.server_port = server_port
         self.socket = _socket.socket()
         self.socket.bind(("localhost", self.server_port))
-        self.socket.listen(5)
-        self.in_messages = []
+        self.socket.listen(_socket.SOMAXCONN)
+        self.socket.setblocking(0)
+        self.in_messages = _collections.deque()
         self.clients = {}
         self.next_client_id = 0
+        # fd -> client id, for every registered connection.
+        self.fds = {}
+        # clients with messages pushed since the last cycle.
+        self.pending = set()
+        # epoll and poll event bits have the same values on Linux, so
+        # tcp_client._handle_event understands both.
+        if hasattr(_select, "epoll"):
+            self.poller = _select.epoll()
+            self.timeout_scale = 0.001
+        else:
+            self.poller = _select.poll()
+            self.timeout_scale = 1
+        self.READ = _select.POLLIN | _select.POLLPRI
+        self.WRITE = _select.POLLOUT
+        self.poller.register(self.socket.fileno(), self.READ)
 
     def pop_message(self):
         """
@@ -187,7 +505,7 @@ class tcp_server(object):
         """
         if not self.in_messages:
             return None
-        return self.in_messages.pop(0)
+        return self.in_messages.popleft()
 
     def push_message(self, client_id, opaque_bytes, close=False):
         """
@@ -196,57 +514,197 @@ class tcp_server(object):
         connection.
         """
         if client_id in self.clients:
-            print("pushing to client!")
             self.clients[client_id].push_message(opaque_bytes, close=close)
+            self.pending.add(client_id)
 
     def cycle_network(self, timeout):
         """
         Cycle the network connection.
         """
         self._push_data_around()
-        import select as _select
-        import time as _time
-        p = _select.poll()
-        self._register(p)
-        events = p.poll(timeout)
+        events = self.poller.poll(timeout * self.timeout_scale)
         self._handle(events)
         self._push_data_around()
 
     def _push_data_around(self):
-        for client_id, client in self.clients.items():
-            while True:
-                message = client.pop_message()
-                if not message: break
-                self.in_messages.append((client_id, message))
-        for client in self.clients.values():
-            client._push_data_around()
+        pending, self.pending = self.pending, set()
+        for client_id in pending:
+            client = self.clients.get(client_id)
+            if client is None:
+                continue
+            try:
+                client._push_data_around()
+            except SocketClosed:
+                self._drop(client_id)
+                continue
+            self._update_interest(client)
 
-    def _register(self, poll):
-        import select as _select
-        poll.register(self.socket, _select.POLLIN | _select.POLLPRI)
-        for client in self.clients.values():
-            client._register(poll)
+    def _update_interest(self, client):
+        writing = bool(client.out_buffers)
+        if writing != client.writing:
+            client.writing = writing
+            self.poller.modify(client.fd,
+                               self.READ | self.WRITE if writing else self.READ)
+
+    def _accept(self):
+        while True:
+            try:
+                socket, address = self.socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            client = tcp_client(socket)
+            client.address = address
+            client.id = self.next_client_id
+            client.fd = socket.fileno()
+            client.writing = False
+            self.next_client_id += 1
+            self.clients[client.id] = client
+            self.fds[client.fd] = client.id
+            self.poller.register(client.fd, self.READ)
+
+    def _drop(self, client_id):
+        client = self.clients.pop(client_id)
+        del self.fds[client.fd]
+        try:
+            self.poller.unregister(client.fd)
+        except (KeyError, OSError):
+            # closing the socket already removed it from epoll.
+            pass
+        client.socket.close()
 
     def _handle(self, events):
+        listen_fd = self.socket.fileno()
         for fd, event in events:
-            if fd != self.socket.fileno():
+            if fd == listen_fd:
+                self._accept()
                 continue
-            import select as _select
-            if event & _select.POLLIN or event & _select.POLLPRI:
-                socket, address = self.socket.accept()
-                socket = tcp_client(socket)
-                socket.address = address
-                self.clients[self.next_client_id] = socket
-                self.next_client_id += 1
-        dead = []
-        for id, client in self.clients.items():
+            client_id = self.fds.get(fd)
+            if client_id is None:
+                continue
+            client = self.clients[client_id]
             try:
-                client._handle(events)
+                client._handle_event(event)
             except SocketClosed:
-                print("socket closed! (%d)" % id)
-                dead.append(id)
-        for id in dead:
-            self.clients.pop(id)
+                print("socket closed! (%d)" % client_id)
+                self._drop(client_id)
+                continue
+            while True:
+                message = client.pop_message()
+                if message is None: break
+                self.in_messages.append((client_id, message))
+            self._update_interest(client)
+
+
+
+class tcp_protocol(_record_reader, _asyncio.BufferedProtocol):
+    """
+    The same record marking as tcp_client, as an asyncio protocol.
+
+    Each complete record is passed to handler(record, client_id) as soon
+    as it has been received; if the handler returns a reply it is framed
+    and written straight back.  While the transport's write buffer is
+    above its high-water mark no more records are read from the
+    connection.
+    """
+    max_fragment = MAX_FRAGMENT
+
+    def __init__(self, handler, client_id):
+        _record_reader.__init__(self)
+        self.handler = handler
+        self.id = client_id
+        self.in_messages = _collections.deque()
+        self.transport = None
+        # _framed messages not yet written, and whether writing is paused.
+        self.out_frames = _collections.deque()
+        self.paused = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.transport = None
+
+    def get_buffer(self, sizehint):
+        return self._direct_buffer()
+
+    def buffer_updated(self, nbytes):
+        try:
+            self._received(nbytes)
+        except SocketClosed:
+            # a record over max_record.
+            self.transport.abort()
+            self.transport = None
+            return
+        while self.in_messages and self.transport is not None:
+            reply = self.handler(self.in_messages.popleft(), self.id)
+            if reply is not None:
+                self.push_message(reply)
+
+    def push_message(self, opaque_bytes):
+        """
+        Write a message: a bytes-like object, a list of them, or an
+        iterator of such lists, which is only consumed while the
+        transport is taking more data.
+        """
+        framed = _framed(opaque_bytes, self.max_fragment)
+        if (self.out_frames or hasattr(opaque_bytes, "__next__") or
+            _has_files(opaque_bytes)):
+            self.out_frames.append(_file_pieces(framed))
+            self._write()
+        else:
+            # already all in memory; written at once.
+            self.transport.writelines(framed)
+
+    def _write(self):
+        # transports only take bytes in memory: file_data is read in
+        # pieces, as the transport takes more.
+        while self.out_frames and not self.paused and self.transport is not None:
+            self.transport.writelines([ b.read() if type(b) is file_data else b
+                                        for b in _take(self.out_frames,
+                                                       OUT_BUFFER) ])
+
+    def pause_writing(self):
+        self.paused = True
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.paused = False
+        self.transport.resume_reading()
+        self._write()
+
+
+class tcp_stream_protocol(tcp_protocol):
+    """
+    tcp_protocol, handing records over as they arrive rather than once
+    they are complete.  As each record starts, stream_handler(client_id)
+    is called for its receiver; the receiver's feed(data) is called with
+    each piece of the record (a memoryview, to be copied if it is kept),
+    and close() once it is all in.  close() returns the reply, if any.
+    """
+    def __init__(self, stream_handler, client_id):
+        tcp_protocol.__init__(self, None, client_id)
+        self.stream_handler = stream_handler
+        self.stream = None
+
+    def _start_fragment(self, length, last):
+        self._check_size(length)
+        if self.stream is None:
+            self.stream = self.stream_handler(self.id)
+        self.fragment_remaining = length
+        self.last_fragment = last
+        if not length:
+            self._end_fragment()
+
+    def _record_data(self, data):
+        self.stream.feed(data)
+
+    def _end_fragment(self):
+        if self.last_fragment:
+            self.record_size = 0
+            stream, self.stream = self.stream, None
+            reply = stream.close()
+            if reply is not None and self.transport is not None:
+                self.push_message(reply)
 
 
 if __name__ == "__main__":
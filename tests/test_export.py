@@ -0,0 +1,220 @@
+"""
+Tests of local_export: its filehandle table, and write-behind.
+"""
+
+import io
+import os
+import random
+import tempfile
+import time
+
+import pytest
+
+from export import local_export, export_error, _dirty_file
+from nfs import nfsstat4, stable_how4
+
+
+@pytest.fixture
+def export(tmp_path):
+    (tmp_path / "f").write_bytes(b"hello")
+    (tmp_path / "d").mkdir()
+    (tmp_path / "d" / "g").write_bytes(b"world")
+    export = local_export(str(tmp_path))
+    yield export
+    export.close()
+
+
+def status(fxn, *args):
+    with pytest.raises(export_error) as e:
+        fxn(*args)
+    return e.value.status
+
+
+def test_lookup(export):
+    fh = export.lookup(export.root(), b"f")
+    assert export.check(fh) == fh
+    assert export.lookup(export.root(), b"f") == fh
+    d = export.lookup(export.root(), b"d")
+    g = export.lookup(d, b"g")
+    assert export.parent(d) == export.root()
+    assert export.read(g, 0, 5) == (b"world", True)
+
+
+def test_bad_names(export):
+    root = export.root()
+    assert status(export.lookup, root, b"") == nfsstat4.NFS4ERR_INVAL
+    assert status(export.lookup, root, b"..") == nfsstat4.NFS4ERR_BADNAME
+    assert status(export.lookup, root, b"d/g") == nfsstat4.NFS4ERR_BADCHAR
+    fh = export.lookup(root, b"f")
+    assert status(export.lookup, fh, b"x") == nfsstat4.NFS4ERR_NOTDIR
+    with pytest.raises(FileNotFoundError):
+        export.lookup(root, b"missing")
+
+
+def test_unknown_handles(export):
+    assert status(export.check, b"short") == nfsstat4.NFS4ERR_BADHANDLE
+    assert status(export.check, bytes(20)) == nfsstat4.NFS4ERR_STALE
+
+
+def test_evicted_handle(tmp_path):
+    for name in "abc":
+        (tmp_path / name).write_bytes(b"")
+    export = local_export(str(tmp_path), max_handles=2)
+    a = export.lookup(export.root(), b"a")
+    export.lookup(export.root(), b"b")
+    export.lookup(export.root(), b"c")
+    assert status(export.check, a) == nfsstat4.NFS4ERR_STALE
+    # found again by looking it up.
+    assert export.lookup(export.root(), b"a") == a
+    export.close()
+
+
+def test_renamed_file(export, tmp_path):
+    fh = export.lookup(export.root(), b"f")
+    os.rename(tmp_path / "f", tmp_path / "renamed")
+    assert status(export.stat, fh) == nfsstat4.NFS4ERR_STALE
+    assert status(export.file, fh) == nfsstat4.NFS4ERR_STALE
+    # the handle is the file's, whatever its name.
+    assert export.lookup(export.root(), b"renamed") == fh
+    assert export.read(fh, 0, 5) == (b"hello", True)
+
+
+def test_renamed_open_file(export, tmp_path):
+    fh = export.lookup(export.root(), b"f")
+    export.file(fh)
+    os.rename(tmp_path / "f", tmp_path / "renamed")
+    # the open file is still that file.
+    assert export.read(fh, 0, 5) == (b"hello", True)
+
+
+def test_replaced_file(export, tmp_path):
+    fh = export.lookup(export.root(), b"f")
+    os.rename(tmp_path / "f", tmp_path / "old")
+    (tmp_path / "f").write_bytes(b"other")
+    # not the data of the file now at its path.
+    assert status(export.read, fh, 0, 5) == nfsstat4.NFS4ERR_STALE
+    assert export.lookup(export.root(), b"f") != fh
+
+
+def test_renamed_directory(export, tmp_path):
+    d = export.lookup(export.root(), b"d")
+    os.rename(tmp_path / "d", tmp_path / "e")
+    assert status(export.lookup, d, b"g") == nfsstat4.NFS4ERR_STALE
+    assert status(export.readdir, d) == nfsstat4.NFS4ERR_STALE
+    assert export.lookup(export.root(), b"e") == d
+    assert export.readdir(d)[1] == [ b"g" ]
+    assert export.read(export.lookup(d, b"g"), 0, 5) == (b"world", True)
+
+
+def test_extent_merging():
+    rnd = random.Random(1)
+    for trial in range(300):
+        dirty = _dirty_file(None)
+        expected = {}
+        for _ in range(rnd.randint(1, 30)):
+            offset = rnd.randint(0, 200)
+            data = bytes(rnd.randint(1, 255) for _ in range(rnd.randint(0, 40)))
+            dirty.add(offset, data)
+            for i, b in enumerate(data):
+                expected[offset + i] = b
+        held = {}
+        for start, end, buffers in dirty.extents:
+            data = b"".join(buffers)
+            assert len(data) == end - start
+            held.update((start + i, b) for i, b in enumerate(data))
+        assert held == expected
+        assert dirty.size == len(expected)
+        assert dirty.end == max(expected, default=-1) + 1
+        assert dirty.starts == [ e[0] for e in dirty.extents ]
+        # sorted, and neither overlapping nor adjacent.
+        for a, b in zip(dirty.extents, dirty.extents[1:]):
+            assert a[1] < b[0]
+
+
+def test_sequential_writes_are_not_copied():
+    dirty = _dirty_file(None)
+    chunks = [ bytes([i]) * 10 for i in range(5) ]
+    for i, chunk in enumerate(chunks):
+        dirty.add(10 * i, chunk)
+    assert len(dirty.extents) == 1
+    assert all(a is b for a, b in zip(dirty.extents[0][2], chunks))
+
+
+@pytest.fixture
+def write_behind(export):
+    # nothing is written out in the background during a test.
+    export.flush_interval = 3600
+    return export, export.lookup(export.root(), b"f")
+
+
+def test_unstable_write(write_behind, tmp_path):
+    export, fh = write_behind
+    assert export.write(fh, 3, b"LO!", stable_how4.UNSTABLE4) == \
+        (3, stable_how4.UNSTABLE4)
+    assert (tmp_path / "f").read_bytes() == b"hello"
+    st, change, size, mtime_ns = export.stat(fh)
+    assert size == 6
+    assert change >= st.st_ctime_ns and mtime_ns >= st.st_mtime_ns
+    # a read sees what was written.
+    assert export.read(fh, 0, 10) == (b"helLO!", True)
+    assert (tmp_path / "f").read_bytes() == b"helLO!"
+
+
+def test_commit(write_behind, tmp_path):
+    export, fh = write_behind
+    export.write(fh, 5, b" world", stable_how4.UNSTABLE4)
+    export.write(fh, 0, b"H", stable_how4.UNSTABLE4)
+    assert (tmp_path / "f").read_bytes() == b"hello"
+    export.commit(fh, 0, 0)
+    assert (tmp_path / "f").read_bytes() == b"Hello world"
+    assert fh not in export.dirty and export.dirty_bytes == 0
+
+
+def test_stable_write_after_unstable(write_behind, tmp_path):
+    export, fh = write_behind
+    export.write(fh, 0, b"AAAA", stable_how4.UNSTABLE4)
+    # the unstable write is written out first, and then overwritten.
+    assert export.write(fh, 1, b"BB", stable_how4.FILE_SYNC4) == \
+        (2, stable_how4.FILE_SYNC4)
+    assert (tmp_path / "f").read_bytes() == b"ABBAo"
+    export.write(fh, 4, b"C", stable_how4.UNSTABLE4)
+    export.write(fh, 0, b"D", stable_how4.DATA_SYNC4)
+    assert (tmp_path / "f").read_bytes() == b"DBBAC"
+
+
+@pytest.mark.parametrize("sunk", [tempfile.TemporaryFile, io.BytesIO])
+def test_sunk_write(write_behind, tmp_path, sunk):
+    export, fh = write_behind
+    export.write(fh, 0, b"AAAAAAA", stable_how4.UNSTABLE4)
+    data = sunk()
+    data.write(b"BB")
+    data.write(memoryview(b"CC"))
+    # a sunk file is copied at once, over the writes before it.
+    assert export.write(fh, 1, data, stable_how4.UNSTABLE4) == \
+        (4, stable_how4.UNSTABLE4)
+    assert (tmp_path / "f").read_bytes() == b"ABBCCAA"
+    assert fh not in export.dirty
+
+
+def test_zero_length_write(write_behind):
+    export, fh = write_behind
+    assert export.write(fh, 1 << 40, b"", stable_how4.UNSTABLE4) == \
+        (0, stable_how4.UNSTABLE4)
+    assert export.stat(fh)[2] == 5
+
+
+def test_background_flush(write_behind, tmp_path):
+    export, fh = write_behind
+    export.flush_interval = 0.05
+    export.write(fh, 0, b"J", stable_how4.UNSTABLE4)
+    deadline = time.monotonic() + 10
+    while (tmp_path / "f").read_bytes() != b"Jello":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_close_writes_out(write_behind, tmp_path):
+    export, fh = write_behind
+    export.write(fh, 0, b"c", stable_how4.UNSTABLE4)
+    export.close()
+    assert (tmp_path / "f").read_bytes() == b"cello"
@@ -0,0 +1,188 @@
+"""
+Tests of the fattr4 encoders and the attribute cache, and of GETATTR and
+READDIR with them.
+"""
+
+import contextlib
+import io
+import os
+import struct
+import types
+
+import pytest
+
+import nfs
+from nfs import bitmap4, fsid4, specdata4, nfstime4, nfsstat4, nfs_opnum4
+from nfs import nfs_argop4, COMPOUND4args, GETATTR4args, READDIR4args
+from nfs import WRITE4args, LOOKUP4args, stateid4, stable_how4
+from xdr import Packer
+from fattr import fattr_encoder, attr_cache, _words, _linux_getattr, _types
+from export import local_export
+from nfs_server import NFS4_PROGRAM
+
+
+@pytest.fixture
+def export(tmp_path):
+    (tmp_path / "f").write_bytes(b"hello")
+    export = local_export(str(tmp_path))
+    export.flush_interval = 3600
+    yield export
+    export.close()
+
+
+def nfstime(ns):
+    seconds, nseconds = divmod(ns, 10**9)
+    return nfstime4(seconds=seconds, nseconds=nseconds)
+
+
+def test_encoder_matches_generic_types(export):
+    fh = export.lookup(export.root(), b"f")
+    st, change, size, mtime_ns = export.stat(fh)
+    values = [
+        nfs.fattr4_type(_types[st.st_mode & 0o170000]),
+        nfs.fattr4_change(change),
+        nfs.fattr4_size(size),
+        fsid4(major=st.st_dev, minor=0),
+        nfs.fattr4_fileid(st.st_ino),
+        nfs.fattr4_mode(st.st_mode & 0o7777),
+        nfs.fattr4_numlinks(st.st_nlink),
+        nfs.fattr4_owner(str(st.st_uid).encode()),
+        nfs.fattr4_owner_group(str(st.st_gid).encode()),
+        specdata4(specdata1=os.major(st.st_rdev),
+                  specdata2=os.minor(st.st_rdev)),
+        nfs.fattr4_space_used(st.st_blocks * 512),
+        nfstime(st.st_atime_ns),
+        nfstime(st.st_ctime_ns),
+        nfstime(mtime_ns),
+        nfs.fattr4_mounted_on_fileid(st.st_ino),
+    ]
+    packer = Packer()
+    for value in values:
+        value.pack(packer)
+    bitmap = bitmap4(_words(_linux_getattr))
+    encoder = fattr_encoder.get(bitmap)
+    assert encoder.encode(st, fh, change, size, mtime_ns, None) == \
+        packer.get_buffer()
+    assert list(encoder.attrmask) == list(bitmap)
+
+
+def test_unsupported_attributes_are_left_out():
+    bitmap = bitmap4(_words([ nfs.FATTR4_SIZE, nfs.FATTR4_ACL,
+                              nfs.FATTR4_ARCHIVE ]))
+    encoder = fattr_encoder.get(bitmap)
+    assert list(encoder.attrmask) == _words([ nfs.FATTR4_SIZE ])
+    assert fattr_encoder.get(bitmap4(list(bitmap))) is encoder
+
+
+def stat_with(st, **changes):
+    fields = dict((name, getattr(st, name))
+                  for name in dir(st) if name.startswith("st_"))
+    fields.update(changes)
+    return types.SimpleNamespace(**fields)
+
+
+def test_cache_invalidation(export):
+    fh = export.lookup(export.root(), b"f")
+    st, change, size, mtime_ns = export.stat(fh)
+    cache = attr_cache()
+    bitmap = bitmap4(_words(_linux_getattr))
+    attrs = cache.get(fh, bitmap, st, change, size, mtime_ns, None)
+    assert cache.get(fh, bitmap, st, change, size, mtime_ns, None) is attrs
+    for version in ((change + 1, size, mtime_ns), (change, size + 1, mtime_ns),
+                    (change, size, mtime_ns + 1)):
+        assert cache.get(fh, bitmap, st, *version, None) is not attrs
+    # reading a file changes its atime, and nothing else.
+    cache.get(fh, bitmap, st, change, size, mtime_ns, None)
+    atime = stat_with(st, st_atime_ns=st.st_atime_ns + 10**9)
+    attrs = cache.get(fh, bitmap, atime, change, size, mtime_ns, None)
+    vals = bytes(attrs.attr_vals.bytes)
+    # time_access, time_metadata, time_modify and mounted_on_fileid end
+    # the values.
+    assert struct.unpack_from(">q", vals, len(vals) - 44)[0] == \
+        atime.st_atime_ns // 10**9
+
+
+def test_filesystem_attributes_are_not_cached(export):
+    fh = export.root()
+    st, change, size, mtime_ns = export.stat(fh)
+    cache = attr_cache()
+    bitmap = bitmap4(_words([ nfs.FATTR4_SPACE_FREE ]))
+    calls = []
+    def statvfs():
+        calls.append(1)
+        return export.statvfs(fh)
+    cache.get(fh, bitmap, st, change, size, mtime_ns, statvfs)
+    cache.get(fh, bitmap, st, change, size, mtime_ns, statvfs)
+    assert len(calls) == 2
+
+
+def compound(program, *ops):
+    args = COMPOUND4args(tag=b"", minorversion=0, argarray=[
+        nfs_argop4(argop=nfs_opnum4.OP_PUTROOTFH) ] + list(ops))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return program.NFS_V4.NFSPROC4_COMPOUND(None, args)
+
+
+def getattr_op(*attributes):
+    return nfs_argop4(argop=nfs_opnum4.OP_GETATTR,
+                      opgetattr=GETATTR4args(attr_request=_words(attributes)))
+
+
+def readdir_op(cookie, verifier, maxcount):
+    return nfs_argop4(argop=nfs_opnum4.OP_READDIR,
+                      opreaddir=READDIR4args(cookie=cookie,
+                                             cookieverf=verifier,
+                                             dircount=maxcount,
+                                             maxcount=maxcount,
+                                             attr_request=_linux_getattr_words))
+
+_linux_getattr_words = _words(_linux_getattr + [ nfs.FATTR4_RDATTR_ERROR ])
+
+
+def test_getattr_after_unstable_write(export):
+    program = NFS4_PROGRAM(export)
+    lookup = nfs_argop4(argop=nfs_opnum4.OP_LOOKUP,
+                        oplookup=LOOKUP4args(objname=b"f"))
+    def size():
+        result = compound(program, lookup, getattr_op(nfs.FATTR4_SIZE))
+        assert result.status == nfsstat4.NFS4_OK
+        attrs = result.resarray[2].opgetattr.resok4.obj_attributes
+        return struct.unpack(">Q", bytes(attrs.attr_vals.bytes))[0]
+    assert size() == 5
+    write = nfs_argop4(argop=nfs_opnum4.OP_WRITE,
+                       opwrite=WRITE4args(stateid=stateid4(seqid=0,
+                                                           other=bytes(12)),
+                                          offset=100,
+                                          stable=stable_how4.UNSTABLE4,
+                                          data=b"!"))
+    assert compound(program, lookup, write).status == nfsstat4.NFS4_OK
+    assert size() == 101
+
+
+def test_readdir(tmp_path):
+    names = sorted(b"file%03d" % i for i in range(100))
+    for name in names:
+        (tmp_path / name.decode()).write_bytes(b"")
+    export = local_export(str(tmp_path))
+    program = NFS4_PROGRAM(export)
+    seen = []
+    cookie, verifier = 0, bytes(8)
+    while True:
+        result = compound(program, readdir_op(cookie, verifier, 1000))
+        assert result.status == nfsstat4.NFS4_OK
+        resok = result.resarray[1].opreaddir.resok4
+        verifier = bytes(resok.cookieverf.bytes)
+        assert len(resok.reply.entries) > 0
+        for entry in resok.reply.entries:
+            seen.append(bytes(entry.name.bytes))
+            cookie = int(entry.cookie)
+        if resok.reply.eof:
+            break
+    assert seen == names
+    assert compound(program, readdir_op(0, bytes(8), 40)).status == \
+        nfsstat4.NFS4ERR_TOOSMALL
+    assert compound(program, readdir_op(1, bytes(8), 1000)).status == \
+        nfsstat4.NFS4ERR_BAD_COOKIE
+    assert compound(program, readdir_op(5, bytes(8), 1000)).status == \
+        nfsstat4.NFS4ERR_NOT_SAME
+    export.close()
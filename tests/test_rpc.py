@@ -0,0 +1,197 @@
+"""
+Tests of rpc_server, from the calls it is handed to the replies it makes.
+"""
+
+import asyncio
+import contextlib
+import io
+import socket
+import tempfile
+import threading
+
+import pytest
+
+from nfs import nfs_opnum4, nfs_argop4, nfsstat4, stable_how4
+from nfs import COMPOUND4args, COMPOUND4res, LOOKUP4args, WRITE4args, stateid4
+from rpc import rpc_server, rpc_msg, msg_type, call_body, opaque_auth
+from rpc import reply_stat, accept_stat, rpc_client, rpc_error
+from rpc import rpc_program, rpc_version, rpc_procedure
+from tcp import tcp_client
+from xdr import Packer, Unpacker, xdr_int
+from export import local_export
+from nfs_server import NFS4_PROGRAM
+
+
+@contextlib.contextmanager
+def server(**kwargs):
+    server = rpc_server(0, **kwargs)
+    try:
+        yield server
+    finally:
+        server.tcp_server.socket.close()
+
+
+def call(xid, prog, vers, proc, args):
+    msg = rpc_msg(xid=xid, body=rpc_msg.body(
+        mtype=msg_type.CALL,
+        cbody=call_body(rpcvers=2, prog=prog, vers=vers, proc=proc,
+                        cred=opaque_auth.NONE(), verf=opaque_auth.NONE())))
+    packer = Packer()
+    msg.pack(packer)
+    args.pack(packer)
+    return packer.get_buffer()
+
+
+def reply(response, result_type):
+    """The xid and accept_stat of a reply, and its result if it has one."""
+    if isinstance(response, list):
+        response = b"".join(bytes(b) for b in response)
+    unpacker = Unpacker(response)
+    msg = rpc_msg.unpack(unpacker)
+    assert msg.body.rbody.stat == reply_stat.MSG_ACCEPTED
+    stat = msg.body.rbody.areply.reply_data.stat
+    if stat != accept_stat.SUCCESS:
+        return msg.xid, stat, None
+    return msg.xid, stat, result_type.unpack(unpacker)
+
+
+def compound(*ops):
+    return COMPOUND4args(tag=b"", minorversion=0, argarray=[
+        nfs_argop4(argop=nfs_opnum4.OP_PUTROOTFH) ] + list(ops))
+
+
+def write_op(offset, data, stable=stable_how4.UNSTABLE4):
+    return nfs_argop4(argop=nfs_opnum4.OP_WRITE,
+                      opwrite=WRITE4args(stateid=stateid4(seqid=0,
+                                                          other=bytes(12)),
+                                         offset=offset, stable=stable,
+                                         data=data))
+
+lookup_f = nfs_argop4(argop=nfs_opnum4.OP_LOOKUP,
+                      oplookup=LOOKUP4args(objname=b"f"))
+
+
+@pytest.fixture
+def export(tmp_path):
+    (tmp_path / "f").write_bytes(b"hello")
+    export = local_export(str(tmp_path))
+    export.flush_interval = 3600
+    yield export
+    export.close()
+
+
+@pytest.mark.parametrize("stable", [stable_how4.UNSTABLE4,
+                                    stable_how4.FILE_SYNC4])
+def test_streamed_write_to_sink(export, tmp_path, stable):
+    sunk = []
+    def sink(n):
+        sunk.append(n)
+        return tempfile.TemporaryFile()
+    data = bytes(range(256)) * 64
+    record = call(7, 100003, 4, 1,
+                  compound(lookup_f, write_op(0, b"J"),
+                           write_op(3, data, stable)))
+    with server(streaming=True, sink=sink, sink_threshold=1024) as s:
+        s.add_program(NFS4_PROGRAM(export))
+        stream = s.stream_message(0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(0, len(record), 1000):
+                stream.feed(memoryview(record)[i:i + 1000])
+            response = stream.close()
+    assert sunk == [len(data)]
+    xid, stat, result = reply(response, COMPOUND4res)
+    assert (xid, stat) == (7, accept_stat.SUCCESS)
+    assert result.status == nfsstat4.NFS4_OK
+    resok = result.resarray[3].opwrite.resok4
+    assert (resok.count, resok.committed) == (len(data), stable)
+    export.commit(export.lookup(export.root(), b"f"), 0, 0)
+    assert (tmp_path / "f").read_bytes() == b"Jel" + data
+
+
+@rpc_program(prog=0x20000000)
+class ECHO_PROG(object):
+    def __init__(self):
+        self.ECHO_VERS = ECHO_PROG.ECHO_VERS()
+
+    @rpc_version(vers=1)
+    class ECHO_VERS(object):
+        @rpc_procedure(proc=1, args=xdr_int, ret=xdr_int)
+        def ECHO(self, msg, args):
+            return args
+
+        @rpc_procedure(proc=2, args=xdr_int, ret=xdr_int)
+        def FAIL(self, msg, args):
+            raise ValueError(args)
+
+
+@contextlib.contextmanager
+def connected():
+    """An rpc_client of ECHO_PROG, and the tcp_client its calls go to."""
+    a, b = socket.socketpair()
+    client = rpc_client(ECHO_PROG(), 1, tcp_client(a))
+    try:
+        yield client, tcp_client(b)
+    finally:
+        a.close()
+        b.close()
+
+
+def calls(connection, n):
+    """The next n calls received on connection."""
+    received = []
+    while len(received) < n:
+        connection.cycle_network(10)
+        while True:
+            message = connection.pop_message()
+            if message is None:
+                break
+            received.append(message)
+    return received
+
+
+def answer(s, connection, received):
+    with contextlib.redirect_stdout(io.StringIO()), \
+         contextlib.redirect_stderr(io.StringIO()):
+        for message in received:
+            connection.push_message(s.handle_message(message, 0))
+    connection.cycle_network(0)
+
+
+def test_replies_matched_by_xid():
+    async def main(client, connection, s):
+        ops = [ asyncio.ensure_future(client.ECHO(xdr_int(i)))
+                for i in range(5) ]
+        await asyncio.sleep(0)
+        received = calls(connection, 5)
+        # answered in the opposite order.
+        answer(s, connection, reversed(received))
+        return [ int(result) for result in await asyncio.gather(*ops) ]
+    with server() as s, connected() as (client, connection):
+        s.add_program(ECHO_PROG())
+        assert asyncio.run(main(client, connection, s)) == list(range(5))
+        assert client.calls == {}
+
+
+def test_sync_calls():
+    with server() as s, connected() as (client, connection):
+        s.add_program(ECHO_PROG())
+        # no answer: the call times out.
+        with pytest.raises(TimeoutError):
+            client.ECHO.sync(xdr_int(1), timeout=0.05)
+        stop = threading.Event()
+        def serve():
+            while not stop.is_set():
+                connection.cycle_network(10)
+                answer(s, connection, iter(connection.pop_message, None))
+        thread = threading.Thread(target=serve)
+        thread.start()
+        try:
+            # the late reply to the first call is dropped.
+            assert int(client.ECHO.sync(xdr_int(2), timeout=10)) == 2
+            with pytest.raises(rpc_error) as e:
+                client.FAIL.sync(xdr_int(3), timeout=10)
+        finally:
+            stop.set()
+            thread.join()
+        assert e.value.reply.body.rbody.areply.reply_data.stat == \
+            accept_stat.SYSTEM_ERR
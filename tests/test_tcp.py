@@ -0,0 +1,99 @@
+"""
+Tests of record marking: framing records as fragments, reassembling them
+as they are received, and sending them between tcp_clients.
+"""
+
+import collections
+import socket
+
+import pytest
+
+import tcp
+from tcp import tcp_client, SocketClosed, _record_reader, _framed
+from xdr import file_data
+
+
+def framed(message, max_fragment=tcp.MAX_FRAGMENT):
+    return b"".join(bytes(b) for b in _framed(message, max_fragment))
+
+
+def mark(length, last):
+    return (length + (2**31 if last else 0)).to_bytes(4, "big")
+
+
+def test_framing():
+    assert framed(b"abcdef") == mark(6, True) + b"abcdef"
+    assert framed([ b"abc", bytearray(b"def") ], 4) == \
+        mark(4, False) + b"abcd" + mark(2, True) + b"ef"
+    assert framed(b"") == mark(0, True)
+    # each list from an iterator is sent as fragments of its own.
+    assert framed(iter([ [ b"ab" ], [ b"cd", b"e" ] ]), 2) == \
+        mark(2, False) + b"ab" + mark(2, False) + b"cd" + mark(1, True) + b"e"
+
+
+def reader():
+    reader = _record_reader()
+    reader.in_messages = collections.deque()
+    return reader
+
+
+def receive(reader, data, piece):
+    """Receive data into reader as a socket would, piece bytes at a time."""
+    data = memoryview(data)
+    while data:
+        buffer = reader._direct_buffer()
+        n = min(len(buffer), len(data), piece)
+        buffer[:n] = data[:n]
+        reader._received(n)
+        data = data[n:]
+
+
+@pytest.mark.parametrize("piece", [ 1, 3, 1000, 1 << 20 ])
+def test_reassembly(piece):
+    small = [ b"first", b"" ]
+    large = bytes(range(256)) * (tcp.RECV_BUFFER // 128 + 1)
+    data = framed(small, 2) + framed(b"") + framed(large, tcp.RECV_BUFFER)
+    r = reader()
+    receive(r, data, piece)
+    assert list(r.in_messages) == [ b"first", b"", large ]
+    assert r.record is None and r.in_start == r.in_end
+
+
+def test_oversize_record():
+    r = reader()
+    r.max_record = 10
+    receive(r, framed(b"x" * 10, 4), 1)
+    assert list(r.in_messages) == [ b"x" * 10 ]
+    with pytest.raises(SocketClosed):
+        receive(r, framed(b"x" * 11, 4), 1)
+
+
+def exchange(sender, receiver):
+    """Cycle both ends until receiver has a message."""
+    for i in range(1000):
+        sender.cycle_network(0)
+        receiver.cycle_network(10)
+        message = receiver.pop_message()
+        if message is not None:
+            return message
+    raise AssertionError("nothing received")
+
+
+def test_send_and_receive(tmp_path):
+    a, b = socket.socketpair()
+    a, b = tcp_client(a), tcp_client(b)
+    a.max_fragment = 1000
+    try:
+        large = bytes(range(256)) * 4096
+        a.push_message([ b"head", large ])
+        assert exchange(a, b) == b"head" + large
+        (tmp_path / "f").write_bytes(b"0123456789")
+        with open(tmp_path / "f", "rb") as f:
+            # sent with sendfile, and padded with zeros past the file's end.
+            b.push_message([ b"<", file_data(f, 2, 12), b">" ])
+            assert exchange(b, a) == b"<23456789\0\0\0\0>"
+        a.push_message(iter([ [ b"one" ], [ b"two" ] ]))
+        assert exchange(a, b) == b"onetwo"
+    finally:
+        a.socket.close()
+        b.socket.close()
@@ -0,0 +1,386 @@
+"""
+Tests of the xdr types and their generated codecs.
+"""
+
+import array
+import io
+import struct as _struct
+
+import pytest
+
+from xdr import Packer, Unpacker, StreamUnpacker, XDRBadValue
+from xdr import Error, ConversionError, file_data
+from xdr import xdr_struct, xdr_union, xdr_enum, xdr_optional, xdr_array
+from xdr import xdr_int, xdr_uint, xdr_hyper, xdr_uhyper, xdr_bool
+from xdr import xdr_double, xdr_string, xdr_opaque
+from rpc import authsys_parms
+from nfs import COMPOUND4args, nfs_argop4, nfs_opnum4, PUTFH4args
+from nfs import WRITE4args, GETATTR4args, stateid4, stable_how4
+
+
+def packed(value):
+    packer = Packer()
+    value.pack(packer)
+    return packer.get_buffer()
+
+
+class color(xdr_enum):
+    RED = 0
+    GREEN = 1
+    BLUE = 2
+
+class point(xdr_struct):
+    x = xdr_int
+    y = xdr_hyper
+
+class shape(xdr_union(kind=color)):
+    RED.radius = xdr_uint
+    GREEN.corners = xdr_array(point, max=4)
+
+class drawing(xdr_struct):
+    name = xdr_string(max=16)
+    tag = xdr_opaque(size=3)
+    visible = xdr_bool
+    scale = xdr_double
+    origin = point
+    shapes = xdr_array(shape)
+    note = xdr_optional(xdr_string())
+    size = xdr_uhyper
+
+
+def a_drawing():
+    return drawing(name="house", tag=b"abc", visible=True, scale=1.5,
+                   origin=point(x=-1, y=2**40),
+                   shapes=[ shape(kind=color.RED, radius=3),
+                            shape(kind=color.GREEN,
+                                  corners=[ point(x=1, y=2),
+                                            point(x=3, y=-4) ]) ],
+                   note=[ "hi" ], size=2**64 - 1)
+
+
+def streamed(t, record, piece):
+    decoder = StreamUnpacker()
+    decoder.expect(t)
+    values = []
+    for i in range(0, len(record), piece):
+        values += decoder.feed(record[i:i + piece])
+    decoder.done()
+    (name, value), = values
+    return value
+
+
+@pytest.mark.parametrize("decode", [
+    lambda record: drawing.unpack(Unpacker(record)),
+    lambda record: drawing.unpack(Unpacker(record, plain=True)),
+    lambda record: drawing.unpack(Unpacker(record, zero_copy=True)),
+    lambda record: drawing.unpack(Unpacker(record, lazy=True)),
+    lambda record: streamed(drawing, record, len(record)),
+], ids=["unpack", "unpack_plain", "zero_copy", "unpack_lazy", "stream"])
+def test_codecs_round_trip(decode):
+    record = packed(a_drawing())
+    value = decode(record)
+    assert bytes(value.name.bytes) == b"house" and value.origin.y == 2**40
+    assert value.shapes[1].corners[1].y == -4
+    assert packed(value) == record
+    if type(value.size) is int:
+        assert type(value.origin.x) is int and value.visible is True
+    else:
+        assert isinstance(value.origin.x, xdr_int) and value.visible
+
+
+def test_plain_values_are_packed():
+    # what Unpacker(plain=True) and trusted() give.
+    value = point.trusted(x=-1, y=2**40)
+    assert packed(value) == packed(point(x=-1, y=2**40))
+
+
+def test_skip():
+    record = packed(a_drawing()) + packed(point(x=5, y=6))
+    unpacker = Unpacker(record)
+    drawing.skip(unpacker)
+    assert point.unpack(unpacker).x == 5
+    unpacker.done()
+    with pytest.raises(EOFError):
+        drawing.skip(Unpacker(record[:40]))
+
+
+def test_bad_values():
+    with pytest.raises(XDRBadValue):
+        drawing(name="a name that is too long", tag=b"abc", visible=True,
+                scale=0, origin=point(x=0, y=0), shapes=[], note=[], size=0)
+    with pytest.raises(XDRBadValue):
+        point(x=0, y=0, z=0)
+    # not a color.
+    record = bytearray(packed(shape(kind=color.RED, radius=1)))
+    record[3] = 7
+    for unpack in (shape.unpack, shape.skip):
+        with pytest.raises(XDRBadValue):
+            unpack(Unpacker(bytes(record)))
+
+
+def write_compound(data=b"data"):
+    return COMPOUND4args(tag=b"write", minorversion=0, argarray=[
+        nfs_argop4(argop=nfs_opnum4.OP_PUTFH,
+                   opputfh=PUTFH4args(object=b"fh")),
+        nfs_argop4(argop=nfs_opnum4.OP_WRITE,
+                   opwrite=WRITE4args(stateid=stateid4(seqid=1,
+                                                       other=bytes(12)),
+                                      offset=10,
+                                      stable=stable_how4.FILE_SYNC4,
+                                      data=data)),
+        nfs_argop4(argop=nfs_opnum4.OP_GETATTR,
+                   opgetattr=GETATTR4args(attr_request=[ 0x1a, 0x3a ])),
+    ])
+
+
+def test_lazy_decoding():
+    record = packed(write_compound())
+    unpacker = Unpacker(record, lazy=True)
+    args = COMPOUND4args.unpack(unpacker)
+    # the whole record was scanned, and nothing decoded.
+    assert unpacker.get_position() == len(record)
+    ops = args.argarray
+    assert len(ops) == 3 and ops._decoded == []
+    assert bytes(ops[0].opputfh.object.bytes) == b"fh"
+    assert len(ops._decoded) == 1
+    write = ops[1].opwrite
+    assert (write.offset, write.stable, bytes(write.data.bytes)) == \
+        (10, stable_how4.FILE_SYNC4, b"data")
+    assert list(ops[2].opgetattr.attr_request) == [ 0x1a, 0x3a ]
+    assert [ op.argop for op in ops ] == [ nfs_opnum4.OP_PUTFH,
+                                           nfs_opnum4.OP_WRITE,
+                                           nfs_opnum4.OP_GETATTR ]
+    assert packed(args) == record
+
+
+def test_lazy_decoding_checks_while_scanning():
+    record = packed(write_compound())
+    with pytest.raises(EOFError):
+        COMPOUND4args.unpack(Unpacker(record[:-4], lazy=True))
+    # the WRITE's data runs past the end.
+    bad = bytearray(record)
+    bad[-24:-20] = (100).to_bytes(4, "big")
+    with pytest.raises(EOFError):
+        COMPOUND4args.unpack(Unpacker(bytes(bad), lazy=True))
+
+
+def test_packer_and_unpacker():
+    packer = Packer()
+    packer.pack_uint(2**32 - 1)
+    packer.pack_int(-2)
+    packer.pack_bool(True)
+    packer.pack_uhyper(2**64 - 1)
+    packer.pack_hyper(-3)
+    packer.pack_float(0.5)
+    packer.pack_double(-0.25)
+    packer.pack_fstring(5, b"ab")
+    packer.pack_string(b"xyz")
+    packer.pack_array([ 1, 2 ], packer.pack_uint)
+    packer.pack_list([ 3 ], packer.pack_int)
+    record = packer.get_buffer()
+    assert len(record) == packer.get_position() == 80
+    # short fixed-length data is zero-filled, and everything padded.
+    assert record[40:48] == b"ab\0\0\0\0\0\0"
+    unpacker = Unpacker(record)
+    assert unpacker.unpack_uint() == 2**32 - 1
+    assert unpacker.unpack_int() == -2
+    assert unpacker.unpack_bool() is True
+    assert unpacker.unpack_uhyper() == 2**64 - 1
+    assert unpacker.unpack_hyper() == -3
+    assert unpacker.unpack_float() == 0.5
+    assert unpacker.unpack_double() == -0.25
+    assert unpacker.unpack_fstring(5) == b"ab\0\0\0"
+    assert unpacker.unpack_string() == b"xyz"
+    assert unpacker.unpack_array(unpacker.unpack_uint) == [ 1, 2 ]
+    assert unpacker.unpack_list(unpacker.unpack_int) == [ 3 ]
+    unpacker.done()
+    with pytest.raises(EOFError):
+        unpacker.unpack_uint()
+
+
+def test_packer_errors():
+    packer = Packer()
+    for pack, value in ((packer.pack_uint, -1), (packer.pack_int, 2**31),
+                        (packer.pack_uhyper, 2**64), (packer.pack_int, "1")):
+        with pytest.raises(ConversionError):
+            pack(value)
+    assert packer.get_buffer() == b""
+    unpacker = Unpacker(b"\0\0\0\1\0\0")
+    with pytest.raises(Error):
+        unpacker.done()
+    unpacker.unpack_uint()
+    with pytest.raises(EOFError):
+        unpacker.unpack_uint()
+    with pytest.raises(EOFError):
+        Unpacker(b"\0\0\0\5abcd").unpack_string()
+
+
+def test_pack_into_reserved():
+    packer = Packer()
+    packer.pack_uint(1)
+    offset = packer.reserve(4)
+    packer.pack_uint(3)
+    packer.pack_into(_struct.Struct(">I"), offset, 2)
+    assert packer.get_buffer() == b"\0\0\0\1\0\0\0\2\0\0\0\3"
+
+
+def test_zero_copy_opaques():
+    record = bytearray(packed(write_compound()))
+    unpacker = Unpacker(record, zero_copy=True)
+    args = COMPOUND4args.unpack(unpacker)
+    # opaques are views into the record; strings, and opaques of a fixed
+    # size, which are short, are copied.
+    data = args.argarray[1].opwrite.data.bytes
+    assert type(data) is memoryview and data.obj is record
+    assert type(args.argarray[1].opwrite.stateid.other.bytes) is bytes
+    value = drawing.unpack(Unpacker(packed(a_drawing()), zero_copy=True))
+    assert type(value.name.bytes) is bytes
+    record[-20:-16] = b"DATA"
+    assert bytes(data) == b"DATA"
+    unpacker.release()
+    with pytest.raises(ValueError):
+        bytes(data)
+
+
+def test_gathered_opaques(tmp_path):
+    data = bytes(Packer.gather_threshold)
+    (tmp_path / "f").write_bytes(b"file data")
+    with open(tmp_path / "f", "rb") as f:
+        packer = Packer()
+        packer.pack_uint(1)
+        packer.pack_opaque(data)
+        packer.pack_fopaque(4, file_data(f, 5, 4))
+        packer.pack_uint(2)
+        buffers = packer.get_buffers()
+        # the large opaque and the file's data are not copied.
+        assert buffers[1].obj is data
+        assert type(buffers[2]) is file_data and buffers[2].offset == 5
+        assert packer.get_buffer() == (b"\0\0\0\1" + packed(
+            xdr_opaque()(data)) + b"data" + b"\0\0\0\2")
+
+
+def test_numeric_arrays():
+    gids = authsys_parms._xdr_member_types["gids"]
+    value = gids([ 1, xdr_uint(2), 2**32 - 1 ])
+    assert isinstance(value, array.array) and value.typecode in "IL"
+    assert list(value) == [ 1, 2, 2**32 - 1 ]
+    assert packed(value) == b"\0\0\0\3\0\0\0\1\0\0\0\2\xff\xff\xff\xff"
+    # long arrays are packed as one block, and byte-swapped back.
+    hypers = xdr_array(xdr_hyper)
+    longer = hypers(range(-50, 50))
+    record = packed(longer)
+    assert len(record) == 4 + 800
+    for unpacker in (Unpacker(record), Unpacker(record, plain=True)):
+        assert list(hypers.unpack(unpacker)) == list(range(-50, 50))
+    assert list(streamed(hypers, record, 7)) == list(range(-50, 50))
+    fixed = xdr_array(xdr_int, size=2)
+    assert packed(fixed([ -1, 1 ])) == b"\xff\xff\xff\xff\0\0\0\1"
+    with pytest.raises(XDRBadValue):
+        fixed([ 1 ])
+    with pytest.raises(XDRBadValue):
+        gids([ 2**32 ])
+
+
+@pytest.mark.parametrize("t", [ xdr_array(xdr_uint, max=16),
+                                xdr_array(point, max=1) ])
+def test_array_max(t):
+    n = t.max
+    element = 7 if t.element_type is xdr_uint else point(x=1, y=2)
+    t([ element ] * n)
+    with pytest.raises(XDRBadValue):
+        t([ element ] * (n + 1))
+    record = (n + 1).to_bytes(4, "big") + packed(t([ element ] * n))[4:] + \
+        packed(t([ element ]))[4:]
+    for decode in (lambda: t.unpack(Unpacker(record)),
+                   lambda: t.skip(Unpacker(record)),
+                   lambda: getattr(t, "unpack_lazy_elements", t.unpack)(
+                       Unpacker(record)),
+                   lambda: streamed(t, record, len(record))):
+        with pytest.raises(XDRBadValue):
+            decode()
+
+
+def test_authsys_gids_max():
+    params = authsys_parms(stamp=1, machinename="m", uid=0, gid=0,
+                           gids=list(range(16)))
+    record = bytearray(packed(params))
+    assert authsys_parms.unpack(Unpacker(bytes(record))).gids[15] == 15
+    # a count of 17 gids, with a 17th gid after them.
+    record[-68:-64] = (17).to_bytes(4, "big")
+    with pytest.raises(XDRBadValue):
+        authsys_parms.unpack(Unpacker(bytes(record) + bytes(4)))
+
+
+@pytest.mark.parametrize("piece", [ 1, 3, 5, 64 ])
+def test_stream_unpacker(piece):
+    record = packed(a_drawing())
+    assert packed(streamed(drawing, record, piece)) == record
+    decoder = StreamUnpacker()
+    decoder.expect(drawing)
+    assert list(decoder.feed(record[:-1])) == []
+    with pytest.raises(Error):
+        decoder.done()
+
+
+def test_stream_unpacker_members_and_sink():
+    sunk = []
+    def sink(n):
+        sunk.append(io.BytesIO())
+        return sunk[-1]
+    data = bytes(range(256)) * 40
+    record = packed(write_compound(data))
+    decoder = StreamUnpacker(sink=sink, sink_threshold=len(data))
+    decoder.expect_members(COMPOUND4args)
+    values = []
+    for i in range(len(record)):
+        values += decoder.feed(record[i:i + 1])
+    decoder.done()
+    # each op as soon as it has arrived.
+    assert [ name for name, value in values ] == [
+        "tag", "minorversion", "argarray", "argarray", "argarray" ]
+    write = values[3][1].opwrite
+    assert write.data.bytes is sunk[0]
+    assert sunk[0].getvalue() == data
+    assert int(values[4][1].argop) == nfs_opnum4.OP_GETATTR
+
+
+class node(xdr_struct):
+    value = xdr_int
+node.next = xdr_optional(node)
+
+class chain(xdr_struct):
+    nodes = xdr_optional(node)
+    length = xdr_uint
+
+
+def test_linked_lists():
+    # nodes given linked bring their chain into the list.
+    linked = node(value=0, next=[ node(value=1, next=[ node(value=2) ]) ])
+    value = chain(nodes=[ linked ], length=3)
+    assert [ int(n.value) for n in value.nodes ] == [ 0, 1, 2 ]
+    assert packed(value) == (b"\0\0\0\1\0\0\0\0" + b"\0\0\0\1\0\0\0\1" +
+                             b"\0\0\0\1\0\0\0\2" + b"\0\0\0\0" + b"\0\0\0\3")
+    assert packed(chain(nodes=[], length=0)) == bytes(8)
+
+
+def test_long_linked_lists():
+    # far longer than the recursion limit allows a frame per node.
+    n = 20000
+    record = packed(chain(nodes=[ node(value=i) for i in range(n) ],
+                          length=n))
+    for decode in (lambda: chain.unpack(Unpacker(record)),
+                   lambda: chain.unpack(Unpacker(record, plain=True)),
+                   lambda: chain.unpack(Unpacker(record, lazy=True)),
+                   lambda: streamed(chain, record, 4096)):
+        value = decode()
+        assert int(value.length) == n and int(value.nodes[-1].value) == n - 1
+        # the link of a decoded node is empty.
+        assert len(value.nodes[0].next) == 0
+        assert packed(value) == record
+    unpacker = Unpacker(record)
+    chain.skip(unpacker)
+    unpacker.done()
+    packer = Packer()
+    assert sum(len(b"".join(bytes(b) for b in f)) for f in
+               packer.pack_fragments(chain.unpack(Unpacker(record)),
+                                     65536)) == len(record)
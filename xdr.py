@@ -1,14 +1,683 @@
 """
-XDR implementation, using xdrlib for packing.
+XDR implementation.
+According to RFC 4506.
 """
 
-import xdrlib as _xdr
+import array as _array
+import collections as _collections
+import os as _os
+import struct as _struct
+import sys as _sys
 
 
 class XDRBadValue(BaseException):
     pass
 
 
+class Error(Exception):
+    """
+    Raised by Packer/Unpacker, as xdrlib.Error was.
+    """
+    def __init__(self, msg):
+        self.msg = msg
+
+    def __repr__(self):
+        return repr(self.msg)
+
+    def __str__(self):
+        return str(self.msg)
+
+class ConversionError(Error):
+    pass
+
+
+_int = _struct.Struct(">i")
+_uint = _struct.Struct(">I")
+_hyper = _struct.Struct(">q")
+_uhyper = _struct.Struct(">Q")
+_float = _struct.Struct(">f")
+_double = _struct.Struct(">d")
+_int_pack = _int.pack
+_uint_pack = _uint.pack
+_hyper_pack = _hyper.pack
+_uhyper_pack = _uhyper.pack
+_float_pack = _float.pack
+_double_pack = _double.pack
+_int_unpack_from = _int.unpack_from
+_uint_unpack_from = _uint.unpack_from
+_hyper_unpack_from = _hyper.unpack_from
+_uhyper_unpack_from = _uhyper.unpack_from
+_float_unpack_from = _float.unpack_from
+_double_unpack_from = _double.unpack_from
+_padding = [ bytes(n) for n in range(4) ]
+
+
+class file_data(object):
+    """
+    Opaque data that is read from a file only as it is sent: count bytes
+    of file (anything with a fileno()) from offset.  A Packer keeps it as
+    a segment of its own, for tcp to send with os.sendfile; slicing it
+    gives the file_data of part of it.  The file is kept open for as long
+    as the file_data exists.  Should the file have become shorter by the
+    time it is sent, the data is made up to count bytes with zeros.
+    """
+    __slots__ = ("file", "offset", "count")
+
+    def __init__(self, file, offset, count):
+        self.file = file
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        start, stop, step = index.indices(self.count)
+        return file_data(self.file, self.offset + start, max(stop - start, 0))
+
+    def __repr__(self):
+        return "file_data(%r, %d, %d)" % (self.file, self.offset, self.count)
+
+    def read(self):
+        data = _os.pread(self.file.fileno(), self.count, self.offset)
+        if len(data) < self.count:
+            data += bytes(self.count - len(data))
+        return data
+
+
+class Packer(object):
+    """
+    Pack various data representations into a buffer.
+    A drop-in replacement for xdrlib.Packer, appending precompiled
+    struct.Struct encodings to a bytearray (which grows geometrically).
+
+    Opaque data of at least gather_threshold bytes is not copied: the
+    caller's buffer is kept as a segment of its own, and get_buffers()
+    returns the segments for a scatter/gather write.  Such buffers must not
+    be modified until the packed data has been consumed.  Opaque data
+    given as a file_data is likewise a segment of its own.
+    """
+    gather_threshold = 4096
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._buf = bytearray()
+        self._segments = []
+        self._base = 0
+
+    def get_buffer(self):
+        if not self._segments:
+            return bytes(self._buf)
+        return b"".join([ b.read() if type(b) is file_data else b
+                          for b in self._segments ] + [ self._buf ])
+    # backwards compatibility
+    get_buf = get_buffer
+
+    def get_buffers(self):
+        """
+        The packed data as a list of buffers, without copying.
+        """
+        if not self._buf:
+            return list(self._segments)
+        return self._segments + [ self._buf ]
+
+    def get_position(self):
+        return self._base + len(self._buf)
+
+    def pack_fragments(self, value, fragment_size=65536):
+        """
+        Pack value after what this packer already holds, as a generator of
+        fragments: lists of buffers, as from get_buffers(), of about
+        fragment_size bytes (more if value holds large opaque data, which
+        is not copied).  Each fragment is only packed once the one before
+        it has been taken, and the packer is reset for it.
+        """
+        for _ in value.pack_stream(self):
+            if self.get_position() >= fragment_size:
+                yield self.get_buffers()
+                self.reset()
+        buffers = self.get_buffers()
+        if buffers:
+            yield buffers
+
+    def reserve(self, n):
+        """
+        Append n zero bytes, to be filled in later with pack_into.
+        Returns their offset.
+        """
+        pos = self.get_position()
+        self._buf += bytes(n)
+        return pos
+
+    def pack_into(self, s, offset, *values):
+        """
+        Overwrite previously packed or reserved bytes at offset.
+        """
+        for buf in self._segments + [ self._buf ]:
+            if offset < len(buf):
+                break
+            offset -= len(buf)
+        try:
+            s.pack_into(buf, offset, *values)
+        except (TypeError, _struct.error) as e:
+            raise ConversionError(e.args[0]) from None
+
+    def pack_struct(self, s, *values):
+        """
+        Pack values with a precompiled struct.Struct.
+        """
+        try:
+            self._buf += s.pack(*values)
+        except (TypeError, _struct.error) as e:
+            raise ConversionError(e.args[0]) from None
+
+    def pack_uint(self, x):
+        try:
+            self._buf += _uint_pack(x)
+        except (TypeError, _struct.error) as e:
+            raise ConversionError(e.args[0]) from None
+
+    def pack_int(self, x):
+        try:
+            self._buf += _int_pack(x)
+        except (TypeError, _struct.error) as e:
+            raise ConversionError(e.args[0]) from None
+
+    pack_enum = pack_int
+
+    def pack_bool(self, x):
+        if x: self._buf += b'\0\0\0\1'
+        else: self._buf += b'\0\0\0\0'
+
+    def pack_uhyper(self, x):
+        try:
+            self._buf += _uhyper_pack(x)
+        except (TypeError, _struct.error) as e:
+            raise ConversionError(e.args[0]) from None
+
+    def pack_hyper(self, x):
+        try:
+            self._buf += _hyper_pack(x)
+        except (TypeError, _struct.error) as e:
+            raise ConversionError(e.args[0]) from None
+
+    def pack_float(self, x):
+        try:
+            self._buf += _float_pack(x)
+        except (TypeError, _struct.error) as e:
+            raise ConversionError(e.args[0]) from None
+
+    def pack_double(self, x):
+        try:
+            self._buf += _double_pack(x)
+        except (TypeError, _struct.error) as e:
+            raise ConversionError(e.args[0]) from None
+
+    def pack_fstring(self, n, s):
+        if n < 0:
+            raise ValueError('fstring size must be nonnegative')
+        try:
+            data = memoryview(s).cast("B")[:n]
+        except TypeError:
+            if type(s) is not file_data:
+                raise
+            # always a segment of its own, however short.
+            data = s[:n]
+        if len(data) >= self.gather_threshold or type(data) is file_data:
+            if self._buf:
+                self._segments.append(self._buf)
+                self._base += len(self._buf)
+                self._buf = bytearray()
+            self._segments.append(data)
+            self._base += len(data)
+        else:
+            self._buf += data
+        # data shorter than n is zero-filled to n, as xdrlib did.
+        pad = (n + 3) // 4 * 4 - len(data)
+        self._buf += _padding[pad] if pad < 4 else bytes(pad)
+
+    pack_fopaque = pack_fstring
+
+    def pack_string(self, s):
+        n = len(s)
+        self.pack_uint(n)
+        self.pack_fstring(n, s)
+
+    pack_opaque = pack_string
+    pack_bytes = pack_string
+
+    def pack_list(self, list, pack_item):
+        for item in list:
+            self.pack_uint(1)
+            pack_item(item)
+        self.pack_uint(0)
+
+    def pack_farray(self, n, list, pack_item):
+        if len(list) != n:
+            raise ValueError('wrong array size')
+        for item in list:
+            pack_item(item)
+
+    def pack_array(self, list, pack_item):
+        n = len(list)
+        self.pack_uint(n)
+        self.pack_farray(n, list, pack_item)
+
+
+class Unpacker(object):
+    """
+    Unpacks various data representations from the given buffer.
+    A drop-in replacement for xdrlib.Unpacker, reading with
+    struct.unpack_from through a memoryview of the buffer.
+
+    With zero_copy=True, opaque data is returned as memoryviews into the
+    buffer instead of bytes.  The views stay valid until release() is
+    called; anything that must outlive that has to be copied.
+
+    With plain=True, the xdr types decode integers, enums, bools and
+    floats as plain Python values instead of xdr_int etc. objects.
+
+    With lazy=True, a struct or union only records where each of its
+    members starts, in one pass over them, and decodes a member the
+    first time it is accessed; it keeps the unpacker (and so the buffer)
+    until then.  Members are decoded eagerly, except that the elements
+    of an array of structs or unions are decoded in order as they are
+    first looked at.  This pays for a COMPOUND that stops early, and
+    costs more than decoding eagerly when everything is looked at.
+    """
+    def __init__(self, data, zero_copy=False, plain=False, lazy=False):
+        self.zero_copy = zero_copy
+        self.plain = plain
+        self.lazy = lazy
+        self.reset(data)
+
+    def reset(self, data):
+        self._data = data
+        self._buf = memoryview(data).cast("B")
+        self._len = len(self._buf)
+        self._pos = 0
+        self._views = []
+
+    def release(self):
+        """
+        Release the views handed out in zero_copy mode.
+        """
+        for view in self._views:
+            try:
+                view.release()
+            except BufferError:
+                # still exported elsewhere; the view keeps its buffer alive.
+                pass
+        self._views = []
+
+    def get_position(self):
+        return self._pos
+
+    def set_position(self, position):
+        self._pos = position
+
+    def get_buffer(self):
+        return self._data
+
+    def done(self):
+        if self._pos < self._len:
+            raise Error('unextracted data remains')
+
+    def skip(self, n):
+        """
+        Advance past n bytes of data, and their padding.
+        """
+        j = self._pos + (n + 3) // 4 * 4
+        if j > self._len:
+            raise EOFError
+        self._pos = j
+
+    def unpack_struct(self, s):
+        """
+        Unpack a tuple of values with a precompiled struct.Struct.
+        """
+        i = self._pos
+        j = i + s.size
+        if j > self._len:
+            raise EOFError
+        self._pos = j
+        return s.unpack_from(self._buf, i)
+
+    def unpack_uint(self):
+        i = self._pos
+        self._pos = j = i + 4
+        if j > self._len:
+            raise EOFError
+        return _uint_unpack_from(self._buf, i)[0]
+
+    def unpack_int(self):
+        i = self._pos
+        self._pos = j = i + 4
+        if j > self._len:
+            raise EOFError
+        return _int_unpack_from(self._buf, i)[0]
+
+    unpack_enum = unpack_int
+
+    def unpack_bool(self):
+        return bool(self.unpack_int())
+
+    def unpack_uhyper(self):
+        i = self._pos
+        self._pos = j = i + 8
+        if j > self._len:
+            raise EOFError
+        return _uhyper_unpack_from(self._buf, i)[0]
+
+    def unpack_hyper(self):
+        i = self._pos
+        self._pos = j = i + 8
+        if j > self._len:
+            raise EOFError
+        return _hyper_unpack_from(self._buf, i)[0]
+
+    def unpack_float(self):
+        i = self._pos
+        self._pos = j = i + 4
+        if j > self._len:
+            raise EOFError
+        return _float_unpack_from(self._buf, i)[0]
+
+    def unpack_double(self):
+        i = self._pos
+        self._pos = j = i + 8
+        if j > self._len:
+            raise EOFError
+        return _double_unpack_from(self._buf, i)[0]
+
+    def unpack_fstring(self, n):
+        if n < 0:
+            raise ValueError('fstring size must be nonnegative')
+        i = self._pos
+        j = i + (n + 3) // 4 * 4
+        if j > self._len:
+            raise EOFError
+        self._pos = j
+        return self._buf[i:i + n].tobytes()
+
+    def unpack_fopaque(self, n):
+        if not self.zero_copy:
+            return self.unpack_fstring(n)
+        if n < 0:
+            raise ValueError('fopaque size must be nonnegative')
+        i = self._pos
+        j = i + (n + 3) // 4 * 4
+        if j > self._len:
+            raise EOFError
+        self._pos = j
+        view = self._buf[i:i + n]
+        self._views.append(view)
+        return view
+
+    def unpack_string(self):
+        n = self.unpack_uint()
+        return self.unpack_fstring(n)
+
+    unpack_bytes = unpack_string
+
+    def unpack_opaque(self):
+        n = self.unpack_uint()
+        return self.unpack_fopaque(n)
+
+    def unpack_list(self, unpack_item):
+        list = []
+        while 1:
+            x = self.unpack_uint()
+            if x == 0: break
+            if x != 1:
+                raise ConversionError('0 or 1 expected, got %r' % (x,))
+            item = unpack_item()
+            list.append(item)
+        return list
+
+    def unpack_farray(self, n, unpack_item):
+        list = []
+        for i in range(n):
+            list.append(unpack_item())
+        return list
+
+    def unpack_array(self, unpack_item):
+        n = self.unpack_uint()
+        return self.unpack_farray(n, unpack_item)
+
+
+class _stream_opaque(int):
+    """
+    The request for the data of a variable-length opaque, made by its
+    stream(): a StreamUnpacker may send it to its sink.
+    """
+    __slots__ = ()
+
+# what StreamUnpacker._resume returns while a stream wants more data, and
+# what a stream returns for a value feed() should not yield.
+_pending = object()
+_hidden = object()
+
+
+class StreamUnpacker(object):
+    """
+    Decodes xdr values from data that arrives in pieces, such as the
+    fragments of an RPC record, as soon as each value is complete.
+
+    expect(t) queues a value of t to be decoded, t being an xdr type or
+    anything else with a stream() (see xdr_object.stream); expect_members(t)
+    queues each member of struct t instead, and the elements of its
+    array members one at a time.  feed(data) takes the next piece of data
+    and returns a generator of (name, value) for the values it completes;
+    more values may be queued while iterating over it.
+
+    Variable-length opaques of at least sink_threshold bytes are not
+    buffered if there is a sink: sink(n) is called as one starts, each
+    piece of its data is written to the file-like object it returns (as a
+    memoryview, which write() must copy), and that object is the opaque's
+    bytes.
+    """
+    def __init__(self, sink=None, sink_threshold=4096, plain=False):
+        self.sink = sink
+        self.sink_threshold = sink_threshold
+        self.plain = plain
+        # received data not yet decoded.
+        self._buffer = bytearray()
+        self._queue = _collections.deque()
+        # the value being decoded, and how many bytes its stream wants.
+        self._name = None
+        self._stream = None
+        self._request = None
+        # the opaque going to the sink: (file, bytes left, padding left).
+        self._sinking = None
+
+    def unpacker(self, data):
+        """
+        An Unpacker for data a stream has been sent.
+        """
+        return Unpacker(data, plain=self.plain)
+
+    def expect(self, t, name=None):
+        self._queue.append((name, t.stream(self)))
+
+    def expect_members(self, t):
+        for k, m in _xdr_members(t, list(t._xdr_member_types)):
+            if (hasattr(m, "element_type") and
+                not issubclass(m, _array.array)):
+                self._queue.append((k, self._elements(k, m)))
+            else:
+                self.expect(m, k)
+
+    def _elements(self, name, t):
+        """
+        Read the count of array t, and queue its elements in its place.
+        """
+        if hasattr(t, "size"):
+            n = t.size
+        else:
+            n = self.unpacker((yield 4)).unpack_uint()
+            if n > t.max:
+                raise XDRBadValue
+        self._queue.extendleft(reversed([ (name, t.element_type.stream(self))
+                                          for i in range(n) ]))
+        return _hidden
+
+    def done(self):
+        if self._stream is not None or self._queue:
+            raise Error('incomplete data')
+        if self._buffer:
+            raise Error('unextracted data remains')
+
+    def feed(self, data):
+        data = memoryview(data).cast("B")
+        if self._sinking is not None and not self._buffer:
+            # straight from data to the sink.
+            data = data[self._sink(data):]
+        self._buffer += data
+        return self._run()
+
+    def _sink(self, data):
+        """
+        Write what data holds of the opaque going to the sink.  Returns
+        how many bytes of data that, and its padding, took up.
+        """
+        file, remaining, padding = self._sinking
+        n = min(len(data), remaining)
+        if n:
+            file.write(data[:n])
+            remaining -= n
+        used = n
+        if not remaining:
+            p = min(len(data) - n, padding)
+            padding -= p
+            used += p
+        self._sinking = (file, remaining, padding)
+        return used
+
+    def _resume(self, value):
+        """
+        Send value into the current stream.  Returns what the stream
+        returned, or _pending if it wants more data.
+        """
+        try:
+            request = self._stream.send(value)
+        except StopIteration as e:
+            return e.value
+        if (type(request) is _stream_opaque and self.sink is not None and
+            request >= self.sink_threshold):
+            self._sinking = (self.sink(int(request)), int(request),
+                             -request % 4)
+        else:
+            self._request = request
+        return _pending
+
+    def _run(self):
+        buf = self._buffer
+        while True:
+            if self._stream is None:
+                if not self._queue:
+                    return
+                self._name, self._stream = self._queue.popleft()
+                value = self._resume(None)
+            elif self._sinking is not None:
+                with memoryview(buf) as view:
+                    used = self._sink(view)
+                del buf[:used]
+                file, remaining, padding = self._sinking
+                if remaining or padding:
+                    return
+                self._sinking = None
+                value = self._resume(file)
+            else:
+                n = self._request
+                if len(buf) < (n + 3) // 4 * 4:
+                    return
+                data = buf[:n]
+                del buf[:(n + 3) // 4 * 4]
+                value = self._resume(data)
+            if value is not _pending:
+                self._stream = None
+                if value is not _hidden:
+                    yield self._name, value
+
+
+import types as _types
+
+
+class _xdr_member(object):
+    """
+    The type of a struct or union member, seen from the class.
+    Instances keep their members in __slots__, so the class attribute of
+    the member's name is the slot; this descriptor lives on the class's
+    own metaclass and answers class-level lookups like rpc_msg.body.
+    """
+    def __init__(self, type):
+        self.type = type
+
+    def __get__(self, cls, meta=None):
+        if cls is None:
+            return self
+        return self.type
+
+    def __set__(self, cls, type):
+        self.type = type
+
+
+def _xdr_has_slot(cls, name):
+    for base in cls.__mro__:
+        if name in base.__dict__:
+            return type(base.__dict__[name]) is _types.MemberDescriptorType
+    return False
+
+
+def _xdr_slotted(mcls, name, bases, ns, members, names):
+    """
+    Create a class whose instances keep the given member names in
+    __slots__, with the member types (a {name: type} dict, already
+    removed from ns) reachable through a metaclass made for this class.
+    Each such class also gets one spare slot, for a member added after
+    the class exists, one for the offsets of members not yet decoded
+    (see _xdr_lazy_getattr), and a __dict__ for anything else.
+    """
+    types = {}
+    for base in reversed(bases):
+        types.update(getattr(base, "_xdr_member_types", {}))
+    types.update(members)
+    slots = []
+    for k in names:
+        if k not in slots and not any(_xdr_has_slot(b, k) for b in bases):
+            slots.append(k)
+    if not any(_xdr_has_slot(b, "_xdr_spare") for b in bases):
+        slots.append("_xdr_spare")
+        slots.append("_xdr_lazy")
+    if not any(b.__dictoffset__ for b in bases):
+        slots.append("__dict__")
+    ns["__slots__"] = tuple(slots)
+    ns["_xdr_member_types"] = types
+    meta = type(mcls.__name__, (mcls,),
+                { k: _xdr_member(t) for k, t in members.items() })
+    return type.__new__(meta, name, bases, ns)
+
+
+def _xdr_slot(cls, name):
+    """
+    Give instances of cls somewhere to keep a member added after the
+    class was created: the spare slot if nothing in its MRO has claimed
+    it yet, otherwise the instance __dict__.
+    """
+    if _xdr_has_slot(cls, name):
+        return
+    if any("_xdr_spare_claimed" in b.__dict__ for b in cls.__mro__):
+        return
+    for base in cls.__mro__:
+        if "_xdr_spare" in base.__dict__:
+            type.__setattr__(cls, name, base.__dict__["_xdr_spare"])
+            type.__setattr__(cls, "_xdr_spare_claimed", name)
+            return
+
+
 class _xdr_type(type):
     @classmethod
     def __prepare__(metacls, name, bases):
@@ -24,12 +693,289 @@ class _xdr_type(type):
         return member_table()
 
     def __new__(cls, name, bases, classdict):
-        result = type.__new__(cls, name, bases, dict(classdict))
-        result.member_names = classdict.member_names
+        ns = dict(classdict)
+        if "__slots__" in ns:
+            result = type.__new__(cls, name, bases, ns)
+        elif any(getattr(b, "_xdr_slot_members", False) for b in bases):
+            members = { k: ns.pop(k)
+                        for k in classdict.member_names
+                        if isinstance(ns.get(k), _xdr_type) }
+            result = _xdr_slotted(cls, name, bases, ns, members, list(members))
+        else:
+            ns["__slots__"] = ()
+            result = type.__new__(cls, name, bases, ns)
+        type.__setattr__(result, "member_names", classdict.member_names)
+        result._xdr_compile()
         return result
 
+    def __setattr__(cls, key, value):
+        # Members may be attached after the class body has run, e.g.
+        # self-referential links like entry4.nextentry; recompile for them.
+        types = cls.__dict__.get("_xdr_member_types")
+        if (types is not None and
+            getattr(value, "element_type", None) is cls and
+            value.max == 1 and not hasattr(value, "size")):
+            # an optional of cls itself: the chain is held as a list.
+            value = _xdr_linked_list(cls, key)
+        if types is not None and isinstance(value, _xdr_type):
+            if key not in types:
+                cls.member_names.append(key)
+                _xdr_slot(cls, key)
+            types[key] = value
+            type.__setattr__(type(cls), key, _xdr_member(value))
+            cls._xdr_compile()
+            return
+        type.__setattr__(cls, key, value)
+        if isinstance(value, _xdr_type) and key not in cls.member_names:
+            cls.member_names.append(key)
+            cls._xdr_compile()
+        elif type(value) is int and issubclass(cls, xdr_enum):
+            # a value added to an enum.
+            cls._xdr_compile()
+        elif key == "_xdr_default":
+            cls._xdr_compile()
+
 class xdr_object(object, metaclass=_xdr_type):
-    pass
+    __slots__ = ()
+    # struct format of the encoding, for types with a fixed-size encoding.
+    _xdr_format = None
+    # attribute holding the raw value of fixed-size types.
+    _xdr_raw = "value"
+    # for the nodes of a linked list, the name of the member linking to
+    # the next node, and the list type (see _xdr_linked_list).
+    _xdr_link = None
+    _xdr_list = None
+
+    @classmethod
+    def _xdr_compile(cls):
+        pass
+
+    @classmethod
+    def skip(cls, unpacker):
+        """
+        Advance unpacker past an encoded value without keeping it.
+        """
+        if cls._xdr_format is not None:
+            unpacker.skip(_struct.calcsize(">" + cls._xdr_format))
+        else:
+            cls.unpack(unpacker)
+
+    def pack_stream(self, packer):
+        """
+        pack(), as a generator for Packer.pack_fragments: values that can
+        be large yield between their parts, for the packed data to be
+        taken away.
+        """
+        self.pack(packer)
+        return
+        yield
+
+    @classmethod
+    def stream(cls, decoder):
+        """
+        A generator decoding a value for a StreamUnpacker: it yields how
+        many bytes it needs next, is sent them, and returns the value.
+        """
+        data = b""
+        if cls._xdr_format is not None:
+            data = yield _struct.calcsize(">" + cls._xdr_format)
+        return cls.unpack(decoder.unpacker(data))
+
+
+def _xdr_lazy_getattr(self, name):
+    """
+    __getattr__ of structs and unions: a member of one decoded with
+    Unpacker(lazy=True) is decoded when it is first looked up, from the
+    offset recorded when its owner was unpacked.  The link of a linked
+    list node is made when first looked up, too.
+    """
+    if name == "_xdr_lazy":
+        raise AttributeError(name)
+    try:
+        unpacker, offsets, types = self._xdr_lazy
+        offset = offsets[name]
+    except (AttributeError, KeyError):
+        if name == type(self)._xdr_link:
+            # a node decoded as part of a list, which holds the rest of
+            # the chain; its own link is empty.
+            value = type(self)._xdr_list()
+            object.__setattr__(self, name, value)
+            return value
+        raise AttributeError("%r object has no attribute %r"
+                             % (type(self).__name__, name)) from None
+    # the member is decoded eagerly, as its offsets are not known without
+    # scanning it again, except that an array of structs or unions (the
+    # ops of a COMPOUND) decodes each element when it is first looked at.
+    t = types[name]
+    unpack = getattr(t, "unpack_lazy_elements", t.unpack)
+    position = unpacker.get_position()
+    unpacker.set_position(offset)
+    unpacker.lazy = False
+    try:
+        value = unpack(unpacker)
+    finally:
+        unpacker.lazy = True
+        unpacker.set_position(position)
+    object.__setattr__(self, name, value)
+    return value
+
+
+def _xdr_members(cls, names):
+    types = cls.__dict__.get("_xdr_member_types", cls.__dict__)
+    return [ (k, types[k])
+             for k in names
+             if isinstance(types.get(k), _xdr_type) ]
+
+
+class _xdr_codegen(object):
+    """
+    Generates the source for specialized encoders and decoders.
+    Runs of consecutive fixed-size members are packed and unpacked with a
+    single precompiled struct.Struct; everything else is delegated to the
+    member type's own pack/unpack.
+    """
+    def __init__(self):
+        self.namespace = { "XDRBadValue": XDRBadValue,
+                           "_new": object.__new__ }
+        self.lines = []
+
+    def name(self, prefix, value):
+        name = "_%s%d" % (prefix, len(self.namespace))
+        self.namespace[name] = value
+        return name
+
+    def emit(self, line):
+        self.lines.append(line)
+
+    def runs(self, members):
+        run = []
+        for k, t in members:
+            if t._xdr_format is None:
+                if run:
+                    yield run
+                    run = []
+                yield (k, t)
+            else:
+                run.append((k, t))
+        if run:
+            yield run
+
+    def pack_members(self, members, indent="    "):
+        for run in self.runs(members):
+            if type(run) is tuple:
+                self.emit("%sself.%s.pack(packer)" % (indent, run[0]))
+                continue
+            s = self.name("S", _struct.Struct(">" + "".join(t._xdr_format
+                                                            for k, t in run)))
+            args = ", ".join("self.%s.%s" % (k, t._xdr_raw) for k, t in run)
+            if all(t._xdr_raw != "value" for k, t in run):
+                self.emit("%spacker.pack_struct(%s, %s)" % (indent, s, args))
+                continue
+            # scalars decoded with Unpacker(plain=True) are plain values.
+            plain = ", ".join("self.%s" % k if t._xdr_raw == "value"
+                              else "self.%s.%s" % (k, t._xdr_raw)
+                              for k, t in run)
+            self.emit("%stry:" % indent)
+            self.emit("%s    packer.pack_struct(%s, %s)" % (indent, s, args))
+            self.emit("%sexcept AttributeError:" % indent)
+            self.emit("%s    packer.pack_struct(%s, %s)" % (indent, s, plain))
+        if not members:
+            self.emit("%spass" % indent)
+
+    def unpack_members(self, members, indent="    ", plain=False):
+        for run in self.runs(members):
+            if type(run) is tuple:
+                k, t = run
+                self.emit("%sself.%s = %s.unpack(unpacker)"
+                          % (indent, k, self.name("T", t)))
+                continue
+            s = _struct.Struct(">" + "".join(t._xdr_format for k, t in run))
+            self.emit("%s_v = unpacker.unpack_struct(%s)"
+                      % (indent, self.name("S", s)))
+            for i, (k, t) in enumerate(run):
+                raw = "_v[%d]" % i
+                if issubclass(t, xdr_bool):
+                    raw = "_v[%d] != 0" % i
+                if plain and t._xdr_raw == "value":
+                    self.emit("%sself.%s = %s" % (indent, k, raw))
+                else:
+                    self.emit("%sself.%s = %s(%s)"
+                              % (indent, k, self.name("T", t), raw))
+
+    def pack_stream_members(self, members, indent="    "):
+        for run in self.runs(members):
+            if type(run) is not tuple:
+                self.pack_members(run, indent)
+                continue
+            k, t = run
+            if t.pack_stream is xdr_object.pack_stream:
+                self.emit("%sself.%s.pack(packer)" % (indent, k))
+            else:
+                self.emit("%syield from self.%s.pack_stream(packer)"
+                          % (indent, k))
+        self.emit("%sreturn" % indent)
+        self.emit("%syield" % indent)
+
+    def stream_members(self, members, indent="    "):
+        for run in self.runs(members):
+            if type(run) is tuple:
+                k, t = run
+                self.emit("%sself.%s = yield from %s.stream(decoder)"
+                          % (indent, k, self.name("T", t)))
+                continue
+            size = _struct.calcsize(">" + "".join(t._xdr_format
+                                                  for k, t in run))
+            self.emit("%sunpacker = decoder.unpacker((yield %d))"
+                      % (indent, size))
+            for k, t in run:
+                self.emit("%sself.%s = %s.unpack(unpacker)"
+                          % (indent, k, self.name("T", t)))
+
+    def skip_members(self, members, indent="    "):
+        for run in self.runs(members):
+            if type(run) is tuple:
+                self.emit("%s%s.skip(unpacker)" % (indent, self.name("T", run[1])))
+            else:
+                size = _struct.calcsize(">" + "".join(t._xdr_format
+                                                      for k, t in run))
+                self.emit("%sunpacker.skip(%d)" % (indent, size))
+        if not members:
+            self.emit("%spass" % indent)
+
+    def lazy_members(self, members, indent="    "):
+        """
+        Record the offset of each member in self._xdr_lazy, skipping over
+        them in one pass; runs of fixed-size members need one offset.
+        """
+        offsets = []
+        for run in self.runs(members):
+            p = "_p%d" % len(offsets)
+            self.emit("%s%s = unpacker.get_position()" % (indent, p))
+            if type(run) is tuple:
+                self.emit("%s%s.skip(unpacker)" % (indent, self.name("T", run[1])))
+                offsets.append((run[0], p))
+                continue
+            delta = 0
+            for k, t in run:
+                offsets.append((k, "%s + %d" % (p, delta) if delta else p))
+                delta += _struct.calcsize(">" + t._xdr_format)
+            self.emit("%sunpacker.skip(%d)" % (indent, delta))
+        if not members:
+            self.emit("%spass" % indent)
+            return
+        self.emit("%sself._xdr_lazy = (unpacker, { %s }, %s)"
+                  % (indent,
+                     ", ".join("%r: %s" % (k, p) for k, p in offsets),
+                     self.name("M", dict(members))))
+
+    def compile(self, cls, *names):
+        source = "\n".join(self.lines)
+        exec(compile(source, "<xdr %s>" % cls.__qualname__, "exec"),
+             self.namespace)
+        for name in names:
+            fxn = self.namespace[name]
+            fxn.__qualname__ = "%s.%s" % (cls.__qualname__, name)
+        return [ self.namespace[name] for name in names ]
 
 
 class xdr_void(xdr_object):
@@ -42,6 +988,9 @@ class xdr_void(xdr_object):
 
 
 class xdr_int(xdr_object):
+    __slots__ = ("value",)
+    _xdr_format = "i"
+
     def __init__(self, value):
         if type(value) is not int:
             raise XDRBadValue
@@ -66,9 +1015,14 @@ class xdr_int(xdr_object):
     @staticmethod
     def unpack(unpacker):
         value = unpacker.unpack_int()
+        if unpacker.plain:
+            return value
         return xdr_int(value)
 
 class xdr_uint(xdr_object):
+    __slots__ = ("value",)
+    _xdr_format = "I"
+
     def __init__(self, value):
         if type(value) is not int:
             raise XDRBadValue
@@ -96,16 +1050,27 @@ class xdr_uint(xdr_object):
     @staticmethod
     def unpack(unpacker):
         value = unpacker.unpack_uint()
+        if unpacker.plain:
+            return value
         return xdr_uint(value)
 
 class xdr_enum(xdr_object):
+    """
+    Each enum class has one instance per value, shared by everything
+    constructing or decoding that value; _xdr_compile makes them, and the
+    value to name and name to value maps, when the class is defined.
+    """
+    __slots__ = ("value",)
+    _xdr_format = "i"
+
+    def __new__(cls, value):
+        try:
+            return cls._xdr_instances[value]
+        except (KeyError, TypeError):
+            raise XDRBadValue from None
+
     def __init__(self, value):
-        for k, v in self.values():
-            if v == value:
-                break
-        else:
-            raise XDRBadValue
-        self.value = value
+        pass
 
     def __eq__(self, value):
         return value == self.value
@@ -118,9 +1083,21 @@ class xdr_enum(xdr_object):
 
     @classmethod
     def values(cls):
-        return [ (k, v)
-                 for k, v in cls.__dict__.items()
-                 if type(v) is int ]
+        return list(cls._xdr_by_name.items())
+
+    @classmethod
+    def _xdr_compile(cls):
+        cls._xdr_by_name = { k: v
+                             for k, v in cls.__dict__.items()
+                             if type(v) is int }
+        cls._xdr_names = {}
+        for k, v in cls._xdr_by_name.items():
+            cls._xdr_names.setdefault(v, k)
+        cls._xdr_instances = {}
+        for v in cls._xdr_names:
+            self = object.__new__(cls)
+            self.value = v
+            cls._xdr_instances[v] = self
 
     def pack(self, packer):
         packer.pack_enum(self.value)
@@ -128,9 +1105,17 @@ class xdr_enum(xdr_object):
     @classmethod
     def unpack(kls, unpacker):
         value = unpacker.unpack_enum()
-        return kls(value)
+        if unpacker.plain:
+            return value
+        try:
+            return kls._xdr_instances[value]
+        except KeyError:
+            raise XDRBadValue from None
 
 class xdr_bool(xdr_object):
+    __slots__ = ("value",)
+    _xdr_format = "i"
+
     def __init__(self, value):
         if type(value) is not bool:
             raise XDRBadValue
@@ -152,9 +1137,14 @@ class xdr_bool(xdr_object):
     @staticmethod
     def unpack(unpacker):
         value = unpacker.unpack_bool()
+        if unpacker.plain:
+            return value
         return xdr_bool(value)
 
 class xdr_hyper(xdr_object):
+    __slots__ = ("value",)
+    _xdr_format = "q"
+
     def __init__(self, value):
         if type(value) is not int:
             raise XDRBadValue
@@ -179,9 +1169,14 @@ class xdr_hyper(xdr_object):
     @staticmethod
     def unpack(unpacker):
         value = unpacker.unpack_hyper()
+        if unpacker.plain:
+            return value
         return xdr_hyper(value)
 
 class xdr_uhyper(xdr_object):
+    __slots__ = ("value",)
+    _xdr_format = "Q"
+
     def __init__(self, value):
         if type(value) is not int:
             raise XDRBadValue
@@ -206,9 +1201,14 @@ class xdr_uhyper(xdr_object):
     @staticmethod
     def unpack(unpacker):
         value = unpacker.unpack_uhyper()
+        if unpacker.plain:
+            return value
         return xdr_uhyper(value)
 
 class xdr_float(xdr_object):
+    __slots__ = ("value",)
+    _xdr_format = "f"
+
     def __init__(self, value):
         if type(value) is not float:
             raise XDRBadValue
@@ -226,9 +1226,14 @@ class xdr_float(xdr_object):
     @staticmethod
     def unpack(unpacker):
         value = unpacker.unpack_float()
+        if unpacker.plain:
+            return value
         return xdr_float(value)
 
 class xdr_double(xdr_object):
+    __slots__ = ("value",)
+    _xdr_format = "d"
+
     def __init__(self, value):
         if type(value) is not float:
             raise XDRBadValue
@@ -246,9 +1251,13 @@ class xdr_double(xdr_object):
     @staticmethod
     def unpack(unpacker):
         value = unpacker.unpack_double()
+        if unpacker.plain:
+            return value
         return xdr_double(value)
 
 class xdr_quad(xdr_object):
+    __slots__ = ("value",)
+
     def __init__(self, value):
         if type(value) is not float:
             raise XDRBadValue
@@ -274,18 +1283,21 @@ def xdr_opaque(max=None, size=None):
     if size:
         max = size
     class _xdr_opaque(xdr_object):
+        __slots__ = ("bytes",)
+
         def __init__(self, _bytes):
-            if not isinstance(_bytes, bytes):
-                print("not bytes")
-                raise XDRBadValue
+            if not isinstance(_bytes, (bytes, memoryview, file_data)):
+                raise XDRBadValue("not bytes: %r" % type(_bytes).__name__)
             if self.__class__.max:
                 if len(_bytes) > self.__class__.max:
-                    print("too long")
-                    raise XDRBadValue
+                    raise XDRBadValue("%d bytes, more than %d"
+                                      % (len(_bytes), self.__class__.max))
             self.bytes = _bytes
 
         def __str__(self):
-            return str(self.bytes)
+            if type(self.bytes) is file_data:
+                return repr(self.bytes)
+            return str(bytes(self.bytes))
 
         def pack(self, packer):
             if "size" in self.__class__.__dict__:
@@ -301,15 +1313,45 @@ def xdr_opaque(max=None, size=None):
                 bytes = unpacker.unpack_opaque()
             return kls(bytes)
 
+        @classmethod
+        def skip(kls, unpacker):
+            if "size" in kls.__dict__:
+                # no length word: the size and its padding.
+                unpacker.skip(kls.size)
+                return
+            n = unpacker.unpack_uint()
+            if kls.max and n > kls.max:
+                raise XDRBadValue
+            unpacker.skip(n)
+
+        @classmethod
+        def stream(kls, decoder):
+            if "size" in kls.__dict__:
+                return kls(bytes((yield kls.size)))
+            n = decoder.unpacker((yield 4)).unpack_uint()
+            if kls.max and n > kls.max:
+                raise XDRBadValue
+            data = yield _stream_opaque(n)
+            if type(data) is not bytearray:
+                # the file the decoder's sink wrote the data to.
+                self = object.__new__(kls)
+                self.bytes = data
+                return self
+            return kls(bytes(data))
+
     _xdr_opaque.max = max
+    _xdr_opaque._xdr_raw = "bytes"
     if size:
         _xdr_opaque.size = size
+        _xdr_opaque._xdr_format = "%ds%dx" % (size, -size % 4)
     return _xdr_opaque
 
 def xdr_string(max=None):
     if max == None:
         max = 2**32-1
     class _xdr_string(xdr_object):
+        __slots__ = ("bytes",)
+
         def __init__(self, _bytes):
             if type(_bytes) is str:
                 _bytes = _bytes.encode("utf8")
@@ -334,48 +1376,142 @@ def xdr_string(max=None):
             bytes = unpacker.unpack_string()
             return kls(bytes)
 
+        @classmethod
+        def skip(kls, unpacker):
+            n = unpacker.unpack_uint()
+            if kls.max and n > kls.max:
+                raise XDRBadValue
+            unpacker.skip(n)
+
+        @classmethod
+        def stream(kls, decoder):
+            n = decoder.unpacker((yield 4)).unpack_uint()
+            if kls.max and n > kls.max:
+                raise XDRBadValue
+            return kls(bytes((yield n)))
+
     _xdr_string.max = max
     return _xdr_string
 
 class xdr_struct(xdr_object):
+    # subclasses keep their members in __slots__.
+    _xdr_slot_members = True
+
+    # the (name, type) of each member, in order; set by _xdr_compile.
+    _xdr_fields = ()
+
     def __init__(self, **kwds):
-        members = self.members()
-        members_dict = dict(members)
-        for k, v in kwds.items():
-            if k not in members_dict:
-                print("k: %s" % k)
-                print("members: %s" % members_dict)
-                raise XDRBadValue
-            if not isinstance(v, members_dict[k]):
-                v = members_dict[k](v)
-            self.__dict__[k] = v
-        for k, v in members:
-            if k not in self.__dict__:
-                raise XDRBadValue
+        n = 0
+        for k, t in self._xdr_fields:
+            try:
+                v = kwds[k]
+            except KeyError:
+                if k == self._xdr_link:
+                    continue
+                raise XDRBadValue from None
+            if not isinstance(v, t):
+                v = t(v)
+            object.__setattr__(self, k, v)
+            n += 1
+        if n != len(kwds):
+            members = dict(self._xdr_fields)
+            raise XDRBadValue("%s has no member %s" % (
+                type(self).__name__,
+                ", ".join(k for k in kwds if k not in members)))
+
+    __getattr__ = _xdr_lazy_getattr
 
     def __str__(self):
-        return "\n".join( "%s: %s" % (k, str(self.__dict__[k]))
-                          for k, v in self.__class__.__dict__.items()
-                          if isinstance(v, type) )
+        # members not decoded yet stay that way.
+        def peek(k):
+            try:
+                return str(object.__getattribute__(self, k))
+            except AttributeError:
+                return "..."
+        return "\n".join( "%s: %s" % (k, peek(k))
+                          for k, v in self.members() )
 
     def members(self):
-        return [ (k, v)
-                 for k, v in self.__class__.__dict__.items()
-                 if isinstance(v, type) ]
-
-    def pack(self, packer):
-        for k in self.__class__.member_names:
-            if isinstance(self.__getattribute__(k), xdr_object):
-                self.__getattribute__(k).pack(packer)
+        return list(self._xdr_fields)
 
     @classmethod
-    def unpack(cls, unpacker):
-        d = {}
-        for k in cls.member_names:
-            if isinstance(cls.__dict__[k], type):
-                v = cls.__dict__[k].unpack(unpacker)
-                d[k] = v
-        return cls(**d)
+    def _xdr_compile(cls):
+        """
+        Generate the encoder and decoder specialized for this struct, and
+        if it is a linked list node, those for a node without its link.
+
+        Also generates trusted(), which makes an instance from its members
+        without checking or converting them, for values known to be good:
+        decoded values, or values made by server code.  Members that are
+        scalars may be plain values, as with Unpacker(plain=True).
+        """
+        members = _xdr_members(cls, getattr(cls, "_xdr_member_types", ()))
+        type.__setattr__(cls, "_xdr_fields", tuple(members))
+        variants = [ ("", members) ]
+        if cls._xdr_link in dict(members):
+            variants.append(("_node", [ (k, t) for k, t in members
+                                        if k != cls._xdr_link ]))
+        gen = _xdr_codegen()
+        names = [ "trusted" ]
+        gen.emit("def trusted(cls%s):"
+                 % "".join(", %s=None" % k if k == cls._xdr_link else ", " + k
+                           for k, t in members))
+        gen.emit("    self = _new(cls)")
+        for k, t in members:
+            if k == cls._xdr_link:
+                gen.emit("    if %s is not None:" % k)
+                gen.emit("        self.%s = %s" % (k, k))
+            else:
+                gen.emit("    self.%s = %s" % (k, k))
+        gen.emit("    return self")
+        for suffix, members in variants:
+            names += cls._xdr_codecs(gen, members, suffix)
+        fxns = dict(zip(names, gen.compile(cls, *names)))
+        for suffix, members in variants:
+            if not any(t.pack_stream is not xdr_object.pack_stream
+                       for k, t in members):
+                # nothing in it to yield between; packed in one go.
+                fxns["pack_stream" + suffix] = xdr_object.pack_stream
+        for name, fxn in fxns.items():
+            if not name.startswith("pack"):
+                fxn = classmethod(fxn)
+            if name.endswith("_node"):
+                name = "_" + name
+            type.__setattr__(cls, name, fxn)
+
+    @staticmethod
+    def _xdr_codecs(gen, members, suffix):
+        gen.emit("def pack%s(self, packer):" % suffix)
+        gen.pack_members(members)
+        gen.emit("def pack_stream%s(self, packer):" % suffix)
+        gen.pack_stream_members(members)
+        gen.emit("def unpack%s(cls, unpacker):" % suffix)
+        gen.emit("    if unpacker.lazy:")
+        gen.emit("        return unpack_lazy%s(cls, unpacker)" % suffix)
+        gen.emit("    if unpacker.plain:")
+        gen.emit("        return unpack_plain%s(cls, unpacker)" % suffix)
+        gen.emit("    self = _new(cls)")
+        gen.unpack_members(members)
+        gen.emit("    return self")
+        gen.emit("def unpack_plain%s(cls, unpacker):" % suffix)
+        gen.emit("    self = _new(cls)")
+        gen.unpack_members(members, plain=True)
+        gen.emit("    return self")
+        gen.emit("def unpack_lazy%s(cls, unpacker):" % suffix)
+        gen.emit("    self = _new(cls)")
+        gen.lazy_members(members)
+        gen.emit("    return self")
+        gen.emit("def skip%s(cls, unpacker):" % suffix)
+        gen.skip_members(members)
+        gen.emit("def stream%s(cls, decoder):" % suffix)
+        gen.emit("    self = _new(cls)")
+        gen.stream_members(members)
+        gen.emit("    return self")
+        if not members:
+            gen.emit("    yield")
+        return [ name + suffix
+                 for name in ("pack", "pack_stream", "unpack", "skip",
+                              "stream") ]
 
 
 
@@ -383,27 +1519,71 @@ def xdr_union(**kwd):
     if len(kwd) != 1:
         raise XDRBadValue
     key, value = list(kwd.items())[0]
+    # A discriminant that is a plain int has no named values: the class
+    # body gives its arms with case(value, ...).attr = type.  The arm for
+    # any other value, or for an enum value whose arm has no members, is
+    # given with default.attr = type and _xdr_default = "default".
+    # The (name, value) of each case:
+    numeric = not hasattr(value, "values")
+    numbered = []
+    def cases():
+        if numeric:
+            return numbered + [ ("default", None) ]
+        named = value.values()
+        if any(k == "default" for k, v in named):
+            return named
+        return named + [ ("default", None) ]
     class _xdr_case(xdr_object):
+        __slots__ = ("__dict__",)
+
         def __init__(self):
             xdr_object.__setattr__(self, "member_names", [])
+            xdr_object.__setattr__(self, "owners", [])
         def __setattr__(self, key, value):
             if key not in self.member_names:
                 self.member_names.append(key)
             xdr_object.__setattr__(self, key, value)
+            # arms may be filled in after the union type exists, e.g.
+            # accepted_reply.reply_data.PROG_MISMATCH.
+            for owner in self.owners:
+                owner._xdr_compile()
     class _xdr_union_type(_xdr_type):
         @classmethod
         def __prepare__(metacls, name, bases):
             d = {}
             d[key] = value
-            for k, v in value.values():
-                d[k] = _xdr_case()
+            if numeric:
+                del numbered[:]
+                def case(*values):
+                    arm = _xdr_case()
+                    for v in values:
+                        numbered.append(("case_%d" % v, v))
+                        d["case_%d" % v] = arm
+                    return arm
+                d["case"] = case
+            for k, v in cases():
+                d.setdefault(k, _xdr_case())
             return d
 
         def __new__(cls, name, bases, classdict):
-            result = type.__new__(cls, name, bases, classdict)
+            ns = dict(classdict)
+            ns.pop("case", None)
+            members = { key: ns.pop(key) }
+            names = [ key ]
+            for k, v in cases():
+                names.extend(ns[k].member_names)
+            result = _xdr_slotted(cls, name, bases, ns, members, names)
+            for k, v in cases():
+                result.__dict__[k].owners.append(result)
+            result._xdr_compile()
             return result
 
     class _xdr_union(xdr_object, metaclass=_xdr_union_type):
+        # the arm a discriminant with no arm of its own is decoded as.
+        _xdr_default = None
+
+        __getattr__ = _xdr_lazy_getattr
+
         def __init__(self, **kwds):
             if key not in kwds:
                 raise XDRBadValue
@@ -413,50 +1593,301 @@ def xdr_union(**kwd):
             else:
                 raw_value = kwds[key]
                 xdr_value = value(raw_value)
-            self.__setattr__(key, xdr_value)
-            self.member_names = []
-            self.member_names.append(key)
-            for k, v in value.values():
-                if raw_value == v:
-                    branch = k
-                    break
+            object.__setattr__(self, key, xdr_value)
+            arms = self._xdr_arms
+            try:
+                branch, members = arms[raw_value]
+            except (KeyError, TypeError):
+                if raw_value is None or None not in arms:
+                    raise XDRBadValue from None
+                # the default arm, for a value with no arm of its own.
+                branch, members = arms[None]
+            for m, t in members:
+                try:
+                    v = kwds[m]
+                except KeyError:
+                    raise XDRBadValue from None
+                if not isinstance(v, t):
+                    v = t(v)
+                object.__setattr__(self, m, v)
+
+        @classmethod
+        def _xdr_compile(cls):
+            """
+            Generate the encoder and decoder specialized for this union.
+            Each arm gets its own pack/unpack function, looked up by the raw
+            discriminant; arms with identical members share one.  A
+            discriminant with no arm is decoded as the arm named by the
+            class's _xdr_default, if it has one, and is an XDRBadValue
+            otherwise.
+            """
+            gen = _xdr_codegen()
+            disc = gen.name("D", value)
+            arms = {}
+            generated = {}
+            streams = False
+            # the arm's name and members for each discriminant, for __init__.
+            branches = {}
+            # of enum names with the same value, the one given an arm.
+            ordered = sorted(cases(),
+                             key=lambda c: not cls.__dict__[c[0]].member_names)
+            fallback = None
+            if cls._xdr_default == "default":
+                fallback = cls.__dict__["default"]
+            for k, v in ordered:
+                if v is None and fallback is None:
+                    continue
+                case = cls.__dict__[k]
+                # an enum value with no members of its own takes the
+                # default arm; a case() of an int discriminant is listed
+                # explicitly, and keeps its own (void) arm.
+                if (fallback is not None and not case.member_names and
+                    not (numeric and v is not None)):
+                    case = fallback
+                for m in case.member_names:
+                    _xdr_slot(cls, m)
+                members = _xdr_members(case, case.member_names)
+                branches.setdefault(v, (k, tuple(members)))
+                streams = streams or any(
+                    t.pack_stream is not xdr_object.pack_stream
+                    for m, t in members)
+                signature = tuple(members)
+                if signature not in generated:
+                    n = len(generated)
+                    gen.emit("def pack_arm%d(self, packer):" % n)
+                    gen.pack_members([ (key, value) ] + members)
+                    gen.emit("def pack_stream_arm%d(self, packer):" % n)
+                    gen.pack_stream_members([ (key, value) ] + members)
+                    gen.emit("def unpack_arm%d(self, unpacker):" % n)
+                    gen.unpack_members(members)
+                    gen.emit("    pass")
+                    gen.emit("def unpack_plain_arm%d(self, unpacker):" % n)
+                    gen.unpack_members(members, plain=True)
+                    gen.emit("    pass")
+                    gen.emit("def unpack_lazy_arm%d(self, unpacker):" % n)
+                    gen.lazy_members([ (key, value) ] + members)
+                    gen.emit("def skip_arm%d(unpacker):" % n)
+                    gen.skip_members(members)
+                    gen.emit("def stream_arm%d(self, decoder):" % n)
+                    gen.stream_members(members)
+                    gen.emit("    return")
+                    gen.emit("    yield")
+                    generated[signature] = n
+                arms.setdefault(v, generated[signature])
+            raw = "_d != 0" if issubclass(value, xdr_bool) else "_d"
+            read = "unpack_uint" if issubclass(value, xdr_uint) else "unpack_int"
+            # an _xdr_default naming an enum value decodes an unknown value
+            # as that one, as the enum has no other; "default" keeps it.
+            default = None
+            if cls._xdr_default not in (None, "default"):
+                default = dict(cases())[cls._xdr_default]
+            def lookup(table, indent="    "):
+                gen.emit("%sarm = %s.get(_d)" % (indent, table))
+                gen.emit("%sif arm is None:" % indent)
+                if None in arms:
+                    gen.emit("%s    arm = %s[None]" % (indent, table))
+                elif default is None:
+                    gen.emit("%s    raise XDRBadValue" % indent)
+                else:
+                    gen.emit("%s    _d = %d" % (indent, default))
+                    gen.emit("%s    arm = %s[_d]" % (indent, table))
+            gen.emit("def pack(self, packer):")
+            gen.emit("    try:")
+            gen.emit("        _d = self.%s.value" % key)
+            gen.emit("    except AttributeError:")
+            gen.emit("        _d = self.%s" % key)
+            lookup("_PACK")
+            gen.emit("    arm(self, packer)")
+            gen.emit("def pack_stream(self, packer):")
+            gen.emit("    try:")
+            gen.emit("        _d = self.%s.value" % key)
+            gen.emit("    except AttributeError:")
+            gen.emit("        _d = self.%s" % key)
+            lookup("_PACK_STREAM")
+            gen.emit("    yield from arm(self, packer)")
+            gen.emit("def unpack(cls, unpacker):")
+            gen.emit("    _d = unpacker.%s()" % read)
+            gen.emit("    if unpacker.lazy:")
+            if default is None:
+                lookup("_UNPACK_LAZY", "        ")
             else:
+                gen.emit("        arm = _UNPACK_LAZY.get(_d)")
+                gen.emit("        if arm is None:")
+                gen.emit("            unpacker.set_position(unpacker.get_position() - 4)")
+                gen.emit("            self = _new(cls)")
+                gen.emit("            _UNPACK_LAZY[%d](self, unpacker)" % default)
+                gen.emit("            self.%s = %s(%d)" % (key, disc, default))
+                gen.emit("            return self")
+            gen.emit("        # the discriminant is decoded lazily as well.")
+            gen.emit("        unpacker.set_position(unpacker.get_position() - 4)")
+            gen.emit("        self = _new(cls)")
+            gen.emit("        arm(self, unpacker)")
+            gen.emit("        return self")
+            gen.emit("    if unpacker.plain:")
+            lookup("_UNPACK_PLAIN", "        ")
+            gen.emit("        self = _new(cls)")
+            gen.emit("        self.%s = %s" % (key, raw))
+            gen.emit("        arm(self, unpacker)")
+            gen.emit("        return self")
+            lookup("_UNPACK")
+            gen.emit("    self = _new(cls)")
+            gen.emit("    self.%s = %s(%s)" % (key, disc, raw))
+            gen.emit("    arm(self, unpacker)")
+            gen.emit("    return self")
+            gen.emit("def skip(cls, unpacker):")
+            gen.emit("    _d = unpacker.%s()" % read)
+            lookup("_SKIP")
+            gen.emit("    arm(unpacker)")
+            gen.emit("def stream(cls, decoder):")
+            gen.emit("    _d = decoder.unpacker((yield 4)).%s()" % read)
+            lookup("_STREAM")
+            gen.emit("    self = _new(cls)")
+            gen.emit("    if decoder.plain:")
+            gen.emit("        self.%s = %s" % (key, raw))
+            gen.emit("    else:")
+            gen.emit("        self.%s = %s(%s)" % (key, disc, raw))
+            gen.emit("    yield from arm(self, decoder)")
+            gen.emit("    return self")
+            pack, pack_stream, unpack, skip, stream = gen.compile(
+                cls, "pack", "pack_stream", "unpack", "skip", "stream")
+            if not streams:
+                pack_stream = xdr_object.pack_stream
+            for table, prefix in (("_PACK", "pack_arm"),
+                                  ("_PACK_STREAM", "pack_stream_arm"),
+                                  ("_UNPACK", "unpack_arm"),
+                                  ("_UNPACK_PLAIN", "unpack_plain_arm"),
+                                  ("_UNPACK_LAZY", "unpack_lazy_arm"),
+                                  ("_SKIP", "skip_arm"),
+                                  ("_STREAM", "stream_arm")):
+                gen.namespace[table] = { v: gen.namespace["%s%d" % (prefix, n)]
+                                         for v, n in arms.items() }
+            type.__setattr__(cls, "_xdr_arms", branches)
+            type.__setattr__(cls, "pack", pack)
+            type.__setattr__(cls, "pack_stream", pack_stream)
+            type.__setattr__(cls, "unpack", classmethod(unpack))
+            type.__setattr__(cls, "skip", classmethod(skip))
+            type.__setattr__(cls, "stream", classmethod(stream))
+
+    return _xdr_union
+
+
+def _array_typecode(fmt):
+    """
+    The array.array typecode with the size and signedness of the struct
+    format character fmt in standard (XDR) sizes.
+    """
+    for code in { "i": "il", "I": "IL", "q": "lq", "Q": "LQ",
+                  "f": "f", "d": "d" }[fmt]:
+        if _array.array(code).itemsize == _struct.calcsize(">" + fmt):
+            return code
+
+
+def _xdr_numeric_array(element_type, max, size):
+    """
+    An xdr_array of a numeric type, held in an array.array of plain values
+    which it is a subclass of: it supports the buffer protocol, indexes to
+    ints or floats, and is encoded and decoded as one block of memory
+    (byte-swapped on little-endian hosts).
+    """
+    typecode = _array_typecode(element_type._xdr_format)
+    itemsize = _struct.calcsize(">" + element_type._xdr_format)
+    swap = _sys.byteorder == "little"
+    counted = "I" if size is None else ""
+    structs = {}
+
+    class _xdr_array(xdr_object, _array.array):
+        def __new__(cls, elements=()):
+            try:
+                self = _array.array.__new__(cls, typecode, elements)
+            except TypeError:
+                # xdr scalar objects rather than plain values.
+                self = _array.array.__new__(
+                    cls, typecode,
+                    [ getattr(e, "value", e) for e in elements ])
+            except OverflowError:
                 raise XDRBadValue
-            implied = self.__class__.__dict__[branch]
-            for m in implied.member_names:
-                if m not in kwds:
-                    raise XDRBadValue
-                v = kwds[m]
-                if not isinstance(v, implied.__getattribute__(m)):
-                    v = implied.__getattribute__(m)(v)
-                self.__setattr__(m, v)
-                self.member_names.append(m)
+            if size is not None and len(self) != size:
+                raise XDRBadValue
+            if len(self) > max:
+                raise XDRBadValue
+            return self
+
+        def __init__(self, elements=()):
+            pass
+
+        @property
+        def elements(self):
+            return self
+
+        def __str__(self):
+            return ", ".join(str(e) for e in self)
 
         def pack(self, packer):
-            for name in self.member_names:
-                v = self.__getattribute__(name)
-                v.pack(packer)
+            n = len(self)
+            if n <= 64:
+                # Short arrays (bitmaps, gids) in one struct call, with
+                # their count.
+                try:
+                    s = structs[n]
+                except KeyError:
+                    s = structs[n] = _struct.Struct(
+                        ">" + counted + "%d%s" % (n, element_type._xdr_format))
+                if size is None:
+                    packer.pack_struct(s, n, *self)
+                else:
+                    packer.pack_struct(s, *self)
+                return
+            if size is None:
+                packer.pack_uint(n)
+            data = self
+            if swap:
+                data = _array.array(typecode, self)
+                data.byteswap()
+            packer.pack_fopaque(n * self.itemsize, data)
 
         @classmethod
         def unpack(cls, unpacker):
-            branch_value = value.unpack(unpacker)
-            for k, v in value.values():
-                if v == branch_value.value:
-                    branch = k
-                    break
+            if size is None:
+                n = unpacker.unpack_uint()
+                if n > max:
+                    raise XDRBadValue
             else:
-                raise XDRBadValue
-            d = {}
-            d[key] = branch_value
-            case = cls.__dict__[branch]
-            if not case:
-                raise XDRBadValue
-            for k in case.member_names:
-                v = case.__getattribute__(k).unpack(unpacker)
-                d[k] = v
-            return cls(**d)
+                n = size
+            self = _array.array.__new__(cls, typecode)
+            self.frombytes(unpacker.unpack_fstring(n * self.itemsize))
+            if swap:
+                self.byteswap()
+            return self
 
-    return _xdr_union
+        @classmethod
+        def skip(cls, unpacker):
+            if size is None:
+                n = unpacker.unpack_uint()
+                if n > max:
+                    raise XDRBadValue
+            else:
+                n = size
+            unpacker.skip(n * itemsize)
+
+        @classmethod
+        def stream(cls, decoder):
+            if size is None:
+                n = decoder.unpacker((yield 4)).unpack_uint()
+                if n > max:
+                    raise XDRBadValue
+            else:
+                n = size
+            self = _array.array.__new__(cls, typecode)
+            self.frombytes((yield n * itemsize))
+            if swap:
+                self.byteswap()
+            return self
+
+    _xdr_array.element_type = element_type
+    _xdr_array.max = max
+    if size is not None:
+        _xdr_array.size = size
+    return _xdr_array
 
 
 def xdr_array(element_type, max=None, size=None):
@@ -464,12 +1895,19 @@ def xdr_array(element_type, max=None, size=None):
         max = 2**32-1
     if size:
         max = size
+    if (isinstance(element_type, type) and
+        issubclass(element_type, (xdr_int, xdr_uint, xdr_hyper, xdr_uhyper,
+                                  xdr_float, xdr_double))):
+        return _xdr_numeric_array(element_type, max, size)
     class _xdr_array(xdr_object):
+        __slots__ = ("elements",)
+
         def __init__(self, elements):
             if size is not None:
                 if len(elements) != size:
                     raise XDRBadValue
-            print("memory type: %s" % element_type)
+            elif len(elements) > max:
+                raise XDRBadValue
             self.elements = [ e if isinstance(e, element_type)
                               else element_type(e)
                               for e in elements ]
@@ -489,19 +1927,142 @@ def xdr_array(element_type, max=None, size=None):
         def pack(self, packer):
             if size is None:
                 packer.pack_uint(len(self.elements))
+            if item is None:
+                for e in self.elements:
+                    e.pack(packer)
+                return
+            # scalars decoded with Unpacker(plain=True) are plain values.
             for e in self.elements:
-                e.pack(packer)
+                try:
+                    packer.pack_struct(item, e.value)
+                except AttributeError:
+                    packer.pack_struct(item, e)
+
+        def pack_stream(self, packer):
+            if item is not None:
+                self.pack(packer)
+                return
+            if size is None:
+                packer.pack_uint(len(self.elements))
+            if getattr(element_type, "pack_stream", None) is xdr_object.pack_stream:
+                for e in self.elements:
+                    e.pack(packer)
+                    yield
+                return
+            for e in self.elements:
+                yield from e.pack_stream(packer)
+                yield
 
         @classmethod
         def unpack(cls, unpacker):
             if size is None:
                 sz = unpacker.unpack_uint()
+                if sz > max:
+                    raise XDRBadValue
+            else:
+                sz = size
+            self = object.__new__(cls)
+            self.elements = [ element_type.unpack(unpacker)
+                              for i in range(sz) ]
+            return self
+
+        @classmethod
+        def unpack_lazy_elements(cls, unpacker):
+            """
+            An array whose elements are decoded in order as they are
+            first looked at; the unpacker is left at its first element.
+            """
+            if size is None:
+                sz = unpacker.unpack_uint()
+                if sz > max:
+                    raise XDRBadValue
+            else:
+                sz = size
+            self = object.__new__(_xdr_lazy_array)
+            self._unpacker = unpacker
+            self._position = unpacker.get_position()
+            self._count = sz
+            self._decoded = []
+            return self
+
+        @classmethod
+        def skip(cls, unpacker):
+            if size is None:
+                sz = unpacker.unpack_uint()
+                if sz > max:
+                    raise XDRBadValue
+            else:
+                sz = size
+            if item is not None:
+                unpacker.skip(sz * item.size)
+                return
+            for i in range(sz):
+                element_type.skip(unpacker)
+
+        @classmethod
+        def stream(cls, decoder):
+            if size is None:
+                sz = decoder.unpacker((yield 4)).unpack_uint()
+                if sz > max:
+                    raise XDRBadValue
             else:
                 sz = size
-            elems = [ element_type.unpack(unpacker)
-                      for i in range(sz) ]
-            return cls(elems)
+            self = object.__new__(cls)
+            if item is not None:
+                unpacker = decoder.unpacker((yield sz * item.size))
+                self.elements = [ element_type.unpack(unpacker)
+                                  for i in range(sz) ]
+                return self
+            self.elements = []
+            for i in range(sz):
+                self.elements.append((yield from element_type.stream(decoder)))
+            return self
+
+    class _xdr_lazy_array(_xdr_array):
+        __slots__ = ("_unpacker", "_position", "_count", "_decoded")
+
+        def _decode(self, n):
+            # decoded eagerly, from where the last element ended.
+            unpacker = self._unpacker
+            position = unpacker.get_position()
+            lazy = unpacker.lazy
+            unpacker.set_position(self._position)
+            unpacker.lazy = False
+            try:
+                while len(self._decoded) < n:
+                    self._decoded.append(element_type.unpack(unpacker))
+                self._position = unpacker.get_position()
+            finally:
+                unpacker.lazy = lazy
+                unpacker.set_position(position)
+
+        @property
+        def elements(self):
+            if len(self._decoded) < self._count:
+                self._decode(self._count)
+            return self._decoded
 
+        def __len__(self):
+            return self._count
+
+        def __getitem__(self, n):
+            if isinstance(n, slice) or n < 0 or n >= self._count:
+                return self.elements[n]
+            if n >= len(self._decoded):
+                self._decode(n + 1)
+            return self._decoded[n]
+
+        def __iter__(self):
+            for n in range(self._count):
+                yield self[n]
+
+    item = None
+    if (getattr(element_type, "_xdr_format", None) is not None and
+        element_type._xdr_raw == "value"):
+        item = _struct.Struct(">" + element_type._xdr_format)
+    if item is not None:
+        # arrays of scalars are decoded in one go anyway.
+        del _xdr_array.unpack_lazy_elements
     _xdr_array.element_type = element_type
     _xdr_array.max = max
     if size is not None:
@@ -510,7 +2071,83 @@ def xdr_array(element_type, max=None, size=None):
     return _xdr_array
 
 
+def _xdr_linked_list(node_type, link):
+    """
+    The type of a struct's optional link to another of itself, like
+    entry4.nextentry, and of any optional of that struct made after it:
+    the whole chain is a list of nodes, encoded and decoded in a loop
+    rather than a Python frame per node.  Nodes in a list do not link to
+    one another; the link of each is an empty list.  A node given with a
+    non-empty link brings the rest of its chain into the list after it.
+    """
+    class _xdr_list(xdr_object, list):
+        def __init__(self, elements=()):
+            list.__init__(self)
+            for e in elements:
+                if not isinstance(e, node_type):
+                    raise XDRBadValue
+                self.append(e)
+                rest = getattr(e, link)
+                if rest:
+                    self.extend(rest)
+
+        @property
+        def elements(self):
+            return self
+
+        def __str__(self):
+            return ", ".join(str(e) for e in self)
+
+        def pack(self, packer):
+            pack_node = node_type._pack_node
+            for e in self:
+                packer.pack_uint(1)
+                pack_node(e, packer)
+            packer.pack_uint(0)
+
+        def pack_stream(self, packer):
+            pack_node = node_type._pack_node
+            pack_stream_node = node_type._pack_stream_node
+            for e in self:
+                packer.pack_uint(1)
+                if pack_stream_node is xdr_object.pack_stream:
+                    pack_node(e, packer)
+                else:
+                    yield from pack_stream_node(e, packer)
+                yield
+            packer.pack_uint(0)
+
+        @classmethod
+        def unpack(cls, unpacker):
+            self = list.__new__(cls)
+            unpack_node = node_type._unpack_node
+            while unpacker.unpack_uint():
+                self.append(unpack_node(unpacker))
+            return self
+
+        @classmethod
+        def skip(cls, unpacker):
+            skip_node = node_type._skip_node
+            while unpacker.unpack_uint():
+                skip_node(unpacker)
+
+        @classmethod
+        def stream(cls, decoder):
+            self = list.__new__(cls)
+            stream_node = node_type._stream_node
+            while decoder.unpacker((yield 4)).unpack_uint():
+                self.append((yield from stream_node(decoder)))
+            return self
+
+    _xdr_list.node_type = node_type
+    type.__setattr__(node_type, "_xdr_link", link)
+    type.__setattr__(node_type, "_xdr_list", _xdr_list)
+    return _xdr_list
+
+
 def xdr_optional(element_type):
+    if getattr(element_type, "_xdr_list", None) is not None:
+        return element_type._xdr_list
     return xdr_array(element_type, max=1)
 
 
@@ -518,6 +2155,6 @@ if __name__ == "__main__":
 
     bananas = xdr_array(xdr_uint)
     apples = bananas(1, 2, 3, 4)
-    packer = _xdr.Packer()
+    packer = Packer()
     apples.pack(packer)
     print(packer.get_buffer())
@@ -0,0 +1,845 @@
+"""
+A compiler from the XDR language (RFC 4506) and the RPC language
+(RFC 5531), as in rpcgen's .x files, to Python modules built on xdr.py
+and rpc.py.
+
+Generate a module with:
+    python xdrgen.py nfs4_prot.x -o nfs.py
+
+Each definition becomes what a hand-written module would have: a const
+a module constant, a typedef an alias, an enum an xdr_enum, structs and
+unions xdr_struct and xdr_union classes (whose encoders and decoders xdr.py
+generates when they are defined), and a program an rpc_program with a
+stub for each procedure.  Comments in the .x file are kept, and lines
+starting with % are copied to the module as they are.
+"""
+
+import keyword as _keyword
+import re as _re
+import textwrap as _textwrap
+
+
+class xdrgen_error(Exception):
+    pass
+
+
+_TOKENS = _re.compile(r"""
+    (?P<space>[ \t\r\f\v]+)
+  | (?P<newline>\n)
+  | (?P<comment>/\*.*?\*/|//[^\n]*)
+  | (?P<passthrough>^%[^\n]*)
+  | (?P<preprocessor>^\#[^\n]*)
+  | (?P<number>-?(?:0[xX][0-9a-fA-F]+|[0-9]+))
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<punct>[{}()\[\]<>;:,=*])
+""", _re.X | _re.S | _re.M)
+
+
+class _token(object):
+    __slots__ = ("kind", "text", "line", "leading", "trailing")
+
+    def __init__(self, kind, text, line):
+        self.kind = kind
+        self.text = text
+        self.line = line
+        # comments on lines of their own before this token, and those
+        # after it on the same line.
+        self.leading = []
+        self.trailing = []
+
+
+def _comment_lines(text):
+    """
+    The lines of a comment's text, without its delimiters or the
+    leading * of each line of a block comment.
+    """
+    if text.startswith("//"):
+        return [ text[2:].strip() ]
+    lines = [ _re.sub(r"^\s*\*( |$)", "", l).rstrip()
+              for l in text[2:-2].split("\n") ]
+    lines = [ l.strip() if len(lines) == 1 else l for l in lines ]
+    while lines and not lines[0].strip():
+        del lines[0]
+    while lines and not lines[-1].strip():
+        del lines[-1]
+    indent = min((len(l) - len(l.lstrip()) for l in lines if l.strip()),
+                 default=0)
+    return [ l[indent:] for l in lines ]
+
+
+def _attach(token, comments):
+    """
+    Give token the lines of the comments before it, with None between
+    those a blank line separates.
+    """
+    end = None
+    for c, next_line in comments:
+        if end is not None and c.line > end:
+            token.leading.append(None)
+        token.leading.extend(_comment_lines(c.text))
+        end = next_line
+    return token
+
+
+def _tokenize(text):
+    """
+    The tokens of text, each with the comments that go with it, and the
+    lines of the comment opening the file if a blank line separates it
+    from what follows.
+    """
+    tokens = []
+    comments = []
+    header = None
+    line = 1
+    pos = 0
+    while pos < len(text):
+        m = _TOKENS.match(text, pos)
+        if m is None:
+            raise xdrgen_error("line %d: unexpected %r" % (line, text[pos]))
+        kind = m.lastgroup
+        value = m.group()
+        t = _token(kind, value, line)
+        line += value.count("\n")
+        pos = m.end()
+        if kind == "comment":
+            if tokens and tokens[-1].line == t.line:
+                # on the same line as the token before it: it trails that.
+                tokens[-1].trailing.extend(_comment_lines(value))
+            else:
+                comments.append((t, line))
+        elif kind in ("passthrough", "number", "ident", "punct"):
+            if (not tokens and header is None and comments and
+                (len(comments) == 1 or comments[1][0].line > comments[0][1] + 1)
+                and (len(comments) > 1 or t.line > comments[0][1] + 1)):
+                header = _comment_lines(comments.pop(0)[0].text)
+            _attach(t, comments)
+            comments = []
+            tokens.append(t)
+    t = _token("end", "", line)
+    _attach(t, comments)
+    tokens.append(t)
+    return tokens, header or []
+
+
+class _node(object):
+    """
+    A parsed definition, member, case or procedure: kind, with the
+    comments that came with it and whatever else its kind needs.
+    """
+    def __init__(self, kind, line, **kwds):
+        self.kind = kind
+        self.line = line
+        self.leading = []
+        self.trailing = []
+        self.__dict__.update(kwds)
+
+
+_BASE_TYPES = {
+    "int": "xdr_int",
+    "unsigned int": "xdr_uint",
+    "hyper": "xdr_hyper",
+    "unsigned hyper": "xdr_uhyper",
+    "float": "xdr_float",
+    "double": "xdr_double",
+    "quadruple": "xdr_quad",
+    "bool": "xdr_bool",
+    "void": "xdr_void",
+}
+
+
+class _parser(object):
+    def __init__(self, text):
+        self.tokens, self.header = _tokenize(text)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        return self.tokens[self.pos + offset]
+
+    def next(self):
+        t = self.tokens[self.pos]
+        self.pos += 1
+        return t
+
+    def error(self, message, token=None):
+        token = token or self.peek()
+        return xdrgen_error("line %d: %s" % (token.line, message))
+
+    def expect(self, text):
+        t = self.next()
+        if t.text != text:
+            raise self.error("expected %r, found %r" % (text, t.text), t)
+        return t
+
+    def accept(self, text):
+        if self.peek().text == text:
+            return self.next()
+        return None
+
+    def ident(self):
+        t = self.next()
+        if t.kind != "ident":
+            raise self.error("expected a name, found %r" % t.text, t)
+        return t.text
+
+    def value(self):
+        t = self.next()
+        if t.kind not in ("ident", "number"):
+            raise self.error("expected a value, found %r" % t.text, t)
+        return t.text
+
+    def comments(self, node, first):
+        """
+        Give node the comments of the tokens it was parsed from, which
+        start at index first, that no node inside it has taken.
+        """
+        for t in self.tokens[first:self.pos]:
+            # those of a member or arm went to it when it was parsed.
+            node.leading.extend(t.leading)
+            node.trailing.extend(t.trailing)
+            t.leading = []
+            t.trailing = []
+        return node
+
+    def specification(self):
+        definitions = []
+        while self.peek().kind != "end":
+            first = self.pos
+            definitions.append(self.comments(self.definition(), first))
+        # comments after the last definition.
+        tail = _node("comment", self.peek().line)
+        tail.leading = self.peek().leading
+        definitions.append(tail)
+        return definitions
+
+    def definition(self):
+        t = self.peek()
+        if t.kind == "passthrough":
+            self.next()
+            return _node("passthrough", t.line, text=t.text[1:])
+        keyword = self.next().text
+        if keyword == "const":
+            name = self.ident()
+            self.expect("=")
+            value = self.value()
+            self.expect(";")
+            return _node("const", t.line, name=name, value=value)
+        if keyword == "typedef":
+            decl = self.declaration()
+            self.expect(";")
+            return _node("typedef", t.line, name=decl.name, decl=decl)
+        if keyword == "enum":
+            name = self.ident()
+            members = self.enum_body()
+            self.expect(";")
+            return _node("enum", t.line, name=name, members=members)
+        if keyword == "struct":
+            name = self.ident()
+            members = self.struct_body()
+            self.expect(";")
+            return _node("struct", t.line, name=name, members=members)
+        if keyword == "union":
+            name = self.ident()
+            node = self.union_body()
+            self.expect(";")
+            node.name = name
+            return node
+        if keyword == "program":
+            return self.program()
+        raise self.error("unexpected %r" % keyword, t)
+
+    def enum_body(self):
+        self.expect("{")
+        members = []
+        while True:
+            first = self.pos
+            t = self.peek()
+            name = self.ident()
+            self.expect("=")
+            value = self.value()
+            last = self.accept(",") is None
+            members.append(self.comments(_node("value", t.line, name=name,
+                                               value=value), first))
+            if last:
+                break
+        self.expect("}")
+        return members
+
+    def struct_body(self):
+        self.expect("{")
+        members = []
+        while not self.accept("}"):
+            first = self.pos
+            decl = self.declaration()
+            self.expect(";")
+            members.append(self.comments(decl, first))
+        return members
+
+    def union_body(self):
+        t = self.expect("switch")
+        self.expect("(")
+        discriminant = self.declaration()
+        self.expect(")")
+        self.expect("{")
+        arms = []
+        default = None
+        while not self.accept("}"):
+            first = self.pos
+            labels = []
+            while self.accept("case"):
+                labels.append(self.value())
+                self.expect(":")
+            if not labels:
+                self.expect("default")
+                self.expect(":")
+            decl = self.declaration()
+            self.expect(";")
+            arm = self.comments(_node("arm", decl.line, labels=labels,
+                                      decl=decl), first)
+            if labels:
+                arms.append(arm)
+            else:
+                default = arm
+        return _node("union", t.line, discriminant=discriminant, arms=arms,
+                     default=default)
+
+    def type_specifier(self):
+        t = self.next()
+        text = t.text
+        if text == "unsigned":
+            if self.peek().text in ("int", "hyper", "long", "short", "char"):
+                text = "unsigned " + self.next().text
+            else:
+                text = "unsigned int"
+        # rpcgen's C types.
+        text = { "long": "int", "short": "int", "char": "int",
+                 "unsigned long": "unsigned int",
+                 "unsigned short": "unsigned int",
+                 "unsigned char": "unsigned int" }.get(text, text)
+        if text in _BASE_TYPES or text in ("opaque", "string"):
+            return text
+        if text in ("struct", "union", "enum"):
+            if self.peek().text == "{":
+                raise self.error("anonymous %s types are not supported" % text)
+            return self.ident()
+        if t.kind != "ident":
+            raise self.error("expected a type, found %r" % text, t)
+        return text
+
+    def declaration(self):
+        t = self.peek()
+        base = self.type_specifier()
+        if base == "void":
+            return _node("decl", t.line, name=None, base="void", shape="plain",
+                         bound=None)
+        if self.accept("*"):
+            return _node("decl", t.line, name=self.ident(), base=base,
+                         shape="optional", bound=None)
+        name = self.ident()
+        shape, bound = "plain", None
+        if self.accept("["):
+            shape, bound = "fixed", self.value()
+            self.expect("]")
+        elif self.accept("<"):
+            shape = "variable"
+            if not self.accept(">"):
+                bound = self.value()
+                self.expect(">")
+        if base in ("opaque", "string") and shape == "plain":
+            raise self.error("%s %s needs a size" % (base, name), t)
+        if base == "string" and shape == "fixed":
+            raise self.error("string %s cannot have a fixed size" % name, t)
+        return _node("decl", t.line, name=name, base=base, shape=shape,
+                     bound=bound)
+
+    def program(self):
+        t = self.tokens[self.pos - 1]
+        name = self.ident()
+        self.expect("{")
+        versions = []
+        while not self.accept("}"):
+            first = self.pos
+            v = self.expect("version")
+            vname = self.ident()
+            self.expect("{")
+            procedures = []
+            while not self.accept("}"):
+                pfirst = self.pos
+                p = self.peek()
+                ret = self.proc_type()
+                pname = self.ident()
+                self.expect("(")
+                args = [ self.proc_type() ]
+                while self.accept(","):
+                    args.append(self.proc_type())
+                self.expect(")")
+                self.expect("=")
+                number = self.value()
+                self.expect(";")
+                if len(args) > 1:
+                    raise self.error("%s: procedures take one argument" % pname, p)
+                procedures.append(self.comments(
+                    _node("procedure", p.line, name=pname, ret=ret,
+                          arg=args[0], number=number), pfirst))
+            self.expect("=")
+            number = self.value()
+            self.expect(";")
+            versions.append(self.comments(
+                _node("version", v.line, name=vname, procedures=procedures,
+                      number=number), first))
+        self.expect("=")
+        number = self.value()
+        self.expect(";")
+        return _node("program", t.line, name=name, versions=versions,
+                     number=number)
+
+    def proc_type(self):
+        t = self.peek()
+        base = self.type_specifier()
+        if base == "opaque":
+            raise self.error("opaque needs a size", t)
+        # string alone is string<>; a bare type name stands for itself.
+        return _node("decl", t.line, name=None, base=base,
+                     shape="variable" if base == "string" else "plain",
+                     bound=None)
+
+
+def _python_name(name):
+    if _keyword.iskeyword(name):
+        return name + "_"
+    return name
+
+
+class _generator(object):
+    def __init__(self, definitions):
+        self.definitions = definitions
+        self.lines = []
+        self.imports = set()
+        # module constants, and the values of enum members and procedures,
+        # which are not module names.
+        self.consts = {}
+        self.values = { "FALSE": "0", "TRUE": "1" }
+        # names defined so far, and the definitions of types.
+        self.defined = set()
+        self.types = {}
+        # the name of the class last defined, whose attributes may follow it.
+        self.last_class = "\0"
+        for d in definitions:
+            if d.kind == "program":
+                for v in d.versions:
+                    for p in v.procedures:
+                        self.values[p.name] = p.number
+
+    def emit(self, line=""):
+        if len(line) > 79 and " # " in line:
+            # a comment too long to trail the line goes before it.
+            line, comment = line.split(" # ", 1)
+            indent = line[:len(line) - len(line.lstrip())]
+            for l in _textwrap.wrap(comment, 77 - len(indent)):
+                self.lines.append("%s# %s" % (indent, l))
+        self.lines.append(line)
+
+    def blank(self, n=1):
+        """
+        End the lines so far with at least n blank lines.
+        """
+        while self.lines and (len(self.lines) < n or
+                              any(self.lines[-n:])):
+            self.lines.append("")
+
+    def error(self, node, message):
+        return xdrgen_error("line %d: %s" % (node.line, message))
+
+    def separate(self, d):
+        """
+        A blank line before a one-line definition that starts a new
+        group: one with comments of its own, or the first after a class.
+        """
+        if self.lines and self.lines[-1] and (
+                d.leading or self.lines[-1].startswith((" ", self.last_class))):
+            self.blank()
+
+    def emit_comments(self, lines, indent=""):
+        for l in lines:
+            if l is None:
+                self.blank()
+            else:
+                self.emit(("%s# %s" % (indent, l)).rstrip())
+
+    def trailing(self, node):
+        if not node.trailing:
+            return ""
+        return " # " + " ".join(l.strip() for l in node.trailing)
+
+    def number(self, node, value):
+        """
+        The int a value in the .x file stands for.
+        """
+        if _re.match(r"-?[0-9]", value):
+            if _re.match(r"-?0[0-7]+$", value):
+                return int(value, 8)
+            return int(value, 0)
+        if value in self.consts:
+            return self.consts[value]
+        if value in self.values:
+            return self.number(node, self.values[value])
+        raise self.error(node, "%s is not defined" % value)
+
+    def value(self, node, value):
+        """
+        A value as Python source: module constants by name, numbers as
+        they were written (but for octal), anything else as its number.
+        """
+        if value in self.consts:
+            return _python_name(value)
+        if _re.match(r"-?0[0-7]+$", value):
+            return "0o%o" % int(value, 8) if value[0] != "-" else \
+                   "-0o%o" % -int(value, 8)
+        if _re.match(r"-?[0-9]", value):
+            return value
+        return str(self.number(node, value))
+
+    def base(self, node, base, owner=None):
+        if base in _BASE_TYPES:
+            self.imports.add(_BASE_TYPES[base])
+            return _BASE_TYPES[base]
+        if base not in self.defined and base != owner:
+            raise self.error(node, "%s is used before it is defined" % base)
+        return _python_name(base)
+
+    def type(self, decl, owner=None):
+        """
+        The Python expression for the type of a declaration.
+        """
+        bound = None
+        if decl.bound is not None:
+            bound = self.value(decl, decl.bound)
+        if decl.base in ("opaque", "string"):
+            f = "xdr_" + decl.base
+            self.imports.add(f)
+            if decl.shape == "fixed":
+                return "%s(size=%s)" % (f, bound)
+            if bound is None:
+                return "%s()" % f
+            return "%s(max=%s)" % (f, bound)
+        t = self.base(decl, decl.base, owner)
+        if decl.shape == "optional":
+            self.imports.add("xdr_optional")
+            return "xdr_optional(%s)" % t
+        if decl.shape == "fixed":
+            self.imports.add("xdr_array")
+            return "xdr_array(%s, size=%s)" % (t, bound)
+        if decl.shape == "variable":
+            self.imports.add("xdr_array")
+            if bound is None:
+                return "xdr_array(%s)" % t
+            return "xdr_array(%s, max=%s)" % (t, bound)
+        return t
+
+    def resolve(self, node, name):
+        """
+        The definition of a type, through any typedefs of it.
+        """
+        seen = set()
+        while name in self.types and name not in seen:
+            seen.add(name)
+            d = self.types[name]
+            if d.kind != "typedef":
+                return d
+            if d.decl.shape != "plain":
+                return d
+            name = d.decl.base
+        return name
+
+    def generate(self):
+        for d in self.definitions:
+            getattr(self, "gen_" + d.kind)(d)
+        lines = self.lines
+        self.lines = []
+        return lines
+
+    def gen_comment(self, d):
+        if d.leading:
+            self.blank()
+            self.emit_comments(d.leading)
+
+    def gen_passthrough(self, d):
+        if d.leading:
+            self.separate(d)
+        self.emit_comments(d.leading)
+        self.emit(d.text)
+
+    def gen_const(self, d):
+        self.separate(d)
+        self.emit_comments(d.leading)
+        self.consts[d.name] = self.number(d, d.value)
+        self.emit("%s = %s%s" % (_python_name(d.name), self.value(d, d.value),
+                                 self.trailing(d)))
+        self.defined.add(d.name)
+
+    def gen_typedef(self, d):
+        self.separate(d)
+        self.emit_comments(d.leading)
+        if d.decl.base == "void":
+            raise self.error(d, "typedef of void")
+        self.emit("%s = %s%s" % (_python_name(d.name), self.type(d.decl),
+                                 self.trailing(d)))
+        self.defined.add(d.name)
+        self.types[d.name] = d
+
+    def gen_enum(self, d):
+        self.blank()
+        self.emit_comments(d.leading)
+        self.imports.add("xdr_enum")
+        self.emit("class %s(xdr_enum):%s" % (_python_name(d.name),
+                                             self.trailing(d)))
+        d.numbers = {}
+        for m in d.members:
+            self.emit_comments(m.leading, "    ")
+            n = self.number(m, m.value)
+            d.numbers.setdefault(n, m.name)
+            self.emit("    %s = %s%s" % (_python_name(m.name),
+                                         self.value(m, m.value),
+                                         self.trailing(m)))
+            self.values[m.name] = m.value
+        self.defined.add(d.name)
+        self.types[d.name] = d
+        self.last_class = _python_name(d.name) + "."
+
+    def gen_struct(self, d):
+        self.blank()
+        self.emit_comments(d.leading)
+        self.imports.add("xdr_struct")
+        name = _python_name(d.name)
+        self.emit("class %s(xdr_struct):%s" % (name, self.trailing(d)))
+        names = set()
+        link = None
+        for i, m in enumerate(d.members):
+            if m.base == "void":
+                raise self.error(m, "void member of struct %s" % d.name)
+            if m.name in names:
+                raise self.error(m, "%s is declared twice" % m.name)
+            self.check_shadowing(m, names)
+            names.add(m.name)
+            if m.base == d.name:
+                # a link to another of this struct, like entry4.nextentry:
+                # it is attached once the class exists.
+                if m.shape != "optional" or i != len(d.members) - 1:
+                    raise self.error(m, "%s can only refer to itself through "
+                                        "an optional last member" % d.name)
+                link = m
+                continue
+            self.emit_comments(m.leading, "    ")
+            self.emit("    %s = %s%s" % (_python_name(m.name), self.type(m),
+                                         self.trailing(m)))
+        if len(d.members) == (link is not None):
+            self.emit("    pass")
+        if link is not None:
+            self.emit_comments(link.leading)
+            self.emit("%s.%s = %s%s" % (name, _python_name(link.name),
+                                        self.type(link, d.name),
+                                        self.trailing(link)))
+        self.defined.add(d.name)
+        self.types[d.name] = d
+        self.last_class = _python_name(d.name) + "."
+
+    def check_shadowing(self, m, names):
+        """
+        In a class body, a member named like a type would hide that type
+        from the members after it.
+        """
+        if m.base in names:
+            raise self.error(m, "%s is hidden by a member of the same name"
+                             % m.base)
+
+    def gen_union(self, d):
+        self.blank()
+        self.emit_comments(d.leading)
+        self.imports.add("xdr_union")
+        disc = d.discriminant
+        if disc.shape != "plain":
+            raise self.error(disc, "the discriminant must be a scalar")
+        t = self.resolve(disc, disc.base)
+        if t == "bool":
+            numbers = { 0: "FALSE", 1: "TRUE" }
+        elif getattr(t, "kind", None) == "enum":
+            numbers = t.numbers
+        elif t in ("int", "unsigned int"):
+            numbers = None
+        else:
+            raise self.error(disc, "cannot switch on %s" % disc.base)
+        self.emit("class %s(xdr_union(%s=%s)):%s"
+                  % (_python_name(d.name), _python_name(disc.name),
+                     self.type(disc), self.trailing(d)))
+        body = len(self.lines)
+        listed = set()
+        # values given no members of their own, which "default" would take.
+        void = False
+        for arm in d.arms:
+            self.emit_comments(arm.leading, "    ")
+            expr = None
+            if arm.decl.base != "void":
+                expr = self.type(arm.decl)
+                member = _python_name(arm.decl.name)
+            if numbers is None:
+                # case() of the labels' values.
+                labels = ", ".join(self.case_value(arm, l) for l in arm.labels)
+                if expr is None:
+                    self.emit("    case(%s)%s" % (labels, self.trailing(arm)))
+                else:
+                    self.emit("    case(%s).%s = %s%s" % (labels, member, expr,
+                                                         self.trailing(arm)))
+                continue
+            for label in arm.labels:
+                n = self.number(arm, label)
+                if n not in numbers:
+                    raise self.error(arm, "%s is not a value of %s"
+                                     % (label, disc.base))
+                listed.add(n)
+                void = void or expr is None
+                if expr is not None:
+                    self.emit("    %s.%s = %s%s" % (numbers[n], member, expr,
+                                                    self.trailing(arm)))
+        default = d.default
+        if default is not None:
+            self.emit_comments(default.leading, "    ")
+            if numbers is None or (default.decl.base != "void" and not void):
+                if default.decl.base != "void":
+                    self.emit("    default.%s = %s%s"
+                              % (_python_name(default.decl.name),
+                                 self.type(default.decl),
+                                 self.trailing(default)))
+                self.emit('    _xdr_default = "default"')
+            elif default.decl.base != "void":
+                # every value not listed, as the void ones listed would
+                # take a default arm.
+                expr = self.type(default.decl)
+                for n, value in sorted(numbers.items()):
+                    if n not in listed:
+                        self.emit("    %s.%s = %s" % (value,
+                                                      _python_name(default.decl.name),
+                                                      expr))
+        if not any(l.strip() and not l.strip().startswith("#")
+                   for l in self.lines[body:]):
+            self.emit("    pass")
+        self.defined.add(d.name)
+        self.types[d.name] = d
+        self.last_class = _python_name(d.name) + "."
+
+    def case_value(self, node, label):
+        if label in self.consts or _re.match(r"-?[0-9]", label):
+            return self.value(node, label)
+        # a member of an enum, which is not a module name.
+        for t in self.types.values():
+            if t.kind == "enum" and any(m.name == label for m in t.members):
+                return "%s.%s" % (_python_name(t.name), label)
+        return self.value(node, label)
+
+    def gen_program(self, d):
+        self.imports.update(("rpc_program", "rpc_version", "rpc_procedure"))
+        self.blank(2)
+        self.emit_comments(d.leading)
+        name = _python_name(d.name)
+        self.emit("@rpc_program(prog=%s)" % self.value(d, d.number))
+        self.emit("class %s(object):%s" % (name, self.trailing(d)))
+        self.emit("    def __init__(self):")
+        for v in d.versions:
+            self.emit("        self.%s = %s.%s()" % (v.name, name, v.name))
+        for v in d.versions:
+            self.blank()
+            self.emit_comments(v.leading, "    ")
+            self.emit("    @rpc_version(vers=%s)" % self.value(v, v.number))
+            self.emit("    class %s(object):%s" % (v.name, self.trailing(v)))
+            for i, p in enumerate(v.procedures):
+                if i:
+                    self.blank()
+                self.emit_comments(p.leading, "        ")
+                self.emit("        @rpc_procedure(proc=%s, args=%s, ret=%s)%s"
+                          % (self.value(p, p.number), self.type(p.arg),
+                             self.type(p.ret), self.trailing(p)))
+                if p.arg.base == "void":
+                    self.emit("        def %s(self):" % p.name)
+                else:
+                    self.emit("        def %s(self, rpc_msg, args):" % p.name)
+                self.emit("            pass")
+            if not v.procedures:
+                self.emit("        pass")
+        self.blank(2)
+        self.defined.add(d.name)
+
+
+_XDR_IMPORTS = ("xdr_int", "xdr_uint", "xdr_hyper", "xdr_uhyper", "xdr_float",
+                "xdr_double", "xdr_quad", "xdr_bool", "xdr_void", "xdr_enum",
+                "xdr_opaque", "xdr_string", "xdr_array", "xdr_optional",
+                "xdr_struct", "xdr_union")
+_RPC_IMPORTS = ("rpc_program", "rpc_version", "rpc_procedure")
+
+
+def _import_lines(module, names):
+    lines = []
+    line = None
+    for name in names:
+        if line is None:
+            line = "from %s import %s" % (module, name)
+        elif len(line) + len(name) + 2 > 79:
+            lines.append(line)
+            line = "from %s import %s" % (module, name)
+        else:
+            line += ", " + name
+    if line is not None:
+        lines.append(line)
+    return lines
+
+
+def translate(text, filename="<spec>"):
+    """
+    The Python source of a module for the .x file text.
+    """
+    parser = _parser(text)
+    gen = _generator(parser.specification())
+    body = gen.generate()
+    lines = [ '"""' ]
+    # the comment opening the file is the module's docstring.
+    lines.extend(l.replace('"""', "'''") for l in parser.header)
+    if parser.header:
+        lines.append("")
+    lines.append("Generated by xdrgen.py from %s: edit that and regenerate this"
+                 % filename)
+    lines.append("rather than changing it here.")
+    lines.append('"""')
+    lines.append("")
+    lines.extend(_import_lines("xdr", [ n for n in _XDR_IMPORTS
+                                        if n in gen.imports ]))
+    lines.extend(_import_lines("rpc", [ n for n in _RPC_IMPORTS
+                                        if n in gen.imports ]))
+    lines.append("")
+    while body and not body[0]:
+        del body[0]
+    lines.extend(body)
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def main(argv):
+    import argparse
+    import os
+    parser = argparse.ArgumentParser(
+        description="Compile an XDR/RPC language file to a Python module.")
+    parser.add_argument("spec", help="the .x file")
+    parser.add_argument("-o", "--output",
+                        help="the module to write (default: standard output)")
+    args = parser.parse_args(argv)
+    with open(args.spec) as f:
+        text = f.read()
+    try:
+        source = translate(text, os.path.basename(args.spec))
+    except xdrgen_error as e:
+        parser.exit(1, "%s:%s\n" % (args.spec, e))
+    if args.output is None:
+        print(source, end="")
+    else:
+        with open(args.output, "w") as f:
+            f.write(source)
+
+
+if __name__ == "__main__":
+    import sys
+    main(sys.argv[1:])